@@ -0,0 +1,24 @@
+"""climatology sample counts
+
+Revision ID: c41f7a2d9e10
+Revises: <autogenererad_ny_id>
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "c41f7a2d9e10"
+down_revision = "<autogenererad_ny_id>"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Records behind each normal, so the ingest job can merge files as weighted means
+    for variable in ("tmean", "tmin", "tmax"):
+        op.add_column("climatology_daily", sa.Column(f"{variable}_n", sa.Integer()))
+
+
+def downgrade() -> None:
+    for variable in ("tmean", "tmin", "tmax"):
+        op.drop_column("climatology_daily", f"{variable}_n")
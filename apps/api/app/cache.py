@@ -0,0 +1,318 @@
+"""
+Two-tier cache: an in-process TTL/LRU tier in front of a shared Redis tier.
+Used for upstream forecasts and computed predictions so repeat requests
+for the same grid cell skip the Open-Meteo call, and so every uvicorn
+worker (and replica) sees what the others already fetched.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app import config, spatial
+
+
+class TTLCache:
+    """
+    In-process LRU cache where every entry also has its own expiry.
+    Entries set with a grace period stay available to get_stale() for that
+    long after they expire (stale-while-revalidate).
+    Not thread-safe; meant for a single asyncio event loop.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, stale_until, value = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if stale_until <= now:
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: str) -> tuple[Optional[Any], bool]:
+        """(value, stale): expired entries still inside their grace period come back with stale=True"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        expires_at, stale_until, value = entry
+        now = time.monotonic()
+        if stale_until <= now:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None, False
+        self._data.move_to_end(key)
+        if expires_at <= now:
+            self.stale_hits += 1
+            return value, True
+        self.hits += 1
+        return value, False
+
+    def peek(self, key: str) -> Optional[Any]:
+        """The key's value, expired or not (does not touch LRU order or counters)"""
+        entry = self._data.get(key)
+        return entry[2] if entry is not None else None
+
+    def is_fresh(self, key: str) -> bool:
+        """True if the key holds an unexpired value (does not touch LRU order or counters)"""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key: str, value: Any, ttl: float, grace: float = 0.0) -> None:
+        expires_at = time.monotonic() + ttl
+        self._data[key] = (expires_at, expires_at + max(grace, 0.0), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class TieredCache:
+    """
+    Local TTLCache backed by an optional Redis tier.
+    Redis hits are copied into the local tier with the remaining Redis TTL.
+    With a grace period, entries outlive their TTL by that long in both tiers
+    and get_stale() can still serve them while a refresh runs.
+    Redis errors are counted and treated as misses so the API keeps working
+    without Redis.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, grace: float = 0.0) -> None:
+        self.namespace = namespace
+        self.local = TTLCache(maxsize)
+        self.grace = grace
+        self.redis = None
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        _tiered.append(self)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value, stale = await self.get_stale(key)
+        return None if stale else value
+
+    async def get_stale(self, key: str) -> tuple[Optional[Any], bool]:
+        """
+        (value, stale) from the local tier, then Redis. A stale local entry
+        is only served if Redis has nothing fresher (another replica may
+        already have refreshed it).
+        """
+        local_value, local_stale = self.local.get_stale(key)
+        if self.redis is None or (local_value is not None and not local_stale):
+            return local_value, local_stale
+        try:
+            redis_key = self._redis_key(key)
+            raw = await self.redis.get(redis_key)
+            if raw is None:
+                self.redis_misses += 1
+                return local_value, local_stale
+            ttl = await self.redis.ttl(redis_key)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"Redis cache get failed: {e}")
+            return local_value, local_stale
+        if not ttl or ttl <= 0:
+            # No expiry on the Redis key: treat as fresh, but don't copy it locally
+            self.redis_hits += 1
+            return json.loads(raw), False
+        # The Redis TTL includes the grace period
+        fresh_for = ttl - self.grace
+        if fresh_for <= 0 and local_value is not None:
+            return local_value, local_stale
+        self.redis_hits += 1
+        value = json.loads(raw)
+        if fresh_for > 0:
+            self.local.set(key, value, fresh_for, self.grace)
+        else:
+            self.local.set(key, value, 0.0, ttl)
+        return value, fresh_for <= 0
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self.local.set(key, value, ttl, self.grace)
+        await self._redis_set(key, value, ttl)
+
+    def set_behind(self, key: str, value: Any, ttl: float) -> None:
+        """Set locally now and write the Redis tier in the background (off the request path)"""
+        self.local.set(key, value, ttl, self.grace)
+        if self.redis is None:
+            return
+        task = asyncio.create_task(self._redis_set(key, value, ttl))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+    async def _redis_set(self, key: str, value: Any, ttl: float) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self._redis_key(key), json.dumps(value), ex=max(1, int(ttl + self.grace)))
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"Redis cache set failed: {e}")
+
+    async def warm(self, keys: list[str]) -> int:
+        """
+        Copy entries that are fresh in Redis into the local tier (startup
+        preload); one pipelined round trip per call. Returns entries copied.
+        """
+        if self.redis is None or not keys:
+            return 0
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.get(self._redis_key(key))
+                    pipe.ttl(self._redis_key(key))
+                replies = await pipe.execute()
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"Redis cache warm failed: {e}")
+            return 0
+        copied = 0
+        for key, raw, ttl in zip(keys, replies[0::2], replies[1::2]):
+            fresh_for = (ttl or 0) - self.grace
+            if raw is None or fresh_for <= 0:
+                continue
+            self.local.set(key, json.loads(raw), fresh_for, self.grace)
+            copied += 1
+        return copied
+
+    def clear(self) -> None:
+        """Clear the local tier (Redis entries are shared with other workers)"""
+        self.local.clear()
+
+    def stats(self) -> dict:
+        lookups = self.local.hits + self.local.stale_hits + self.local.misses
+        hits = self.local.hits + self.local.stale_hits + self.redis_hits
+        return {
+            "local": self.local.stats(),
+            "redis": {
+                "enabled": self.redis is not None,
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+            },
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def snap_to_grid(lat: float, lon: float, resolution: float = config.FORECAST_GRID_DEG) -> tuple[float, float]:
+    """Snap coordinates to the canonical centre of the upstream model grid cell (see app/spatial.py)"""
+    return spatial.cell_grid(resolution).snap(lat, lon)
+
+
+def latest_model_run(now: Optional[datetime] = None) -> datetime:
+    """Start time (UTC) of the newest upstream model run that is already published"""
+    now = now or datetime.now(timezone.utc)
+    interval = config.MODEL_RUN_INTERVAL_HOURS * 3600
+    delay = config.MODEL_RUN_DELAY_MINUTES * 60
+    published = now.timestamp() - delay
+    return datetime.fromtimestamp(published - published % interval, tz=timezone.utc)
+
+
+def model_run_ttl(now: Optional[datetime] = None) -> float:
+    """
+    Seconds until the next upstream model run becomes available.
+    Runs start every MODEL_RUN_INTERVAL_HOURS from 00 UTC and are published
+    MODEL_RUN_DELAY_MINUTES later, so cached forecasts expire exactly when
+    newer data can be fetched.
+    """
+    now = now or datetime.now(timezone.utc)
+    interval = config.MODEL_RUN_INTERVAL_HOURS * 3600
+    delay = config.MODEL_RUN_DELAY_MINUTES * 60
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (now - midnight).total_seconds() - delay
+    remaining = interval - (elapsed % interval)
+    return max(remaining, config.FORECAST_CACHE_MIN_TTL)
+
+
+# Every TieredCache shares the one Redis connection opened at startup
+_tiered: list[TieredCache] = []
+# In-flight set_behind() writes
+_background: set[asyncio.Task] = set()
+
+forecast_cache = TieredCache("fc:v3", config.FORECAST_CACHE_SIZE, grace=config.FORECAST_STALE_GRACE)
+
+
+async def startup() -> bool:
+    """
+    Connect the Redis tier of every TieredCache if REDIS_URL is configured
+    and check it answers; False when there is no Redis to connect.
+    The redis package is only imported here.
+    """
+    if not config.REDIS_URL:
+        return False
+    if forecast_cache.redis is None:
+        from redis.asyncio import Redis
+
+        client = Redis.from_url(config.REDIS_URL)
+        for tiered in _tiered:
+            tiered.redis = client
+    # A failed ping leaves the client in place: lookups count errors and fall back until Redis is back
+    await forecast_cache.redis.ping()
+    return True
+
+
+async def try_lock(name: str, ttl: float) -> bool:
+    """
+    Take a Redis lock that expires after ttl seconds, so one worker or
+    replica runs a periodic job. Without Redis (or when it fails) every
+    caller gets the lock.
+    """
+    redis = forecast_cache.redis
+    if redis is None:
+        return True
+    try:
+        return bool(await redis.set(f"lock:{name}", os.getpid(), nx=True, ex=max(1, int(ttl))))
+    except Exception as e:
+        print(f"Redis lock failed: {e}")
+        return True
+
+
+async def shutdown() -> None:
+    if forecast_cache.redis is not None:
+        await forecast_cache.redis.aclose()
+    for tiered in _tiered:
+        tiered.redis = None
@@ -0,0 +1,148 @@
+"""
+Precomputed climatology grid, memory-mapped at startup.
+The offline build step (app/jobs/build_climo_grid.py) exports
+climatology_daily into a float32 array of shape (variable, lat, lon, 366)
+stored as .npy with a small .json sidecar describing the axes. Lookups are
+array indexing with bilinear interpolation, and every uvicorn worker maps
+the same file, so they share one copy in the OS page cache.
+"""
+import calendar
+import json
+import os
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+VARIABLES = ("tmean", "tmin", "tmax")
+DAYS = 366
+
+
+def calendar_day(d: date) -> int:
+    """
+    Day (1-366) on the grid's leap-year calendar: February 29 is day 60 and
+    every later date keeps its number in common years too, so March 1 is
+    always day 61.
+    """
+    doy = d.timetuple().tm_yday
+    return doy + 1 if doy > 59 and not calendar.isleap(d.year) else doy
+
+
+def calendar_days(dates) -> np.ndarray:
+    """calendar_day() for an array of datetime64 dates (or ISO strings)"""
+    dates = np.asarray(dates).astype("datetime64[D]")
+    years = dates.astype("datetime64[Y]")
+    doy = (dates - years).astype(np.int64) + 1
+    year = years.astype(np.int64) + 1970
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return doy + ((doy > 59) & ~leap)
+
+
+class ClimatologyGrid:
+    """Regular lat/lon grid of daily normals with bilinear lookups"""
+
+    def __init__(self, data: np.ndarray, lat0: float, dlat: float, lon0: float, dlon: float) -> None:
+        self.data = data
+        self.lat0 = lat0
+        self.dlat = dlat
+        self.lon0 = lon0
+        self.dlon = dlon
+        self.nlat = data.shape[1]
+        self.nlon = data.shape[2]
+        # A grid covering all longitudes wraps around the antimeridian
+        self.wraps = abs(self.nlon * dlon - 360.0) < 1e-6
+
+    @classmethod
+    def load(cls, path: str) -> "ClimatologyGrid":
+        with open(sidecar_path(path)) as f:
+            meta = json.load(f)
+        data = np.load(path, mmap_mode="r")
+        return cls(data, meta["lat0"], meta["dlat"], meta["lon0"], meta["dlon"])
+
+    def touch(self, page_size: int = 4096) -> int:
+        """
+        Read one value per page so the whole file is resident in the page
+        cache before traffic arrives (workers after the first find it
+        already there). Returns bytes touched.
+        """
+        flat = self.data.reshape(-1)
+        float(np.sum(flat[:: max(page_size // flat.itemsize, 1)], dtype=np.float64))
+        return flat.nbytes
+
+    def interpolate(self, lat, lon, doy, variable: str = "tmean") -> np.ndarray:
+        """
+        Bilinear interpolation for arrays of points over the cells that
+        have data; NaN outside the grid or where no surrounding cell (with
+        non-zero weight) has data.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        day = np.clip(np.atleast_1d(np.asarray(doy, dtype=np.int64)) - 1, 0, DAYS - 1)
+        values = self.data[VARIABLES.index(variable)]
+
+        fy = (lat - self.lat0) / self.dlat
+        fx = (lon - self.lon0) / self.dlon
+        if self.wraps:
+            fx = np.mod(fx, self.nlon)
+        inside = (fy >= 0) & (fy <= self.nlat - 1)
+        if not self.wraps:
+            inside &= (fx >= 0) & (fx <= self.nlon - 1)
+
+        y0 = np.clip(np.floor(fy).astype(np.int64), 0, self.nlat - 1)
+        x0 = np.clip(np.floor(fx).astype(np.int64), 0, self.nlon - 1)
+        y1 = np.minimum(y0 + 1, self.nlat - 1)
+        x1 = (x0 + 1) % self.nlon if self.wraps else np.minimum(x0 + 1, self.nlon - 1)
+        wy = np.clip(fy - y0, 0.0, 1.0)
+        wx = np.clip(fx - x0, 0.0, 1.0)
+
+        corners = np.stack([values[y0, x0, day], values[y0, x1, day], values[y1, x0, day], values[y1, x1, day]])
+        weights = np.stack([(1 - wy) * (1 - wx), (1 - wy) * wx, wy * (1 - wx), wy * wx])
+        # Missing corners (coasts, sparse station grids) drop out and the rest are reweighted
+        valid = ~np.isnan(corners)
+        weights = np.where(valid, weights, 0.0)
+        total = weights.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = (np.where(valid, corners, 0.0) * weights).sum(axis=0) / total
+        return np.where(inside & (total > 1e-9), result, np.nan)
+
+    def lookup(self, lat: float, lon: float, doy: int, variable: str = "tmean") -> Optional[float]:
+        """Scalar lookup; None when the grid has no value here"""
+        value = float(self.interpolate(lat, lon, doy, variable)[0])
+        return None if np.isnan(value) else value
+
+
+def sidecar_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def save(path: str, data: np.ndarray, lat0: float, dlat: float, lon0: float, dlon: float) -> None:
+    """Write the .npy grid and its axes sidecar (atomically replacing old files)"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, data.astype(np.float32, copy=False))
+    meta = {"lat0": lat0, "dlat": dlat, "lon0": lon0, "dlon": dlon, "variables": list(VARIABLES)}
+    with open(sidecar_path(path) + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(sidecar_path(path) + ".tmp", sidecar_path(path))
+    os.replace(tmp, path)
+
+
+_grid: Optional[ClimatologyGrid] = None
+
+
+def load(path: str) -> Optional[ClimatologyGrid]:
+    """Memory-map the grid at startup; the cosine model is used when the file is missing"""
+    global _grid
+    if not path or not os.path.exists(path):
+        return None
+    _grid = ClimatologyGrid.load(path)
+    return _grid
+
+
+def get_grid() -> Optional[ClimatologyGrid]:
+    return _grid
+
+
+def set_grid(grid: Optional[ClimatologyGrid]) -> None:
+    global _grid
+    _grid = grid
@@ -0,0 +1,166 @@
+"""
+Runtime configuration for the Weather Fortune API.
+All values come from the environment (see .env.example at the repo root).
+"""
+import os
+
+from dotenv import load_dotenv
+
+# Same .env file that alembic/env.py loads when run from apps/api
+load_dotenv("../../.env")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# -------------------------------
+# Upstream forecast (Open-Meteo)
+# -------------------------------
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+# Shared HTTP client pool
+HTTP_TIMEOUT = _env_float("HTTP_TIMEOUT", 10.0)
+HTTP_CONNECT_TIMEOUT = _env_float("HTTP_CONNECT_TIMEOUT", 3.0)
+HTTP_POOL_TIMEOUT = _env_float("HTTP_POOL_TIMEOUT", 5.0)
+HTTP_MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = _env_int("HTTP_MAX_KEEPALIVE", 20)
+HTTP_KEEPALIVE_EXPIRY = _env_float("HTTP_KEEPALIVE_EXPIRY", 30.0)
+HTTP2_ENABLED = _env_bool("HTTP2_ENABLED", True)
+
+# Offline upstream (app/replay.py): record responses to an archive, or serve
+# them from one with no network (replay wins when both are set)
+UPSTREAM_RECORD_PATH = os.getenv("UPSTREAM_RECORD_PATH")
+UPSTREAM_REPLAY_PATH = os.getenv("UPSTREAM_REPLAY_PATH")
+REPLAY_LATENCY = _env_float("REPLAY_LATENCY", 0.0)  # seconds per replayed call
+REPLAY_ERROR_RATE = _env_float("REPLAY_ERROR_RATE", 0.0)  # share answered with 503
+
+# Batch predictions: max items per request, grid cells per multi-location upstream call
+BATCH_MAX_ITEMS = _env_int("BATCH_MAX_ITEMS", 10_000)
+BATCH_UPSTREAM_CHUNK = _env_int("BATCH_UPSTREAM_CHUNK", 50)
+BATCH_BLOCK_SIZE = _env_int("BATCH_BLOCK_SIZE", 500)
+
+# Range predictions: max days per /api/predict/range request, and days
+# computed (and sent) per streamed block
+RANGE_MAX_DAYS = _env_int("RANGE_MAX_DAYS", 366)
+RANGE_BLOCK_SIZE = _env_int("RANGE_BLOCK_SIZE", 31)
+
+# Grid/tile predictions: output size limits, forecast points fetched per axis, rendered tile cache
+GRID_MAX_CELLS = _env_int("GRID_MAX_CELLS", 512 * 512)
+GRID_TILE_MAX_SIZE = _env_int("GRID_TILE_MAX_SIZE", 512)
+GRID_MAX_ANCHORS_PER_SIDE = _env_int("GRID_MAX_ANCHORS_PER_SIDE", 16)
+GRID_TILE_CACHE_SIZE = _env_int("GRID_TILE_CACHE_SIZE", 2000)
+
+# Upstream guard: concurrency limit, adaptive timeout (factor x p99, clamped to
+# [UPSTREAM_TIMEOUT_MIN, HTTP_TIMEOUT]), hedging after the p95, circuit breaker
+UPSTREAM_MAX_CONCURRENCY = _env_int("UPSTREAM_MAX_CONCURRENCY", 32)
+UPSTREAM_QUEUE_TIMEOUT = _env_float("UPSTREAM_QUEUE_TIMEOUT", 2.0)
+UPSTREAM_TIMEOUT_MIN = _env_float("UPSTREAM_TIMEOUT_MIN", 1.0)
+UPSTREAM_TIMEOUT_FACTOR = _env_float("UPSTREAM_TIMEOUT_FACTOR", 3.0)
+UPSTREAM_HEDGE_QUANTILE = _env_float("UPSTREAM_HEDGE_QUANTILE", 0.95)  # 0 disables hedging
+UPSTREAM_LATENCY_WINDOW = _env_int("UPSTREAM_LATENCY_WINDOW", 200)
+UPSTREAM_LATENCY_MIN_SAMPLES = _env_int("UPSTREAM_LATENCY_MIN_SAMPLES", 20)
+BREAKER_FAILURE_THRESHOLD = _env_int("BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RESET_SECONDS = _env_float("BREAKER_RESET_SECONDS", 30.0)
+
+# Global upstream call budget (token bucket shared through Redis): refills at
+# UPSTREAM_DAILY_BUDGET per day up to UPSTREAM_BUDGET_BURST; background work
+# (prefetch, revalidation) stops while less than the reserve fraction is left
+UPSTREAM_DAILY_BUDGET = _env_float("UPSTREAM_DAILY_BUDGET", 10_000)  # 0 disables
+UPSTREAM_BUDGET_BURST = _env_float("UPSTREAM_BUDGET_BURST", 1_000)
+UPSTREAM_BUDGET_RESERVE = _env_float("UPSTREAM_BUDGET_RESERVE", 0.2)
+
+# Per-client limit on the /api/predict endpoints (API key, else client address)
+CLIENT_RATE_PER_SECOND = _env_float("CLIENT_RATE_PER_SECOND", 10.0)  # 0 disables
+CLIENT_BURST = _env_float("CLIENT_BURST", 50)
+
+# How long a caller waits on a shared (coalesced) forecast fetch
+FORECAST_FETCH_TIMEOUT = _env_float("FORECAST_FETCH_TIMEOUT", 12.0)
+
+# -------------------------------
+# Serving (python -m app.serve)
+# -------------------------------
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = _env_int("PORT", 8000)
+# Worker processes; each has its own event loop and in-process cache tier
+WEB_CONCURRENCY = _env_int("WEB_CONCURRENCY", os.cpu_count() or 1)
+# Startup preload: page in the climatology grid and copy the hot forecast
+# cells from Redis before a worker accepts traffic (bounded by the timeout)
+PRELOAD_ENABLED = _env_bool("PRELOAD_ENABLED", True)
+PRELOAD_TIMEOUT = _env_float("PRELOAD_TIMEOUT", 30.0)
+# Lifespan warm-up waits at most this long; later steps finish in the background (/ready is 503 meanwhile)
+STARTUP_BUDGET = _env_float("STARTUP_BUDGET", 20.0)
+# Checked by `python -m app.startup --check`
+STARTUP_IMPORT_BUDGET = _env_float("STARTUP_IMPORT_BUDGET", 1.5)
+
+# -------------------------------
+# Forecast cache
+# -------------------------------
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Coordinates are snapped to this grid (degrees) before lookup and fetch
+FORECAST_GRID_DEG = _env_float("FORECAST_GRID_DEG", 0.1)
+FORECAST_CACHE_SIZE = _env_int("FORECAST_CACHE_SIZE", 10_000)
+FORECAST_CACHE_MIN_TTL = _env_float("FORECAST_CACHE_MIN_TTL", 300.0)
+
+# Upstream model run cadence: cached entries expire when the next run is published
+MODEL_RUN_INTERVAL_HOURS = _env_int("MODEL_RUN_INTERVAL_HOURS", 6)
+MODEL_RUN_DELAY_MINUTES = _env_int("MODEL_RUN_DELAY_MINUTES", 180)
+
+# Expired forecasts are still served for this long while a background refresh runs
+FORECAST_STALE_GRACE = _env_float("FORECAST_STALE_GRACE", 3600.0)
+
+# A series the upstream still serves from an earlier run (new run published
+# late) is refetched after this many seconds instead of at the next run
+FORECAST_LATE_RETRY = _env_float("FORECAST_LATE_RETRY", 600.0)
+
+# Pre-warm the most requested grid cells shortly after each model run (0 disables)
+PREFETCH_TOP_N = _env_int("PREFETCH_TOP_N", 200)
+PREFETCH_DELAY_SECONDS = _env_float("PREFETCH_DELAY_SECONDS", 60.0)
+# Max grid cells whose request counts are tracked
+PREFETCH_TRACK_MAX = _env_int("PREFETCH_TRACK_MAX", 20_000)
+
+# Hot in-process tier for computed predictions (shared through Redis, backed by the predictions table)
+PREDICTION_CACHE_SIZE = _env_int("PREDICTION_CACHE_SIZE", 50_000)
+
+# -------------------------------
+# Database (PostgreSQL via asyncpg)
+# -------------------------------
+DATABASE_URL = os.getenv("DATABASE_URL")
+# psycopg2 URL for offline jobs (same variable Alembic uses)
+SYNC_DATABASE_URL = os.getenv("SYNC_DATABASE_URL")
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 5.0)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+DB_STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE", 100)
+
+# Expired forecast_cache rows are deleted in batches on this interval (seconds)
+FORECAST_SWEEP_INTERVAL = _env_float("FORECAST_SWEEP_INTERVAL", 600.0)
+FORECAST_SWEEP_BATCH = _env_int("FORECAST_SWEEP_BATCH", 5000)
+
+# -------------------------------
+# Climatology
+# -------------------------------
+# Memory-mapped grid built by `python -m app.jobs.build_climo_grid`
+CLIMO_GRID_PATH = os.getenv("CLIMO_GRID_PATH", "data/climo_grid.npy")
+
+# -------------------------------
+# Residual tables (AI offset and empirical bands)
+# -------------------------------
+# Built by `python -m app.jobs.aggregate_residuals`; reloaded when the file changes
+RESIDUALS_PATH = os.getenv("RESIDUALS_PATH", "data/residuals.npy")
+RESIDUALS_MIN_SAMPLES = _env_int("RESIDUALS_MIN_SAMPLES", 30)
+RESIDUALS_MAX_LEAD = _env_int("RESIDUALS_MAX_LEAD", 90)
+RESIDUALS_RELOAD_INTERVAL = _env_float("RESIDUALS_RELOAD_INTERVAL", 60.0)
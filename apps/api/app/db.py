@@ -0,0 +1,124 @@
+"""
+Async database access (SQLAlchemy + asyncpg).
+SQLAlchemy is imported lazily: the tables in app/tables.py are reachable
+as db.<table> and load on first access, and the engine is created on
+first use (or during lifespan warm-up), so the API starts without paying
+for it when DATABASE_URL is not set.
+"""
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from app import config
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+TABLES = ("metadata", "climatology_daily", "forecast_cache", "residuals", "backtest_runs", "predictions")
+
+
+def __getattr__(name: str) -> Any:
+    """db.predictions etc. import the table definitions on first access"""
+    if name in TABLES:
+        from app import tables
+
+        return getattr(tables, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_engine: Optional["AsyncEngine"] = None
+_sessionmaker: Optional["async_sessionmaker[AsyncSession]"] = None
+
+# Keeps write-behind tasks referenced until they finish
+_pending: set[asyncio.Task] = set()
+
+
+def is_configured() -> bool:
+    """The API runs without a database when DATABASE_URL is not set"""
+    return bool(config.DATABASE_URL)
+
+
+def get_engine() -> "AsyncEngine":
+    """Create the pooled asyncpg engine on first use"""
+    global _engine
+    if _engine is None:
+        if not config.DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not set")
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _engine = create_async_engine(
+            config.DATABASE_URL,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={
+                # Set to 0 behind PgBouncer in transaction mode (Supabase pooler)
+                "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+                "server_settings": {
+                    "application_name": "weather-fortune-api",
+                    # Our queries are short index lookups; JIT only adds latency
+                    "jit": "off",
+                },
+            },
+        )
+    return _engine
+
+
+def session() -> "AsyncSession":
+    """New ORM session bound to the shared engine (use as `async with db.session() as s`)"""
+    global _sessionmaker
+    if _sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _sessionmaker = async_sessionmaker(get_engine(), expire_on_commit=False)
+    return _sessionmaker()
+
+
+def write_behind(write: Callable[[], Awaitable], what: str) -> None:
+    """
+    Run a database write in the background so the request does not wait on it.
+    Failures are logged; the caches still hold the value.
+    """
+    if not is_configured():
+        return
+
+    async def run() -> None:
+        try:
+            await write()
+        except Exception as e:
+            print(f"Error storing {what}: {e}")
+
+    task = asyncio.ensure_future(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def warm() -> bool:
+    """
+    Lifespan warm-up: import SQLAlchemy and the tables off the event loop,
+    then open the first pooled connection. False when no database is set.
+    """
+    if not is_configured():
+        return False
+
+    def load() -> None:
+        from app import tables  # noqa: F401
+
+        get_engine()
+
+    await asyncio.to_thread(load)
+    import sqlalchemy as sa
+
+    async with get_engine().connect() as conn:
+        await conn.execute(sa.text("SELECT 1"))
+    return True
+
+
+async def dispose() -> None:
+    """Close pooled connections (called from the FastAPI lifespan)"""
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
@@ -0,0 +1,159 @@
+"""
+Vectorized climatology and blending engine (NumPy).
+Same math as get_climatology() and build_prediction() in app/main.py,
+applied to whole arrays of points at once. Used by the batch, grid and
+backtest workloads; the single-point endpoint keeps the scalar path.
+"""
+import math
+from typing import Optional, Union
+
+import numpy as np
+
+from app import climo_grid, residuals
+
+ArrayLike = Union[np.ndarray, list, float, int]
+
+
+def day_of_year(dates) -> np.ndarray:
+    """Day of year (1-366) for a sequence of datetime.date"""
+    return np.fromiter((d.timetuple().tm_yday for d in dates), dtype=np.int16, count=len(dates))
+
+
+def grid_days(dates) -> np.ndarray:
+    """Day on the climatology grid's leap-year calendar (climo_grid.calendar_day) for a sequence of datetime.date"""
+    return np.fromiter((climo_grid.calendar_day(d) for d in dates), dtype=np.int16, count=len(dates))
+
+
+def climatology(
+    lat: ArrayLike, doy: ArrayLike, lon: Optional[ArrayLike] = None, grid_doy: Optional[ArrayLike] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Seasonal climatology for arrays of latitude and day of year.
+    Returns (climo_temp, climo_std), matching get_climatology(); with
+    longitudes given, the memory-mapped grid overrides climo_temp where
+    it has data. The grid is looked up by grid_doy (see grid_days()),
+    which defaults to doy.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    doy = np.asarray(doy, dtype=np.float64)
+    abs_lat = np.abs(lat)
+
+    # Peak around July 15 for NH, Jan 15 for SH
+    peak_day = np.where(lat >= 0, 196.0, 15.0)
+    cos_phase = np.cos(2 * np.pi * (doy - peak_day) / 365.25)
+
+    climo_temp = (25 - abs_lat * 0.6) + (abs_lat * 0.4) * cos_phase
+    climo_std = (2.0 + abs_lat * 0.05) * (1.0 + 0.5 * np.abs(cos_phase))
+
+    grid = climo_grid.get_grid()
+    if grid is not None and lon is not None:
+        grid_temp = grid.interpolate(lat, lon, doy if grid_doy is None else grid_doy)
+        climo_temp = np.where(np.isnan(grid_temp), climo_temp, grid_temp)
+    return climo_temp, climo_std
+
+
+def anchor_weight(days_ahead: ArrayLike) -> np.ndarray:
+    """Forecast weight: 1.0 up to day 10, then halving every 7 days"""
+    days_ahead = np.asarray(days_ahead, dtype=np.float64)
+    return np.where(days_ahead <= 10, 1.0, 0.5 ** ((days_ahead - 10) / 7))
+
+
+def blend(
+    anchor: ArrayLike,
+    climo_temp: ArrayLike,
+    climo_std: ArrayLike,
+    days_ahead: ArrayLike,
+    ai_offset: ArrayLike = 0.0,
+    bands: Optional[np.ndarray] = None,
+) -> dict[str, np.ndarray]:
+    """
+    Blend forecast anchors (NaN = no forecast) with climatology and add bands.
+    bands are residual band offsets with rows (lo95, lo80, hi80, hi95);
+    where they are NaN (or not given) the heuristic in build_prediction() is used.
+    Returns unrounded arrays keyed like PredictionResponse plus explain parts.
+    """
+    anchor = np.asarray(anchor, dtype=np.float64)
+    climo_temp = np.asarray(climo_temp, dtype=np.float64)
+    climo_std = np.asarray(climo_std, dtype=np.float64)
+    days_ahead = np.asarray(days_ahead, dtype=np.int64)
+
+    # Fallback to climatology where the forecast is missing
+    has_anchor = ~np.isnan(anchor)
+    anchor_filled = np.where(has_anchor, anchor, 0.0)
+    w_anchor = np.where(has_anchor, anchor_weight(days_ahead), 0.0)
+    predicted = np.where(has_anchor, w_anchor * anchor_filled + (1 - w_anchor) * climo_temp, climo_temp)
+
+    ai_offset = np.broadcast_to(np.asarray(ai_offset, dtype=np.float64), predicted.shape)
+    temp = predicted + ai_offset
+
+    band80 = np.maximum(1.0, 0.6 * climo_std + 0.1 * days_ahead)
+    heuristic = np.stack([-1.6 * band80, -band80, band80, 1.6 * band80])
+    if bands is not None:
+        bands = np.asarray(bands, dtype=np.float64)
+        heuristic = np.where(np.isnan(bands), heuristic, bands)
+    lo95, lo80, hi80, hi95 = heuristic
+
+    return {
+        "temp": temp,
+        "low80": temp + lo80,
+        "high80": temp + hi80,
+        "low95": temp + lo95,
+        "high95": temp + hi95,
+        "anchor": anchor,
+        "climo": climo_temp,
+        "climo_std": climo_std,
+        "w_anchor": w_anchor,
+        "ai_offset": ai_offset,
+        "days_ahead": days_ahead,
+    }
+
+
+def predict(
+    lat: ArrayLike,
+    lon: ArrayLike,
+    doy: ArrayLike,
+    anchor: ArrayLike,
+    days_ahead: ArrayLike,
+    months: Optional[ArrayLike] = None,
+    grid_doy: Optional[ArrayLike] = None,
+) -> dict[str, np.ndarray]:
+    """
+    Climatology + blend for arrays of points in one pass.
+    With target months given, the AI offset and bands come from the loaded
+    residual tables.
+    """
+    climo_temp, climo_std = climatology(lat, doy, lon, grid_doy)
+    ai_offset, bands = 0.0, None
+    table = residuals.get_table()
+    if table is not None and months is not None:
+        ai_offset, bands = table.lookup_many(months, days_ahead)
+    return blend(anchor, climo_temp, climo_std, days_ahead, ai_offset, bands)
+
+
+def to_responses(result: dict[str, np.ndarray]) -> list[dict]:
+    """
+    Round engine output into PredictionResponse-shaped dicts.
+    Uses Python's round() on plain floats so values are identical to the
+    scalar path.
+    """
+    cols = {name: values.tolist() for name, values in result.items()}
+    rows = []
+    for i in range(len(cols["temp"])):
+        anchor = cols["anchor"][i]
+        rows.append({
+            "temp": round(cols["temp"][i], 1),
+            "low80": round(cols["low80"][i], 1),
+            "high80": round(cols["high80"][i], 1),
+            "low95": round(cols["low95"][i], 1),
+            "high95": round(cols["high95"][i], 1),
+            "explain": {
+                # Same truthiness test as the scalar path (NaN means no forecast)
+                "anchor": round(anchor, 1) if anchor and not math.isnan(anchor) else None,
+                "climo": round(cols["climo"][i], 1),
+                "w_anchor": round(cols["w_anchor"][i], 2),
+                "ai_offset": round(cols["ai_offset"][i], 1),
+                "days_ahead": cols["days_ahead"][i],
+                "climo_std": round(cols["climo_std"][i], 1),
+            },
+        })
+    return rows
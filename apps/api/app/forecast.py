@@ -0,0 +1,259 @@
+"""
+Upstream forecast series from Open-Meteo.
+The full 16-day daily series (tmean, tmin, tmax) is fetched once per grid
+cell and cached; every lead day is answered from that stored series.
+
+Each series records the model run it holds ("run", ISO timestamp). Open-Meteo
+does not report it, so a fetch is stamped with the latest scheduled run
+unless its values are those of the series already cached for an earlier run:
+the new run has not been published yet (it is late), and the series keeps
+its earlier run and is retried after FORECAST_LATE_RETRY.
+"""
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Optional
+
+import httpx
+
+from app import cache, config, db, forecast_store, http_client, metrics, ratelimit, spatial, upstream
+from app.singleflight import SingleFlight
+
+# Open-Meteo's maximum daily horizon
+FORECAST_DAYS = 16
+
+# Upstream daily variable -> key in the stored series
+DAILY_VARIABLES = {
+    "temperature_2m_mean": "tmean",
+    "temperature_2m_min": "tmin",
+    "temperature_2m_max": "tmax",
+}
+
+# Concurrent misses for the same grid cell share one upstream call
+upstream_flight = SingleFlight(timeout=config.FORECAST_FETCH_TIMEOUT)
+
+# Background refreshes of stale cache entries, at most one per grid cell
+_revalidating: dict[str, asyncio.Task] = {}
+
+
+def series_key(grid_lat: float, grid_lon: float) -> str:
+    return str(spatial.forecast_cells.cell_id(grid_lat, grid_lon))
+
+
+def parse_series(daily: dict, grid_lat: float, grid_lon: float) -> Optional[dict]:
+    """Turn an Open-Meteo "daily" block into a stored series (None if tmean is missing)"""
+    if "temperature_2m_mean" not in daily:
+        return None
+    series = {"lat": grid_lat, "lon": grid_lon, "time": daily.get("time", [])}
+    for upstream_name, name in DAILY_VARIABLES.items():
+        series[name] = daily.get(upstream_name, [])
+    return series
+
+
+async def fetch_series(grid_lat: float, grid_lon: float) -> Optional[dict]:
+    """Fetch the full daily series for one grid cell (raises on HTTP errors)"""
+    return (await fetch_series_many([(grid_lat, grid_lon)]))[0]
+
+
+async def fetch_series_many(cells: list[tuple[float, float]]) -> list[Optional[dict]]:
+    """
+    Fetch series for several grid cells in one upstream call.
+    Open-Meteo takes comma-separated coordinates and answers with a list
+    (or a single object for one location), in request order.
+    """
+    # Shared pooled client (keep-alive, HTTP/2), see app/http_client.py
+    client = http_client.get_client()
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in cells),
+        "longitude": ",".join(str(lon) for _, lon in cells),
+        "daily": ",".join(DAILY_VARIABLES),
+        "forecast_days": FORECAST_DAYS,
+        "timezone": "auto"
+    }
+
+    async def request() -> httpx.Response:
+        # One token per location from the shared daily quota, taken per attempt
+        # (hedges included) once the guard has let the call through
+        decision = await ratelimit.take_upstream(len(cells))
+        if not decision.allowed:
+            raise ratelimit.BudgetExhausted(f"upstream budget exhausted, retry in {decision.retry_after:.0f}s")
+        started = time.perf_counter()
+        try:
+            response = await client.get(config.OPEN_METEO_URL, params=params)
+        except httpx.TransportError:
+            metrics.upstream_responses.inc(status="error")
+            raise
+        metrics.upstream_seconds.observe(time.perf_counter() - started)
+        metrics.upstream_responses.inc(status=str(response.status_code))
+        response.raise_for_status()
+        return response
+
+    # Bounded, adaptively timed, hedged and circuit-broken (see app/upstream.py)
+    response = await upstream.forecast_upstream.call(request)
+
+    data = response.json()
+    locations = data if isinstance(data, list) else [data]
+    results = []
+    for (grid_lat, grid_lon), location in zip(cells, locations):
+        daily = location.get("daily") if isinstance(location, dict) else None
+        results.append(parse_series(daily, grid_lat, grid_lon) if daily else None)
+    results.extend([None] * (len(cells) - len(results)))
+    await stamp_runs(cells, results)
+    return results
+
+
+def current_run() -> str:
+    return cache.latest_model_run().isoformat()
+
+
+def same_values(previous: dict, series: dict) -> bool:
+    """True if the series agree on every day they share (the upstream served the same run again)"""
+    old = dict(zip(previous.get("time") or [], previous.get("tmean") or []))
+    shared = [(day, value) for day, value in zip(series.get("time") or [], series.get("tmean") or []) if day in old]
+    return bool(shared) and all(old[day] == value for day, value in shared)
+
+
+async def stamp_runs(cells: list[tuple[float, float]], fetched: list[Optional[dict]]) -> None:
+    """Record the model run each freshly fetched series holds (see the module docstring)"""
+    current = current_run()
+    for cell, series in zip(cells, fetched):
+        if series is None:
+            continue
+        previous, _ = await cache.forecast_cache.get_stale(series_key(*cell))
+        late = previous is not None and previous.get("run", current) != current and same_values(previous, series)
+        series["run"] = previous["run"] if late else current
+
+
+def is_current(series: dict) -> bool:
+    """False for a series holding an earlier run than the latest one (unstamped series count as current)"""
+    return series.get("run", current_run()) == current_run()
+
+
+def series_ttl(series: dict) -> float:
+    """Cache lifetime: until the next model run, or until the retry for a late one"""
+    ttl = cache.model_run_ttl()
+    return ttl if is_current(series) else min(ttl, config.FORECAST_LATE_RETRY)
+
+
+async def get_series(lat: float, lon: float) -> Optional[dict]:
+    """
+    Return the cached series for the grid cell containing (lat, lon).
+    Lookup order: in-process/Redis cache, forecast_cache table, Open-Meteo.
+    An expired entry still inside its grace period is returned right away
+    and refreshed in the background (stale-while-revalidate).
+    """
+    # Nearby coordinates share one upstream grid cell and one cache entry
+    grid_lat, grid_lon = cache.snap_to_grid(lat, lon)
+    key = series_key(grid_lat, grid_lon)
+
+    series, stale = await cache.forecast_cache.get_stale(key)
+    if series is None:
+        series = await upstream_flight.do(key, lambda: _fetch_and_store(grid_lat, grid_lon, key))
+    elif stale:
+        revalidate(grid_lat, grid_lon)
+    return series
+
+
+def revalidate(grid_lat: float, grid_lon: float) -> None:
+    """Refresh one grid cell's series in the background (no-op if already running)"""
+    key = series_key(grid_lat, grid_lon)
+    if key in _revalidating:
+        return
+
+    async def run() -> None:
+        try:
+            with ratelimit.background():
+                await upstream_flight.do(key, lambda: _fetch_and_store(grid_lat, grid_lon, key))
+        except ratelimit.BudgetExhausted:
+            pass  # keep serving the stale entry
+        except Exception as e:
+            print(f"Error revalidating forecast: {e}")
+
+    task = asyncio.ensure_future(run())
+    _revalidating[key] = task
+    task.add_done_callback(lambda _: _revalidating.pop(key, None))
+
+
+def is_fresh(grid_lat: float, grid_lon: float) -> bool:
+    """True if the locally cached series for this cell is unexpired and from the latest model run"""
+    key = series_key(grid_lat, grid_lon)
+    series = cache.forecast_cache.local.peek(key)
+    return series is not None and cache.forecast_cache.local.is_fresh(key) and is_current(series)
+
+
+async def _fetch_and_store(grid_lat: float, grid_lon: float, key: str) -> Optional[dict]:
+    # Persistent tier first: another replica (or a previous process) may have it
+    if db.is_configured():
+        try:
+            series = await forecast_store.load_series(grid_lat, grid_lon)
+            if series is not None:
+                await cache.forecast_cache.set(key, series, series_ttl(series))
+                return series
+        except Exception as e:
+            print(f"Error loading stored forecast: {e}")
+
+    series = await fetch_series(grid_lat, grid_lon)
+    if series is not None:
+        await cache.forecast_cache.set(key, series, series_ttl(series))
+        forecast_store.store_series_background([series])
+    return series
+
+
+def value_for_day(
+    series: dict,
+    days_ahead: int,
+    variable: str = "tmean",
+    today: Optional[date] = None,
+) -> Optional[float]:
+    """
+    Look up one lead day in a stored series.
+    A series fetched before midnight starts a day early, so the index is
+    shifted by the age of its first date.
+    """
+    index = days_ahead
+    times = series.get("time") or []
+    if times:
+        today = today or datetime.now().date()
+        index += (today - date.fromisoformat(times[0])).days
+
+    values = series.get(variable) or []
+    if 0 <= index < len(values):
+        return values[index]
+    return None
+
+
+async def get_series_many(cells: list[tuple[float, float]]) -> dict[tuple[float, float], Optional[dict]]:
+    """
+    Series for many already-snapped grid cells.
+    Cache and forecast_cache hits are served first; the remaining cells are
+    fetched with one multi-location upstream call.
+    """
+    results: dict[tuple[float, float], Optional[dict]] = {}
+    missing = []
+    for cell in dict.fromkeys(cells):
+        series = await cache.forecast_cache.get(series_key(*cell))
+        if series is None:
+            missing.append(cell)
+        else:
+            results[cell] = series
+
+    if missing and db.is_configured():
+        try:
+            stored = await forecast_store.load_series_many(missing)
+        except Exception as e:
+            print(f"Error loading stored forecasts: {e}")
+            stored = {}
+        for cell, series in stored.items():
+            await cache.forecast_cache.set(series_key(*cell), series, series_ttl(series))
+            results[cell] = series
+        missing = [cell for cell in missing if cell not in stored]
+
+    if missing:
+        fetched = await fetch_series_many(missing)
+        for cell, series in zip(missing, fetched):
+            results[cell] = series
+            if series is not None:
+                await cache.forecast_cache.set(series_key(*cell), series, series_ttl(series))
+        forecast_store.store_series_background([s for s in fetched if s is not None])
+
+    return results
@@ -0,0 +1,149 @@
+"""
+Persistent forecast tier in the forecast_cache table.
+Forecast series are upserted in bulk (one row per target date) and read
+back before any network call, so they survive restarts and are shared
+across API replicas. A background sweeper deletes expired rows.
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from app import cache, config, db
+
+
+def series_to_rows(series: dict, run_time: datetime, expires_at: datetime) -> list[dict]:
+    """One forecast_cache row per target date; tmin/tmax go into the JSONB payload"""
+    rows = []
+    for i, day in enumerate(series.get("time") or []):
+        rows.append({
+            "lat": series["lat"],
+            "lon": series["lon"],
+            "run_time": run_time,
+            "target_date": date.fromisoformat(day),
+            "tmean": _at(series.get("tmean"), i),
+            "payload": {"tmin": _at(series.get("tmin"), i), "tmax": _at(series.get("tmax"), i)},
+            "expires_at": expires_at,
+        })
+    return rows
+
+
+def rows_to_series(rows: list, grid_lat: float, grid_lon: float) -> Optional[dict]:
+    """Rebuild a stored series from the rows of the newest run (rows sorted newest run first)"""
+    if not rows:
+        return None
+    newest = rows[0].run_time
+    run_rows = sorted((r for r in rows if r.run_time == newest), key=lambda r: r.target_date)
+    payloads = [r.payload or {} for r in run_rows]
+    return {
+        "lat": grid_lat,
+        "lon": grid_lon,
+        "time": [r.target_date.isoformat() for r in run_rows],
+        "tmean": [r.tmean for r in run_rows],
+        "tmin": [p.get("tmin") for p in payloads],
+        "tmax": [p.get("tmax") for p in payloads],
+        "run": newest.isoformat(),
+    }
+
+
+def _at(values: Optional[list], i: int) -> Optional[float]:
+    return values[i] if values and i < len(values) else None
+
+
+async def load_series(grid_lat: float, grid_lon: float) -> Optional[dict]:
+    """Newest unexpired series for a grid cell (uses idx_fc_latlon_target)"""
+    import sqlalchemy as sa
+
+    fc = db.forecast_cache
+    stmt = (
+        sa.select(fc.c.run_time, fc.c.target_date, fc.c.tmean, fc.c.payload)
+        .where(fc.c.lat == grid_lat, fc.c.lon == grid_lon, fc.c.expires_at > sa.func.now())
+        .order_by(fc.c.run_time.desc(), fc.c.target_date)
+    )
+    async with db.get_engine().connect() as conn:
+        rows = (await conn.execute(stmt)).all()
+    return rows_to_series(rows, grid_lat, grid_lon)
+
+
+async def load_series_many(cells: list[tuple[float, float]]) -> dict[tuple[float, float], dict]:
+    """Newest unexpired series for several grid cells in one query"""
+    import sqlalchemy as sa
+
+    fc = db.forecast_cache
+    stmt = (
+        sa.select(fc.c.lat, fc.c.lon, fc.c.run_time, fc.c.target_date, fc.c.tmean, fc.c.payload)
+        .where(sa.tuple_(fc.c.lat, fc.c.lon).in_(cells), fc.c.expires_at > sa.func.now())
+        .order_by(fc.c.lat, fc.c.lon, fc.c.run_time.desc(), fc.c.target_date)
+    )
+    async with db.get_engine().connect() as conn:
+        rows = (await conn.execute(stmt)).all()
+
+    by_cell: dict[tuple[float, float], list] = {}
+    for row in rows:
+        by_cell.setdefault((row.lat, row.lon), []).append(row)
+    return {cell: rows_to_series(cell_rows, *cell) for cell, cell_rows in by_cell.items()}
+
+
+async def store_series(series_list: list[dict]) -> int:
+    """Bulk upsert series into forecast_cache in one statement; returns rows written"""
+    from sqlalchemy.dialects.postgresql import insert
+
+    latest = cache.latest_model_run()
+    ttl = cache.model_run_ttl()
+    now = datetime.now(timezone.utc)
+    rows = []
+    for series in series_list:
+        # Stored under the run the series holds; a late upstream's repeat of an
+        # earlier run only lives until the retry (see app/forecast.py)
+        run_time = datetime.fromisoformat(series["run"]) if series.get("run") else latest
+        lifetime = ttl if run_time >= latest else min(ttl, config.FORECAST_LATE_RETRY)
+        rows.extend(series_to_rows(series, run_time, now + timedelta(seconds=lifetime)))
+    if not rows:
+        return 0
+
+    stmt = insert(db.forecast_cache).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_fc_lat_lon_run_target",
+        set_={
+            "tmean": stmt.excluded.tmean,
+            "payload": stmt.excluded.payload,
+            "expires_at": stmt.excluded.expires_at,
+        },
+    )
+    async with db.get_engine().begin() as conn:
+        await conn.execute(stmt)
+    return len(rows)
+
+
+def store_series_background(series_list: list[dict]) -> None:
+    """Write-behind upsert so the request does not wait on the database"""
+    if series_list:
+        db.write_behind(lambda: store_series(series_list), "forecast")
+
+
+async def sweep_expired(batch_size: int = config.FORECAST_SWEEP_BATCH) -> int:
+    """
+    Delete expired rows in small batches (uses idx_fc_expires) so the
+    sweeper never holds long locks; returns rows deleted.
+    """
+    import sqlalchemy as sa
+
+    fc = db.forecast_cache
+    total = 0
+    while True:
+        expired = sa.select(fc.c.id).where(fc.c.expires_at < sa.func.now()).limit(batch_size)
+        async with db.get_engine().begin() as conn:
+            result = await conn.execute(sa.delete(fc).where(fc.c.id.in_(expired.scalar_subquery())))
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def run_sweeper(interval: float = config.FORECAST_SWEEP_INTERVAL) -> None:
+    """Background loop started from the FastAPI lifespan (one sweep per interval across workers)"""
+    while True:
+        try:
+            if await cache.try_lock("forecast_sweep", interval * 0.9):
+                await sweep_expired()
+        except Exception as e:
+            print(f"Error sweeping forecast_cache: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,180 @@
+"""
+Gridded predictions for map rendering.
+A bounding box (or a slippy-map z/x/y tile) is sampled on a regular output
+grid. Forecast anchors are fetched for a much coarser lattice of upstream
+grid points in a few multi-location calls, bilinearly interpolated onto the
+output grid, and climatology plus blending run over the whole array at
+once. Results are returned as raw float32 or as a colored PNG tile.
+"""
+import asyncio
+import math
+import struct
+import zlib
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from app import cache, climo_grid, config, engine, forecast
+
+# Fields of engine.blend() a grid can be rendered from
+FIELDS = ("temp", "low80", "high80", "low95", "high95")
+
+# Rendered tiles per (z, x, y, date, field, size, format); expire with the forecast run
+tile_cache = cache.TTLCache(config.GRID_TILE_CACHE_SIZE)
+
+
+def bbox_axes(west: float, south: float, east: float, north: float, resolution: float) -> tuple[np.ndarray, np.ndarray]:
+    """Cell-centre latitudes (north to south) and longitudes (west to east) of a bbox"""
+    rows = max(1, int(math.ceil((north - south) / resolution - 1e-9)))
+    cols = max(1, int(math.ceil((east - west) / resolution - 1e-9)))
+    lats = north - (np.arange(rows) + 0.5) * resolution
+    lons = west + (np.arange(cols) + 0.5) * resolution
+    return np.clip(lats, south, north), np.clip(lons, west, east)
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(west, south, east, north) of a Web Mercator tile"""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tile_axes(z: int, x: int, y: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Pixel-centre latitudes (Mercator-spaced rows) and longitudes of a tile"""
+    n = 2 ** z
+    row = y + (np.arange(size) + 0.5) / size
+    col = x + (np.arange(size) + 0.5) / size
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n))))
+    lons = col / n * 360.0 - 180.0
+    return lats, lons
+
+
+def anchor_lattice(lats: np.ndarray, lons: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Upstream grid points covering the output axes, at most
+    GRID_MAX_ANCHORS_PER_SIDE per axis. Spacing is a multiple of the
+    forecast grid so every point is an exact (cacheable) forecast cell.
+    """
+    step = config.FORECAST_GRID_DEG
+
+    def axis(values: np.ndarray) -> np.ndarray:
+        low, high = float(values.min()), float(values.max())
+        spacing = step * max(1, math.ceil((high - low) / step / max(config.GRID_MAX_ANCHORS_PER_SIDE - 1, 1)))
+        start = math.floor(low / spacing) * spacing
+        count = int(math.ceil((high - start) / spacing - 1e-9)) + 1
+        return np.round(start + np.arange(count) * spacing, 4)
+
+    return axis(lats), axis(lons)
+
+
+def interpolate(values: np.ndarray, axis_lats: np.ndarray, axis_lons: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Bilinear interpolation of a (lat, lon) lattice onto output axes (NaN corners give NaN)"""
+
+    def weights(axis: np.ndarray, points: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if len(axis) == 1:
+            zeros = np.zeros(len(points), dtype=np.int64)
+            return zeros, zeros, np.zeros(len(points))
+        f = np.clip((points - axis[0]) / (axis[1] - axis[0]), 0, len(axis) - 1)
+        i0 = np.minimum(np.floor(f).astype(np.int64), len(axis) - 2)
+        return i0, i0 + 1, f - i0
+
+    y0, y1, wy = weights(axis_lats, lats)
+    x0, x1, wx = weights(axis_lons, lons)
+    wy, wx = wy[:, None], wx[None, :]
+    top = (1 - wx) * values[y0][:, x0] + wx * values[y0][:, x1]
+    bottom = (1 - wx) * values[y1][:, x0] + wx * values[y1][:, x1]
+    return (1 - wy) * top + wy * bottom
+
+
+async def forecast_anchors(lats: np.ndarray, lons: np.ndarray, days_ahead: int) -> np.ndarray:
+    """Forecast anchor per output cell (NaN where no forecast is available)"""
+    anchor_lats, anchor_lons = anchor_lattice(lats, lons)
+    # Lattice points just past the poles or the antimeridian snap to the nearest valid cell
+    cells = [cache.snap_to_grid(float(la), float(lo)) for la in anchor_lats for lo in anchor_lons]
+    # One multi-location call per chunk, all chunks in parallel
+    chunk_size = config.BATCH_UPSTREAM_CHUNK
+    chunks = await asyncio.gather(
+        *(forecast.get_series_many(cells[i:i + chunk_size]) for i in range(0, len(cells), chunk_size)),
+        return_exceptions=True,
+    )
+    series: dict[tuple[float, float], Optional[dict]] = {}
+    for chunk in chunks:
+        if isinstance(chunk, BaseException):
+            print(f"Error fetching forecast: {chunk}")
+        else:
+            series.update(chunk)
+
+    anchor_day = min(days_ahead, 10)
+    values = np.full(len(cells), np.nan)
+    for i, cell in enumerate(cells):
+        cell_series = series.get(cell)
+        value = forecast.value_for_day(cell_series, anchor_day) if cell_series else None
+        if value is not None:
+            values[i] = value
+    values = values.reshape(len(anchor_lats), len(anchor_lons))
+    return interpolate(values, anchor_lats, anchor_lons, lats, lons)
+
+
+async def predict_grid(
+    lats: np.ndarray, lons: np.ndarray, target_date: date, days_ahead: int, field: str = "temp"
+) -> tuple[np.ndarray, bool]:
+    """
+    (rows, cols) float32 field for every combination of the output axes, and
+    whether every cell had a forecast anchor (False when some fell back to
+    climatology because the upstream was unavailable)
+    """
+    anchors = await forecast_anchors(lats, lons, days_ahead)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+    n = lat_grid.size
+    result = engine.predict(
+        lat_grid.ravel(),
+        lon_grid.ravel(),
+        target_date.timetuple().tm_yday,
+        anchors.ravel(),
+        np.full(n, days_ahead),
+        months=np.full(n, target_date.month),
+        grid_doy=climo_grid.calendar_day(target_date),
+    )
+    return result[field].reshape(lat_grid.shape).astype(np.float32), not np.isnan(anchors).any()
+
+
+# Colour ramp for PNG tiles: (degrees C, RGB)
+COLOR_STOPS = (
+    (-40.0, (49, 54, 149)),
+    (-20.0, (69, 117, 180)),
+    (-5.0, (116, 173, 209)),
+    (5.0, (224, 243, 248)),
+    (15.0, (254, 224, 144)),
+    (25.0, (253, 174, 97)),
+    (35.0, (244, 109, 67)),
+    (45.0, (165, 0, 38)),
+)
+
+
+def colorize(values: np.ndarray) -> np.ndarray:
+    """(rows, cols, 4) uint8 RGBA; NaN cells are transparent"""
+    stops = np.array([t for t, _ in COLOR_STOPS])
+    colors = np.array([c for _, c in COLOR_STOPS], dtype=np.float64)
+    filled = np.nan_to_num(values, nan=stops[0])
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.round(np.interp(filled, stops, colors[:, channel]))
+    rgba[..., 3] = np.where(np.isnan(values), 0, 255)
+    return rgba
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Minimal RGBA PNG encoder (no imaging dependency needed)"""
+    height, width = rgba.shape[:2]
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    # Filter type 0 (none) at the start of every scanline
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b"")
@@ -0,0 +1,151 @@
+"""
+Shared, app-lifetime HTTP client for upstream calls (Open-Meteo).
+One pooled httpx.AsyncClient with keep-alive and HTTP/2 replaces the
+per-request client, so repeat calls skip the TCP and TLS handshake.
+"""
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+from app import config
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_transport: Optional[httpx.AsyncBaseTransport] = None
+# Record/replay transport from UPSTREAM_RECORD_PATH / UPSTREAM_REPLAY_PATH, built on first use
+_offline: Optional[httpx.AsyncBaseTransport] = None
+
+
+class PoolStats:
+    """Counters for sizing the connection pool"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections_opened = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+_stats = PoolStats()
+
+
+async def _on_request(request: httpx.Request) -> None:
+    """
+    Attach an httpcore trace hook to each request.
+    The time until the first connection event is how long the request
+    waited in the pool for a free connection.
+    """
+    started = time.perf_counter()
+    seen_first = False
+    _stats.requests += 1
+
+    async def trace(event_name: str, info: dict) -> None:
+        nonlocal seen_first
+        if not seen_first:
+            seen_first = True
+            _stats.record_wait(time.perf_counter() - started)
+        if event_name == "connection.connect_tcp.started":
+            _stats.connections_opened += 1
+
+    request.extensions["trace"] = trace
+
+
+def _offline_transport() -> Optional[httpx.AsyncBaseTransport]:
+    global _offline
+    if _offline is None and (config.UPSTREAM_REPLAY_PATH or config.UPSTREAM_RECORD_PATH):
+        from app import replay
+        _offline = replay.from_config()
+    return _offline
+
+
+def create_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Build the pooled client from config (transport can be swapped for tests)"""
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        config.HTTP_TIMEOUT,
+        connect=config.HTTP_CONNECT_TIMEOUT,
+        pool=config.HTTP_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(
+        http2=config.HTTP2_ENABLED,
+        limits=limits,
+        timeout=timeout,
+        transport=transport or _transport or _offline_transport(),
+        event_hooks={"request": [_on_request]},
+    )
+
+
+async def startup(transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+    """Create the shared client (called from the FastAPI lifespan)"""
+    global _client, _client_loop
+    if _client is None:
+        _client = create_client(transport)
+        _client_loop = asyncio.get_running_loop()
+
+
+async def shutdown() -> None:
+    """Close the shared client and its pooled connections (and write a recording)"""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    if _offline is not None and hasattr(_offline, "save"):
+        _offline.save()
+    _client = None
+    _client_loop = None
+
+
+def use_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """
+    Route all upstream calls through a custom transport (mock or replay).
+    The current client is dropped so the next call picks it up.
+    """
+    global _transport, _client, _client_loop
+    _transport = transport
+    _client = None
+    _client_loop = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared client.
+    Falls back to creating one lazily when the lifespan did not run
+    (scripts, TestClient without a context manager). Pooled connections
+    are bound to an event loop, so a client from a different loop is replaced.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = create_client()
+        _client_loop = loop
+    return _client
+
+
+def pool_stats() -> dict:
+    """In-use/idle connection counts and pool wait times"""
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    pending = list(getattr(pool, "_requests", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    return {
+        "connections": len(connections),
+        "in_use": len(connections) - idle,
+        "idle": idle,
+        "queued": sum(1 for r in pending if r.is_queued()),
+        "max_connections": config.HTTP_MAX_CONNECTIONS,
+        "max_keepalive": config.HTTP_MAX_KEEPALIVE,
+        "http2": config.HTTP2_ENABLED,
+        "requests": _stats.requests,
+        "connections_opened": _stats.connections_opened,
+        "wait_avg_ms": round(1000 * _stats.wait_total / _stats.requests, 3) if _stats.requests else 0.0,
+        "wait_max_ms": round(1000 * _stats.wait_max, 3),
+    }
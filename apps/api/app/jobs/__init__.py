@@ -0,0 +1 @@
+# Offline jobs, run as `python -m app.jobs.<name>` from apps/api
@@ -0,0 +1,118 @@
+"""
+Aggregate the residuals table into per-(month, lead_days) lookup tables.
+
+Each cell holds the sample count, mean bias and the 2.5/10/90/97.5%
+empirical quantiles of resid = observed - predicted for tmean. Leads past
+--max-lead are pooled into the last lead row (the row the API looks them
+up in), whichever source the residuals come from. The result
+is written atomically to RESIDUALS_PATH, where running API processes pick
+it up on their next reload check.
+
+With --source the residuals are read from a columnar export
+(app.jobs.export_columnar, memory-mapped) instead of the database.
+
+Usage (from apps/api):
+    python -m app.jobs.aggregate_residuals --out data/residuals.npy
+    python -m app.jobs.aggregate_residuals --source data/export/residuals
+"""
+import argparse
+import os
+import time
+from typing import Iterable
+
+import numpy as np
+import sqlalchemy as sa
+
+from app import config, residuals
+
+QUANTILES = (0.025, 0.1, 0.9, 0.975)
+
+# Grouped on idx_residuals_key (month, lead_days, variable); leads past
+# :max_lead are pooled into the last lead
+AGGREGATE_SQL = sa.text("""
+    SELECT month, LEAST(lead_days, :max_lead) AS lead, count(*) AS n, avg(resid) AS mean,
+           percentile_cont(ARRAY[0.025, 0.1, 0.9, 0.975]) WITHIN GROUP (ORDER BY resid) AS q
+    FROM residuals
+    WHERE variable = :variable AND month BETWEEN 1 AND 12 AND lead_days >= 0
+    GROUP BY month, LEAST(lead_days, :max_lead)
+""")
+
+
+def empty_table(max_lead: int = config.RESIDUALS_MAX_LEAD) -> np.ndarray:
+    return np.zeros((12, max_lead + 1, len(residuals.STATS)), dtype=np.float32)
+
+
+def build_table(rows: Iterable, max_lead: int = config.RESIDUALS_MAX_LEAD) -> np.ndarray:
+    """Table from (month, lead_days, count, mean, [q025, q10, q90, q975]) rows, already pooled past max_lead by AGGREGATE_SQL"""
+    data = empty_table(max_lead)
+    for month, lead, count, mean, quantiles in rows:
+        data[month - 1, min(lead, max_lead)] = (count, mean, *quantiles)
+    return data
+
+
+def aggregate_arrays(month: np.ndarray, lead_days: np.ndarray, resid: np.ndarray, max_lead: int = config.RESIDUALS_MAX_LEAD) -> np.ndarray:
+    """
+    Same statistics computed in memory (used by the backtest and for fixtures).
+    Leads beyond max_lead are pooled into the last row.
+    """
+    month = np.asarray(month, dtype=np.int64)
+    lead = np.clip(np.asarray(lead_days, dtype=np.int64), 0, max_lead)
+    resid = np.asarray(resid, dtype=np.float64)
+
+    # Sort once by cell, then take quantiles per contiguous group
+    cell = (month - 1) * (max_lead + 1) + lead
+    order = np.lexsort((resid, cell))
+    cell, resid = cell[order], resid[order]
+    starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+    ends = np.r_[starts[1:], len(cell)]
+
+    data = empty_table(max_lead)
+    flat = data.reshape(-1, len(residuals.STATS))
+    for start, end in zip(starts, ends):
+        values = resid[start:end]
+        flat[cell[start]] = (len(values), values.mean(), *np.quantile(values, QUANTILES))
+    return data
+
+
+def aggregate_export(path: str, variable: str = "tmean", max_lead: int = config.RESIDUALS_MAX_LEAD) -> np.ndarray:
+    """Table from exported residuals files (long leads pooled like aggregate_arrays); only the three needed columns are kept in memory"""
+    from app.jobs.export_columnar import read_batches
+
+    parts: dict[str, list[np.ndarray]] = {"month": [], "lead_days": [], "resid": []}
+    for chunk in read_batches(path, columns=("month", "lead_days", "variable", "resid")):
+        keep = (chunk["variable"] == variable) & (chunk["month"] >= 1) & (chunk["month"] <= 12) & (chunk["lead_days"] >= 0)
+        for name in parts:
+            parts[name].append(chunk[name][keep])
+    if not parts["resid"]:
+        return empty_table(max_lead)
+    return aggregate_arrays(*(np.concatenate(parts[name]) for name in ("month", "lead_days", "resid")), max_lead)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=config.RESIDUALS_PATH)
+    parser.add_argument("--variable", default="tmean")
+    parser.add_argument("--max-lead", type=int, default=config.RESIDUALS_MAX_LEAD)
+    parser.add_argument("--source", help="exported residuals (file or directory) to read instead of the database")
+    parser.add_argument("--database-url", default=config.SYNC_DATABASE_URL)
+    args = parser.parse_args(argv)
+    if not args.source and not args.database_url:
+        raise SystemExit("SYNC_DATABASE_URL is not set (or pass --source)")
+
+    started = time.perf_counter()
+    if args.source:
+        data = aggregate_export(args.source, args.variable, args.max_lead)
+    else:
+        engine = sa.create_engine(args.database_url)
+        with engine.connect() as conn:
+            rows = conn.execute(AGGREGATE_SQL, {"variable": args.variable, "max_lead": args.max_lead}).all()
+        data = build_table(rows, args.max_lead)
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    residuals.save(args.out, data)
+    cells = int((data[..., residuals.COUNT] > 0).sum())
+    print(f"Wrote {args.out}: {cells} (month, lead) cells in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
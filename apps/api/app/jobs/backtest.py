@@ -0,0 +1,261 @@
+"""
+Backtest the prediction blend against historical forecasts and observations.
+
+Replays the logic of /api/predict (forecast anchor for min(lead, 10) days,
+climatology, anchor weight 0.5 ** ((lead - 10) / 7), heuristic bands) for
+every issue date and lead day in the fixtures, scores it (MAE, Gaussian
+CRPS, 80/95% band coverage) and records a backtest_runs summary plus the
+per-sample residuals (observed - predicted) in the residuals table.
+Work is sharded by location across a process pool and scored with NumPy.
+
+Input files are CSV, Parquet or Arrow IPC (memory-mapped), or directories
+written by app.jobs.export_columnar:
+    forecasts:    lat, lon, issue_date, date, tmean
+    observations: lat, lon, date, tmean
+A predictions export is not a forecast source and is rejected: its t_p50
+is already blended and offset-corrected, and the table keeps one row per
+target date, so it has no lead-time history.
+
+Usage (from apps/api):
+    python -m app.jobs.backtest --forecasts data/hist_fc.parquet \\
+        --observations data/obs.parquet --workers 8 --aggregate
+"""
+import argparse
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from app import climo_grid, config, engine, residuals
+from app.jobs.aggregate_residuals import aggregate_arrays
+from app.jobs.ingest_climatology import read_chunks
+
+# Forecast lead that anchors long-range predictions (see get_forecast_anchor)
+ANCHOR_LEAD = 10
+
+# z-score of the 90th percentile: the 80% band half-width is Z80 standard deviations
+Z80 = 1.2815515655446004
+
+
+def read_table(path: str, columns: tuple[str, ...]) -> dict[str, np.ndarray]:
+    """Read a whole CSV/Parquet file into column arrays (dates as day numbers)"""
+    parts: dict[str, list] = {name: [] for name in columns}
+    for chunk in read_chunks(path, 500_000):
+        if "t_p50" in chunk:
+            raise SystemExit(f"{path} is a predictions export; backtest needs raw forecasts ({', '.join(columns)})")
+        for name in columns:
+            parts[name].append(chunk[name])
+    table = {name: np.concatenate(values) if values else np.array([]) for name, values in parts.items()}
+    for name in columns:
+        if name.endswith("date"):
+            table[name] = np.asarray(table[name]).astype("datetime64[D]").astype(np.int64)
+        else:
+            table[name] = table[name].astype(np.float64)
+    return table
+
+
+def location_keys(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Stable int64 id per coordinate pair (1e-4 degree resolution)"""
+    return np.round(lat * 1e4).astype(np.int64) * 4_000_000 + np.round(lon * 1e4).astype(np.int64)
+
+
+def shard_tables(forecasts: dict, observations: dict, shards: int) -> list[tuple[dict, dict]]:
+    """Split both tables by location so every shard is self-contained"""
+    fc_shard = location_keys(forecasts["lat"], forecasts["lon"]) % shards
+    obs_shard = location_keys(observations["lat"], observations["lon"]) % shards
+    return [
+        (
+            {name: values[fc_shard == s] for name, values in forecasts.items()},
+            {name: values[obs_shard == s] for name, values in observations.items()},
+        )
+        for s in range(shards)
+    ]
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    """Abramowitz & Stegun 7.1.26 (|error| < 1.5e-7); NumPy has no erf"""
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+def crps_gaussian(obs: np.ndarray, mu: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+    """Closed-form CRPS of a normal forecast N(mu, sigma) against the observation"""
+    z = (obs - mu) / sigma
+    cdf = 0.5 * (1.0 + _erf(z / np.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z * z) / np.sqrt(2.0 * np.pi)
+    return sigma * (z * (2.0 * cdf - 1.0) + 2.0 * pdf - 1.0 / np.sqrt(np.pi))
+
+
+def score_shard(forecasts: dict, observations: dict, max_lead: int) -> dict[str, np.ndarray]:
+    """
+    Replay and score every (location, issue date, lead day) in one shard.
+    Returns residual samples and per-lead score sums.
+    """
+    # Leads 0-10 use the forecast for that day; longer leads reuse the day-10 anchor
+    fc_lead = forecasts["date"] - forecasts["issue_date"]
+    direct = (fc_lead >= 0) & (fc_lead <= min(ANCHOR_LEAD, max_lead))
+    anchored = fc_lead == ANCHOR_LEAD
+    extra_leads = np.arange(ANCHOR_LEAD + 1, max_lead + 1)
+
+    def expand(values: np.ndarray) -> np.ndarray:
+        return np.concatenate([values[direct], np.repeat(values[anchored], len(extra_leads))])
+
+    lat = expand(forecasts["lat"])
+    lon = expand(forecasts["lon"])
+    anchor = expand(forecasts["tmean"])
+    lead = np.concatenate([fc_lead[direct], np.tile(extra_leads, int(anchored.sum()))])
+    target = expand(forecasts["issue_date"]) + lead
+
+    # Join observations on (location, target day)
+    obs_key = location_keys(observations["lat"], observations["lon"]) * 100_000 + observations["date"]
+    order = np.argsort(obs_key)
+    obs_key, obs_value = obs_key[order], observations["tmean"][order]
+    key = location_keys(lat, lon) * 100_000 + target
+    pos = np.clip(np.searchsorted(obs_key, key), 0, max(len(obs_key) - 1, 0))
+    found = (obs_key[pos] == key) & ~np.isnan(obs_value[pos]) if len(obs_key) else np.zeros(len(key), dtype=bool)
+
+    lat, lon, anchor, lead, target = lat[found], lon[found], anchor[found], lead[found], target[found]
+    observed = obs_value[pos[found]]
+
+    dates = target.astype("datetime64[D]")
+    doy = (dates - dates.astype("datetime64[Y]")).astype(np.int64) + 1
+    month = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+    # Base blend only: the residuals are what the AI offset is learned from
+    result = engine.predict(lat, lon, doy, anchor, lead, grid_doy=climo_grid.calendar_days(dates))
+    predicted = result["temp"]
+    resid = observed - predicted
+    sigma = (result["high80"] - result["low80"]) / (2 * Z80)
+    in80 = (observed >= result["low80"]) & (observed <= result["high80"])
+    in95 = (observed >= result["low95"]) & (observed <= result["high95"])
+
+    bins = max_lead + 1
+    return {
+        "month": month.astype(np.int16),
+        "lead": lead.astype(np.int16),
+        "resid": resid.astype(np.float32),
+        "n": np.bincount(lead, minlength=bins),
+        "abs_err": np.bincount(lead, weights=np.abs(resid), minlength=bins),
+        "crps": np.bincount(lead, weights=crps_gaussian(observed, predicted, sigma), minlength=bins),
+        "in80": np.bincount(lead, weights=in80, minlength=bins),
+        "in95": np.bincount(lead, weights=in95, minlength=bins),
+    }
+
+
+def summarize(parts: list[dict]) -> dict:
+    """Combine shard sums into overall and per-lead scores"""
+    totals = {name: sum(p[name] for p in parts) for name in ("n", "abs_err", "crps", "in80", "in95")}
+    n = totals["n"]
+    count = int(n.sum())
+
+    def ratio(values: np.ndarray) -> Optional[float]:
+        return round(float(values.sum() / count), 4) if count else None
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        per_lead = {
+            str(lead): {
+                "n": int(n[lead]),
+                "mae": round(float(totals["abs_err"][lead] / n[lead]), 4),
+                "crps": round(float(totals["crps"][lead] / n[lead]), 4),
+                "coverage80": round(float(totals["in80"][lead] / n[lead]), 4),
+                "coverage95": round(float(totals["in95"][lead] / n[lead]), 4),
+            }
+            for lead in np.flatnonzero(n)
+        }
+    return {
+        "samples": count,
+        "mae": ratio(totals["abs_err"]),
+        "crps": ratio(totals["crps"]),
+        "coverage80": ratio(totals["in80"]),
+        "coverage95": ratio(totals["in95"]),
+        "by_lead": per_lead,
+    }
+
+
+def run_backtest(forecasts: dict, observations: dict, max_lead: int, workers: int) -> tuple[dict, dict[str, np.ndarray]]:
+    """Score all shards in a process pool; returns (summary, residual samples)"""
+    shards = shard_tables(forecasts, observations, max(workers * 4, 1))
+    # Workers score against the same climatology grid as the API
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=climo_grid.load, initargs=(config.CLIMO_GRID_PATH,)
+    ) as pool:
+        parts = list(pool.map(score_shard, *zip(*shards), [max_lead] * len(shards)))
+    samples = {name: np.concatenate([p[name] for p in parts]) for name in ("month", "lead", "resid")}
+    return summarize(parts), samples
+
+
+def write_results(database_url: str, params: dict, summary: dict, samples: dict, started_at: datetime) -> None:
+    """COPY residuals and insert the backtest_runs row in one transaction"""
+    import psycopg2
+    from psycopg2.extras import Json
+
+    buffer = io.StringIO()
+    np.savetxt(
+        buffer,
+        np.column_stack([samples["month"], samples["lead"], samples["resid"]]),
+        fmt=("%d", "%d", "%.3f"),
+        delimiter="\t",
+    )
+    buffer.seek(0)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert("COPY residuals (month, lead_days, resid) FROM STDIN", buffer)
+            cur.execute(
+                "INSERT INTO backtest_runs (started_at, finished_at, params, summary) VALUES (%s, now(), %s, %s)",
+                (started_at, Json(params), Json(summary)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--forecasts", required=True)
+    parser.add_argument("--observations", required=True)
+    parser.add_argument("--max-lead", type=int, default=config.RESIDUALS_MAX_LEAD)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--aggregate", action="store_true", help="also rebuild the residual lookup table")
+    parser.add_argument("--no-db", action="store_true", help="print the summary without writing to the database")
+    parser.add_argument("--database-url", default=config.SYNC_DATABASE_URL)
+    args = parser.parse_args(argv)
+    if not args.no_db and not args.database_url:
+        raise SystemExit("SYNC_DATABASE_URL is not set (or pass --no-db)")
+
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    forecasts = read_table(args.forecasts, ("lat", "lon", "issue_date", "date", "tmean"))
+    observations = read_table(args.observations, ("lat", "lon", "date", "tmean"))
+    summary, samples = run_backtest(forecasts, observations, args.max_lead, args.workers)
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 2)
+
+    params = {
+        "forecasts": args.forecasts,
+        "observations": args.observations,
+        "max_lead": args.max_lead,
+        "workers": args.workers,
+    }
+    if not args.no_db:
+        write_results(args.database_url, params, summary, samples, started_at)
+    if args.aggregate:
+        os.makedirs(os.path.dirname(config.RESIDUALS_PATH) or ".", exist_ok=True)
+        residuals.save(config.RESIDUALS_PATH, aggregate_arrays(samples["month"], samples["lead"], samples["resid"], args.max_lead))
+
+    overview = {k: v for k, v in summary.items() if k != "by_lead"}
+    print(json.dumps(overview, indent=2))
+    print(f"{summary['samples'] / max(elapsed, 1e-9):,.0f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
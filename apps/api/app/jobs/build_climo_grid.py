@@ -0,0 +1,112 @@
+"""
+Export climatology_daily into the memory-mapped grid file used by the API.
+
+Rows are snapped onto cells of --resolution degrees (FORECAST_GRID_DEG by
+default), so unsnapped station data cannot blow up the grid.
+
+Usage (from apps/api):
+    python -m app.jobs.build_climo_grid --out data/climo_grid.npy --resolution 0.25
+"""
+import argparse
+import itertools
+import os
+import time
+from typing import Iterable
+
+import numpy as np
+import sqlalchemy as sa
+
+from app import climo_grid, config, db, spatial
+
+
+def grid_axes(
+    lats: Iterable[float], lons: Iterable[float], resolution: float = config.FORECAST_GRID_DEG
+) -> tuple[float, float, int, float, float, int]:
+    """
+    Axes of the cells of a fixed resolution (app/spatial.py centres) covering
+    the latitudes/longitudes in the table. The resolution is fixed rather
+    than inferred from the data: two stations a few metres apart would
+    otherwise make the step, and the grid, arbitrarily fine.
+    """
+    cells = spatial.cell_grid(resolution)
+    rows = [cells.index(lat, 0.0)[0] for lat in lats]
+    cols = [cells.index(0.0, lon)[1] for lon in lons]
+    lat0, lon0 = cells.center(min(rows) * cells.cols + min(cols))
+    return lat0, resolution, max(rows) - min(rows) + 1, lon0, resolution, max(cols) - min(cols) + 1
+
+
+def build_grid(
+    rows: Iterable, lat0: float, dlat: float, nlat: int, lon0: float, dlon: float, nlon: int, batch_rows: int = 100_000
+) -> np.ndarray:
+    """
+    Fill a (variable, lat, lon, 366) float32 array from (lat, lon, doy, tmean, tmin, tmax) rows.
+    Rows are snapped to the nearest cell; several rows in one cell (stations)
+    are averaged. Cells without data stay NaN. On the grid's leap-year calendar
+    (climo_grid.calendar_day) February 29 is day 60, which sources without
+    leap years never fill; where it is missing it is the mean of days 59 and 61.
+    """
+    shape = (len(climo_grid.VARIABLES), nlat, nlon, climo_grid.DAYS)
+    data = np.zeros(shape, dtype=np.float32)
+    counts = np.zeros(shape, dtype=np.uint16)
+    cols = int(round(360.0 / dlon))
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_rows))
+        if not batch:
+            break
+        columns = np.array(batch, dtype=np.float64)  # None becomes NaN
+        y = np.round((columns[:, 0] - lat0) / dlat).astype(np.int64)
+        x = np.round(np.mod(columns[:, 1] - lon0, 360.0) / dlon).astype(np.int64) % cols
+        day = columns[:, 2].astype(np.int64) - 1
+        inside = (y >= 0) & (y < nlat) & (x < nlon)
+        for v in range(len(climo_grid.VARIABLES)):
+            valid = inside & ~np.isnan(columns[:, 3 + v])
+            index = (v, y[valid], x[valid], day[valid])
+            np.add.at(data, index, columns[valid, 3 + v])
+            np.add.at(counts, index, 1)
+    # In place: the grid can be most of the available memory
+    np.divide(data, counts, out=data, where=counts > 0)
+    data[counts == 0] = np.nan
+
+    leap_missing = np.isnan(data[..., 59])
+    data[..., 59][leap_missing] = ((data[..., 58] + data[..., 60]) / 2)[leap_missing]
+    return data
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=config.CLIMO_GRID_PATH, help="output .npy path")
+    parser.add_argument("--resolution", type=float, default=config.FORECAST_GRID_DEG, help="grid cell size (degrees)")
+    parser.add_argument("--database-url", default=config.SYNC_DATABASE_URL)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("SYNC_DATABASE_URL is not set")
+
+    started = time.perf_counter()
+    engine = sa.create_engine(args.database_url)
+    table = db.climatology_daily
+    with engine.connect() as conn:
+        bounds = conn.execute(sa.select(
+            sa.func.min(table.c.lat), sa.func.max(table.c.lat), sa.func.min(table.c.lon), sa.func.max(table.c.lon)
+        )).one()
+        if bounds[0] is None:
+            raise SystemExit("climatology_daily is empty")
+        axes = grid_axes(bounds[:2], bounds[2:], args.resolution)
+
+        # Server-side cursor keeps memory flat for a global grid
+        rows = conn.execution_options(stream_results=True, yield_per=50_000).execute(
+            sa.select(table.c.lat, table.c.lon, table.c.doy, table.c.tmean, table.c.tmin, table.c.tmax)
+        )
+        data = build_grid(rows, *axes)
+
+    lat0, dlat, nlat, lon0, dlon, nlon = axes
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    climo_grid.save(args.out, data, lat0, dlat, lon0, dlon)
+    print(
+        f"Wrote {args.out}: {nlat} x {nlon} cells, {data.nbytes / 1e6:.1f} MB "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
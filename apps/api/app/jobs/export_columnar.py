@@ -0,0 +1,357 @@
+"""
+Export the predictions and residuals tables as columnar files for offline
+analytics.
+
+Rows are streamed through a server-side cursor in batches of --batch-rows
+and written to Parquet (zstd) or Arrow IPC files partitioned by month and
+lead day:
+
+    <out>/<table>/month=07/lead=03/part-000.parquet
+
+Memory stays bounded: partition buffers are flushed into their (open)
+file once they reach --batch-rows, and all of them once more than
+--max-buffered-rows are held. At most --max-open-files files are open at
+once; the least recently written one is finished when another is needed,
+and a partition written to again afterwards continues in a new part file
+(part-000-1.parquet, ...). With --workers N the months are split
+across N processes (worker i exports the months where (month - 1) % N == i),
+so no two processes write the same partition.
+
+Arrow IPC files are uncompressed and can be memory-mapped without a copy;
+read_batches() reads either format (and whole export directories) through
+memory maps. app.jobs.ingest_climatology.read_chunks() delegates to it, so
+the backtest and aggregate_residuals --source read exports directly.
+
+Usage (from apps/api):
+    python -m app.jobs.export_columnar --table residuals --out data/export --format arrow
+    python -m app.jobs.export_columnar --table predictions --since 2025-01-01 --workers 4
+"""
+import argparse
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from app import config
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Exported columns per table, as (name, Arrow type name); month and lead_days
+# are the partition keys and stay in the files so each file is self-contained
+COLUMNS = {
+    "predictions": (
+        ("lat", "float64"),
+        ("lon", "float64"),
+        ("target_date", "date32"),
+        ("month", "int16"),
+        ("lead_days", "int16"),
+        ("t_p50", "float32"),
+        ("t_p10", "float32"),
+        ("t_p90", "float32"),
+        ("method", "string"),
+        ("created_at", "timestamp"),
+    ),
+    "residuals": (
+        ("month", "int16"),
+        ("lead_days", "int16"),
+        ("variable", "string"),
+        ("resid", "float32"),
+        ("created_at", "timestamp"),
+    ),
+}
+
+# SELECT lists matching COLUMNS; the lead of a prediction is the days from
+# when it was made to its target date
+SELECT_SQL = {
+    "predictions": """
+        SELECT lat, lon, target_date,
+               EXTRACT(MONTH FROM target_date)::int AS month,
+               GREATEST(target_date - created_at::date, 0) AS lead_days,
+               t_p50, t_p10, t_p90, method, created_at
+        FROM predictions
+    """,
+    "residuals": """
+        SELECT month, lead_days, variable, resid, created_at
+        FROM residuals
+    """,
+}
+
+# Rows without a (month, lead) partition key are skipped; both are nullable
+# in the tables (a prediction's lead comes from its created_at)
+KEY_NOT_NULL = {
+    "predictions": "target_date IS NOT NULL AND created_at IS NOT NULL",
+    "residuals": "month IS NOT NULL AND lead_days IS NOT NULL",
+}
+
+# Column holding the month each table is sharded on
+MONTH_SQL = {
+    "predictions": "EXTRACT(MONTH FROM target_date)::int",
+    "residuals": "month",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise SystemExit("Columnar export needs pyarrow (pip install pyarrow)")
+    return pa
+
+
+def schema(table: str):
+    pa = _pyarrow()
+    types = {
+        "float64": pa.float64(),
+        "float32": pa.float32(),
+        "int16": pa.int16(),
+        "date32": pa.date32(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS[table]])
+
+
+def build_query(table: str, shard: int = 0, workers: int = 1, since: Optional[str] = None, until: Optional[str] = None) -> tuple[str, dict]:
+    """SELECT for one worker's months, optionally limited to rows created in [since, until)"""
+    conditions, params = [KEY_NOT_NULL[table]], {}
+    if workers > 1:
+        conditions.append(f"({MONTH_SQL[table]} - 1) % :workers = :shard")
+        params.update(workers=workers, shard=shard)
+    if since:
+        conditions.append("created_at >= :since")
+        params["since"] = since
+    if until:
+        conditions.append("created_at < :until")
+        params["until"] = until
+    sql = SELECT_SQL[table].rstrip() + "\n        WHERE " + " AND ".join(conditions)
+    return sql, params
+
+
+def partition_path(root: str, table: str, month: int, lead: int, shard: int, fmt: str, part: int = 0) -> str:
+    name = f"part-{shard:03d}" + (f"-{part}" if part else "")
+    return os.path.join(root, table, f"month={month:02d}", f"lead={lead:02d}", name + FORMATS[fmt])
+
+
+class PartitionWriter:
+    """
+    Parquet/Arrow files per (month, lead) partition, each written atomically
+    when finished. At most max_open files are open at once (least recently
+    written ones are finished first), so exports with thousands of
+    partitions stay within the process's file descriptor limit.
+    """
+
+    def __init__(self, root: str, table: str, fmt: str = "parquet", shard: int = 0, max_open: int = 256) -> None:
+        self.root = root
+        self.table = table
+        self.fmt = fmt
+        self.shard = shard
+        self.max_open = max(1, max_open)
+        self.schema = schema(table)
+        self._writers: OrderedDict[tuple[int, int], tuple[object, str]] = OrderedDict()
+        # Files started per partition, so a reopened partition gets a new part
+        self._parts: dict[tuple[int, int], int] = {}
+        self.paths: list[str] = []
+        self.rows = 0
+
+    def _finish(self, writer, path: str) -> None:
+        writer.close()
+        os.replace(path + ".tmp", path)
+        self.paths.append(path)
+
+    def _open(self, key: tuple[int, int]):
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+
+        if len(self._writers) >= self.max_open:
+            self._finish(*self._writers.popitem(last=False)[1])
+        part = self._parts.get(key, 0)
+        self._parts[key] = part + 1
+        path = partition_path(self.root, self.table, *key, self.shard, self.fmt, part)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        if self.fmt == "parquet":
+            writer = pq.ParquetWriter(tmp, self.schema, compression="zstd")
+        else:
+            # Uncompressed, so readers can memory-map the buffers as they are
+            writer = ipc.new_file(tmp, self.schema)
+        self._writers[key] = (writer, path)
+        return writer
+
+    def write(self, key: tuple[int, int], rows: list[tuple]) -> None:
+        pa = _pyarrow()
+        if key in self._writers:
+            self._writers.move_to_end(key)
+            writer = self._writers[key][0]
+        else:
+            writer = self._open(key)
+        columns = list(zip(*rows))
+        batch = pa.record_batch(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        writer.write_batch(batch)
+        self.rows += len(rows)
+
+    def close(self) -> list[str]:
+        """Finish the open files; returns every file written"""
+        for writer, path in self._writers.values():
+            self._finish(writer, path)
+        self._writers.clear()
+        return self.paths
+
+
+def export_rows(
+    batches: Iterable[list[tuple]],
+    writer: PartitionWriter,
+    batch_rows: int = 50_000,
+    max_buffered_rows: int = 500_000,
+) -> int:
+    """
+    Group streamed rows by (month, lead_days) and hand full buffers to the
+    writer; at most max_buffered_rows rows are held at once. Returns rows written.
+    """
+    names = [name for name, _ in COLUMNS[writer.table]]
+    month_at, lead_at = names.index("month"), names.index("lead_days")
+    buffers: dict[tuple[int, int], list[tuple]] = {}
+    buffered = 0
+    for batch in batches:
+        for row in batch:
+            key = (int(row[month_at]), int(row[lead_at]))
+            buffer = buffers.setdefault(key, [])
+            buffer.append(tuple(row))
+            buffered += 1
+            if len(buffer) >= batch_rows:
+                writer.write(key, buffer)
+                buffered -= len(buffer)
+                buffers[key] = []
+        if buffered >= max_buffered_rows:
+            for key, buffer in buffers.items():
+                if buffer:
+                    writer.write(key, buffer)
+            buffers = {}
+            buffered = 0
+    for key, buffer in buffers.items():
+        if buffer:
+            writer.write(key, buffer)
+    return writer.rows
+
+
+def export_shard(
+    database_url: str,
+    table: str,
+    out: str,
+    fmt: str,
+    shard: int,
+    workers: int,
+    since: Optional[str],
+    until: Optional[str],
+    batch_rows: int,
+    max_buffered_rows: int,
+    max_open_files: int = 256,
+) -> tuple[int, int]:
+    """Stream one worker's months through a server-side cursor; returns (rows, files)"""
+    import sqlalchemy as sa
+
+    sql, params = build_query(table, shard, workers, since, until)
+    writer = PartitionWriter(out, table, fmt, shard, max_open_files)
+    engine = sa.create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            # stream_results: a named (server-side) cursor, fetched batch_rows at a time
+            result = conn.execution_options(stream_results=True, yield_per=batch_rows).execute(sa.text(sql), params)
+            rows = export_rows(result.partitions(), writer, batch_rows, max_buffered_rows)
+    finally:
+        files = writer.close()
+        engine.dispose()
+    return rows, len(files)
+
+
+# -------------------------------
+# Reading exports back
+# -------------------------------
+def dataset_files(path: str) -> list[str]:
+    """Parquet/Arrow files of an export directory (or the file itself), in partition order"""
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for folder, _, names in os.walk(path):
+        files.extend(os.path.join(folder, name) for name in names if name.endswith(tuple(FORMATS.values())))
+    return sorted(files)
+
+
+def _columns(batch) -> dict[str, np.ndarray]:
+    return {name: batch.column(i).to_numpy(zero_copy_only=False) for i, name in enumerate(batch.schema.names)}
+
+
+def read_batches(path: str, chunk_rows: int = 500_000, columns: Optional[Iterable[str]] = None) -> Iterator[dict[str, np.ndarray]]:
+    """
+    Yield column arrays of at most chunk_rows records from exported
+    Parquet/Arrow files, memory-mapped (Arrow IPC numeric columns come
+    straight from the page cache without a copy).
+    """
+    pa = _pyarrow()
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    columns = list(columns) if columns is not None else None
+    for file in dataset_files(path):
+        if file.endswith(FORMATS["arrow"]) or file.endswith(".feather"):
+            with pa.memory_map(file, "r") as source:
+                reader = ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    if columns is not None:
+                        batch = batch.select(columns)
+                    for start in range(0, batch.num_rows, chunk_rows):
+                        yield _columns(batch.slice(start, chunk_rows))
+        else:
+            parquet = pq.ParquetFile(file, memory_map=True)
+            for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+                yield _columns(batch)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", choices=sorted(COLUMNS), required=True)
+    parser.add_argument("--out", default="data/export")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--since", help="only rows created on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="only rows created before this date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=1, help="processes, each exporting a disjoint set of months")
+    parser.add_argument("--batch-rows", type=int, default=50_000)
+    parser.add_argument("--max-buffered-rows", type=int, default=500_000)
+    parser.add_argument("--max-open-files", type=int, default=256, help="per worker")
+    parser.add_argument("--database-url", default=config.SYNC_DATABASE_URL)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("SYNC_DATABASE_URL is not set")
+    _pyarrow()
+
+    started = time.perf_counter()
+    workers = max(1, min(args.workers, 12))
+    jobs = [
+        (args.database_url, args.table, args.out, args.format, shard, workers,
+         args.since, args.until, args.batch_rows, args.max_buffered_rows, args.max_open_files)
+        for shard in range(workers)
+    ]
+    if workers == 1:
+        results = [export_shard(*jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(export_shard, *zip(*jobs)))
+    rows = sum(r for r, _ in results)
+    files = sum(f for _, f in results)
+    elapsed = time.perf_counter() - started
+    print(
+        f"Exported {rows:,} {args.table} rows to {files} {args.format} files under "
+        f"{os.path.join(args.out, args.table)} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Bulk-load day-of-year climatology normals into climatology_daily.
+
+Source files hold daily records (Meteostat bulk / ERA5 exports, or local
+CSV/Parquet fixtures) with columns lat, lon, date, tmean (or tavg), tmin,
+tmax. Each file is read in chunks and reduced to per-(lat, lon, doy)
+normals in a process pool; the main process COPYs the normals into a
+staging table and merges them through the uq_climo_latlon_doy_idx unique
+index. Finished files are recorded in a checkpoint, so an interrupted run
+resumes where it stopped.
+
+Every normal carries its sample count (tmean_n, tmin_n, tmax_n), so a
+location split across several files (e.g. one file per year) merges into
+the count-weighted mean of all of them rather than the last file read.
+Re-ingesting a file that is already merged counts it twice; the
+checkpoint is what prevents that. Days are numbered on the climatology
+grid's leap-year calendar (climo_grid.calendar_day), so a date falls on
+the same doy whether or not its year is a leap year.
+
+Usage (from apps/api):
+    python -m app.jobs.ingest_climatology data/daily/*.csv --workers 8
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, Optional
+
+import numpy as np
+
+from app import climo_grid, config, spatial
+
+VARIABLES = ("tmean", "tmin", "tmax")
+ALIASES = {"tavg": "tmean"}
+DAYS = 366
+
+STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS climo_staging (
+    lat double precision, lon double precision, doy integer,
+    tmean double precision, tmin double precision, tmax double precision,
+    period_start date, period_end date,
+    tmean_n integer, tmin_n integer, tmax_n integer
+)
+"""
+
+# Count-weighted mean of the stored and the new normal; rows from before the
+# counts existed (NULL count) are replaced
+_WEIGHTED = """
+    {v} = CASE
+        WHEN COALESCE(EXCLUDED.{v}_n, 0) = 0 THEN climatology_daily.{v}
+        WHEN climatology_daily.{v} IS NULL OR COALESCE(climatology_daily.{v}_n, 0) = 0 THEN EXCLUDED.{v}
+        ELSE (climatology_daily.{v} * climatology_daily.{v}_n + EXCLUDED.{v} * EXCLUDED.{v}_n)
+             / (climatology_daily.{v}_n + EXCLUDED.{v}_n)
+    END,
+    {v}_n = CASE
+        WHEN climatology_daily.{v} IS NULL THEN EXCLUDED.{v}_n
+        ELSE COALESCE(climatology_daily.{v}_n, 0) + COALESCE(EXCLUDED.{v}_n, 0)
+    END,"""
+
+MERGE_SQL = """
+INSERT INTO climatology_daily (lat, lon, doy, tmean, tmin, tmax, period_start, period_end, tmean_n, tmin_n, tmax_n, source)
+SELECT lat, lon, doy, tmean, tmin, tmax, period_start, period_end, tmean_n, tmin_n, tmax_n, %(source)s FROM climo_staging
+ON CONFLICT (lat, lon, doy) DO UPDATE SET""" + "".join(_WEIGHTED.format(v=v) for v in VARIABLES) + """
+    period_start = LEAST(climatology_daily.period_start, EXCLUDED.period_start),
+    period_end = GREATEST(climatology_daily.period_end, EXCLUDED.period_end),
+    source = EXCLUDED.source
+"""
+
+
+def read_chunks(path: str, chunk_rows: int) -> Iterator[dict[str, np.ndarray]]:
+    """Yield column arrays of at most chunk_rows records from a CSV, Parquet or Arrow file (or an export directory)"""
+    if os.path.isdir(path) or path.endswith((".arrow", ".feather")):
+        # Columnar exports (app/jobs/export_columnar.py), memory-mapped
+        from app.jobs.export_columnar import read_batches
+        for chunk in read_batches(path, chunk_rows):
+            yield {ALIASES.get(name, name): values for name, values in chunk.items()}
+        return
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet needs pyarrow (pip install pyarrow)")
+        parquet = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=chunk_rows):
+            columns = {ALIASES.get(name, name): batch.column(name) for name in batch.schema.names}
+            yield {name: col.to_numpy(zero_copy_only=False) for name, col in columns.items()}
+        return
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [ALIASES.get(name.strip(), name.strip()) for name in next(reader)]
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield _columns(header, rows)
+                rows = []
+        if rows:
+            yield _columns(header, rows)
+
+
+def _columns(header: list[str], rows: list[list[str]]) -> dict[str, np.ndarray]:
+    columns = dict(zip(header, zip(*rows)))
+    return {
+        name: np.array([float(v) if v else np.nan for v in values]) if not name.endswith("date") else np.array(values)
+        for name, values in columns.items()
+    }
+
+
+def reduce_keys(keys: np.ndarray, sums: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sum (n, variable) sums and counts per distinct key; keys come back sorted"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    reduced_sums = np.zeros((len(unique), sums.shape[1]))
+    reduced_counts = np.zeros((len(unique), counts.shape[1]), dtype=np.int64)
+    for v in range(sums.shape[1]):
+        reduced_sums[:, v] = np.bincount(inverse, weights=sums[:, v], minlength=len(unique))
+        reduced_counts[:, v] = np.bincount(inverse, weights=counts[:, v], minlength=len(unique))
+    return unique, reduced_sums, reduced_counts
+
+
+def _grow(values: np.ndarray, size: int, fill) -> np.ndarray:
+    """values with room for at least size entries (capacity doubles, new slots hold fill)"""
+    if size <= len(values):
+        return values
+    grown = np.full(max(size, 2 * len(values)), fill, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
+
+
+def normals_for_file(path: str, chunk_rows: int = 200_000, snap: Optional[float] = None) -> tuple[list[tuple], int]:
+    """
+    Reduce one source file to normals rows
+    (lat, lon, doy, tmean, tmin, tmax, period_start, period_end, tmean_n, tmin_n, tmax_n),
+    the *_n columns counting the records behind each mean.
+    Returns the rows and the number of input records read.
+
+    Each chunk is reduced to sums and counts per (location, doy) key and
+    folded into the running totals once the pending chunks outgrow them, so
+    memory follows the (location, doy) pairs present in the file rather than
+    a dense locations x 366 array, and every record is copied a bounded
+    number of times.
+    """
+    ids: dict[tuple[float, float], int] = {}
+    keys = np.zeros(0, dtype=np.int64)
+    sums = np.zeros((0, len(VARIABLES)))
+    counts = np.zeros((0, len(VARIABLES)), dtype=np.int64)
+    pending: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    pending_keys = 0
+    first = np.zeros(0, dtype=np.int64)
+    last = np.zeros(0, dtype=np.int64)
+    records = 0
+
+    for chunk in read_chunks(path, chunk_rows):
+        dates = np.asarray(chunk["date"]).astype("datetime64[D]")
+        doy = climo_grid.calendar_days(dates) - 1
+        days = dates.astype(np.int64)
+        lat, lon = chunk["lat"].astype(np.float64), chunk["lon"].astype(np.float64)
+        if snap:
+            # Same canonical cell centres the API looks up
+            cells = spatial.cell_grid(snap)
+            lat, lon = cells.centers(cells.cell_ids(lat, lon))
+        records += len(dates)
+
+        # Map this chunk's locations onto ids that persist across chunks
+        locations, inverse = np.unique(np.stack([lat, lon], axis=1), axis=0, return_inverse=True)
+        loc_ids = np.array([ids.setdefault((round(la, 4), round(lo, 4)), len(ids)) for la, lo in locations.tolist()])
+        first = _grow(first, len(ids), np.iinfo(np.int64).max)
+        last = _grow(last, len(ids), np.iinfo(np.int64).min)
+        gid = loc_ids[inverse.reshape(-1)]
+        np.minimum.at(first, gid, days)
+        np.maximum.at(last, gid, days)
+
+        chunk_sums = np.zeros((len(dates), len(VARIABLES)))
+        chunk_counts = np.zeros((len(dates), len(VARIABLES)), dtype=np.int64)
+        for v, name in enumerate(VARIABLES):
+            if name in chunk:
+                values = chunk[name].astype(np.float64)
+                valid = ~np.isnan(values)
+                chunk_sums[:, v] = np.where(valid, values, 0.0)
+                chunk_counts[:, v] = valid
+        part = reduce_keys(gid * DAYS + doy, chunk_sums, chunk_counts)
+        pending.append(part)
+        pending_keys += len(part[0])
+        if pending_keys > max(len(keys), chunk_rows):
+            keys, sums, counts = reduce_keys(*(np.concatenate(c) for c in zip((keys, sums, counts), *pending)))
+            pending, pending_keys = [], 0
+    if pending:
+        keys, sums, counts = reduce_keys(*(np.concatenate(c) for c in zip((keys, sums, counts), *pending)))
+
+    rows = []
+    coords = list(ids)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    for key, mean, count in zip(keys.tolist(), means.tolist(), counts.tolist()):
+        if not any(count):
+            continue
+        i, day = divmod(key, DAYS)
+        la, lo = coords[i]
+        values = [None if np.isnan(m) else round(m, 3) for m in mean]
+        start = str(np.datetime64(int(first[i]), "D"))
+        end = str(np.datetime64(int(last[i]), "D"))
+        rows.append((la, lo, day + 1, *values, start, end, *count))
+    return rows, records
+
+
+def to_copy_buffer(rows: list[tuple]) -> io.StringIO:
+    """Tab-separated COPY payload (\\N for NULL)"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if v is None else str(v) for v in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def load_rows(conn, rows: list[tuple], source: str) -> None:
+    """COPY into the staging table and merge (count-weighted) into climatology_daily in one transaction"""
+    with conn.cursor() as cur:
+        cur.execute(STAGING_DDL)
+        cur.execute("TRUNCATE climo_staging")
+        cur.copy_expert(
+            "COPY climo_staging (lat, lon, doy, tmean, tmin, tmax, period_start, period_end, tmean_n, tmin_n, tmax_n) FROM STDIN",
+            to_copy_buffer(rows),
+        )
+        cur.execute(MERGE_SQL, {"source": source})
+    conn.commit()
+
+
+def read_checkpoint(path: str) -> set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f))
+
+
+def write_checkpoint(path: str, done: set[str]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(sorted(done), f)
+    os.replace(tmp, path)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="CSV or Parquet daily records")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--snap", type=float, default=None, help="snap coordinates to cell centres of this grid (degrees), e.g. FORECAST_GRID_DEG")
+    parser.add_argument("--source", default="meteostat")
+    parser.add_argument("--checkpoint", default="data/ingest_climatology.checkpoint.json")
+    parser.add_argument("--database-url", default=config.SYNC_DATABASE_URL)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("SYNC_DATABASE_URL is not set")
+
+    import psycopg2
+
+    os.makedirs(os.path.dirname(args.checkpoint) or ".", exist_ok=True)
+    done = read_checkpoint(args.checkpoint)
+    pending = [f for f in args.files if os.path.abspath(f) not in done]
+    print(f"{len(pending)} files to ingest ({len(args.files) - len(pending)} already done)")
+
+    conn = psycopg2.connect(args.database_url)
+    started = time.perf_counter()
+    records = normals = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(normals_for_file, path, args.chunk_rows, args.snap): path
+                for path in pending
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                rows, read = future.result()
+                load_rows(conn, rows, args.source)
+
+                done.add(os.path.abspath(path))
+                write_checkpoint(args.checkpoint, done)
+                records += read
+                normals += len(rows)
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{path}: {read} records -> {len(rows)} normals | "
+                    f"{records / elapsed:,.0f} records/s, {normals / elapsed:,.0f} rows/s"
+                )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
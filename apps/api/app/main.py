@@ -1,12 +1,64 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, date
+from fastapi.responses import Response, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
+from datetime import datetime, date, timedelta
 from typing import Optional
-import httpx
 import math
 from pydantic import BaseModel
 
-app = FastAPI(title="Weather Fortune API", version="1.0.0")
+from app import (
+    cache, climo_grid, config, db, engine, forecast, forecast_store, grid, http_client,
+    metrics, predictions, prefetch, ratelimit, residuals, responses, startup, upstream,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Subsystems warm up concurrently; uvicorn only starts accepting
+    # connections on this worker once startup returns (or the budget runs out)
+    warmup = startup.Warmup()
+    warmup.import_seconds = IMPORT_SECONDS
+    app.state.warmup = warmup
+    # One pooled upstream client for the whole process
+    warmup.add("http_client", http_client.startup)
+    warmup.add("redis", cache.startup, required=False)
+    warmup.add("database", db.warm, required=False)
+    warmup.add("climo_grid", startup.in_thread(climo_grid.load, config.CLIMO_GRID_PATH))
+    warmup.add("residuals", startup.in_thread(residuals.load, config.RESIDUALS_PATH))
+    if config.PRELOAD_ENABLED:
+        warmup.add("preload", preload_hot_data, after=("redis", "climo_grid"), required=False)
+    await warmup.run(config.STARTUP_BUDGET)
+
+    tasks = [asyncio.create_task(residuals.run_reloader())]
+    if config.PREFETCH_TOP_N > 0:
+        tasks.append(asyncio.create_task(prefetch.run_scheduler()))
+    if db.is_configured():
+        tasks.append(asyncio.create_task(forecast_store.run_sweeper()))
+    yield
+    warmup.cancel()
+    for task in tasks:
+        task.cancel()
+    await cache.shutdown()
+    await http_client.shutdown()
+    await db.dispose()
+
+
+async def preload_hot_data() -> None:
+    """Page in climatology and copy hot forecasts from Redis (never calls the upstream)"""
+    try:
+        summary = await asyncio.wait_for(prefetch.preload(), config.PRELOAD_TIMEOUT)
+        print(f"Preloaded hot data: {summary}")
+    except asyncio.TimeoutError:
+        print(f"Preload did not finish within {config.PRELOAD_TIMEOUT}s; serving anyway")
+
+
+app = FastAPI(title="Weather Fortune API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware for frontend
 app.add_middleware(
@@ -15,22 +67,163 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "X-Grid-Shape", "X-Grid-Bbox", "Retry-After"],
 )
 
+def _cache_samples():
+    """Local and Redis tier lookups per cache"""
+    tiered_caches = {"forecast": cache.forecast_cache, "prediction": predictions.prediction_cache}
+    for name, tiered in tiered_caches.items():
+        local = tiered.local
+        for result, value in (("hit", local.hits), ("stale", local.stale_hits), ("miss", local.misses)):
+            yield "weather_cache_requests_total", {"cache": name, "tier": "local", "result": result}, value
+        for result, value in (("hit", tiered.redis_hits), ("miss", tiered.redis_misses), ("error", tiered.redis_errors)):
+            yield "weather_cache_requests_total", {"cache": name, "tier": "redis", "result": result}, value
+
+
+def _hit_ratio_samples():
+    yield "weather_cache_hit_ratio", {"cache": "forecast"}, cache.forecast_cache.stats()["hit_ratio"]
+    yield "weather_cache_hit_ratio", {"cache": "prediction"}, predictions.prediction_cache.stats()["hit_ratio"]
+
+
+def _upstream_samples():
+    stats = upstream.forecast_upstream.stats()
+    for name in ("calls", "failures", "timeouts", "queue_timeouts", "hedges", "hedge_wins", "breaker_rejected"):
+        yield "weather_upstream_guard_total", {"event": name}, stats[name]
+    yield "weather_upstream_guard_total", {"event": "coalesced"}, forecast.upstream_flight.coalesced
+
+
+metrics.Callback("weather_cache_requests_total", "Cache lookups by cache, tier and result", "counter", _cache_samples)
+metrics.Callback("weather_cache_hit_ratio", "Share of cache lookups answered from cache", "gauge", _hit_ratio_samples)
+metrics.Callback("weather_upstream_guard_total", "Upstream guard and single-flight events", "counter", _upstream_samples)
+metrics.Callback(
+    "weather_upstream_breaker_open",
+    "1 while the upstream circuit breaker rejects calls",
+    "gauge",
+    lambda: [("weather_upstream_breaker_open", {}, float(upstream.forecast_upstream.breaker.state != "closed"))],
+)
+
+
+def _ratelimit_samples():
+    for bucket in (ratelimit.client_limiter, ratelimit.upstream_budget):
+        for result in ("allowed", "rejected"):
+            yield "weather_ratelimit_total", {"bucket": bucket.name, "result": result}, getattr(bucket, result)
+
+
+def _budget_samples():
+    remaining = ratelimit.upstream_remaining()
+    if remaining is not None:
+        yield "weather_upstream_budget_remaining", {}, remaining
+
+
+metrics.Callback("weather_ratelimit_total", "Rate limit decisions by bucket and result", "counter", _ratelimit_samples)
+metrics.Callback(
+    "weather_upstream_budget_remaining",
+    "Upstream call tokens left after the last spend (shared across workers with Redis)",
+    "gauge",
+    _budget_samples,
+)
+
+
+async def limit_client(request: Request) -> None:
+    """Route dependency: 429 with Retry-After once a client has used up its bucket"""
+    key = ratelimit.client_key(request.headers, request.client.host if request.client else None)
+    decision = await ratelimit.client_limiter.take(key)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={
+                "Retry-After": str(max(1, math.ceil(decision.retry_after))),
+                "X-RateLimit-Limit": str(int(ratelimit.client_limiter.capacity)),
+            },
+        )
+
+
+class ExplainResponse(BaseModel):
+    anchor: Optional[float]
+    climo: float
+    w_anchor: float
+    ai_offset: float
+    days_ahead: int
+    climo_std: float
+
+# Documents the /api/predict schema; responses are serialized by app.responses
 class PredictionResponse(BaseModel):
     temp: float
     low80: float
     high80: float
     low95: float
     high95: float
-    explain: dict
+    explain: ExplainResponse
+
+class BatchItem(BaseModel):
+    lat: float
+    lon: float
+    date: str  # YYYY-MM-DD format
+
+class BatchRequest(BaseModel):
+    items: list[BatchItem]
 
 @app.get("/")
 async def root():
     return {"message": "Weather Fortune API"}
 
-@app.get("/api/predict", response_model=PredictionResponse)
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once every subsystem has warmed up (optional ones
+    may have failed), 503 before. Reports each subsystem's status and duration.
+    """
+    warmup: Optional[startup.Warmup] = getattr(app.state, "warmup", None)
+    if warmup is None:
+        return Response(responses.dumps({"ready": False, "subsystems": {}}), status_code=503, media_type="application/json")
+    report = warmup.report()
+    return Response(responses.dumps(report), status_code=200 if report["ready"] else 503, media_type="application/json")
+
+@app.get("/api/stats/http")
+async def http_pool_stats():
+    """Connection pool statistics for the upstream forecast client"""
+    return http_client.pool_stats()
+
+@app.get("/api/stats/cache")
+async def forecast_cache_stats():
+    """Hit/miss/eviction counters for the forecast cache"""
+    return cache.forecast_cache.stats()
+
+@app.get("/api/stats/upstream")
+async def upstream_stats():
+    """Circuit breaker state, adaptive timeout, hedging and latency of the forecast upstream"""
+    return upstream.forecast_upstream.stats()
+
+@app.get("/api/stats/singleflight")
+async def singleflight_stats():
+    """Coalesced vs. issued upstream forecast fetches"""
+    return forecast.upstream_flight.stats()
+
+@app.get("/api/stats/predictions")
+async def prediction_cache_stats():
+    """Hit/miss counters for the prediction cache (local and Redis tiers)"""
+    return predictions.prediction_cache.stats()
+
+@app.get("/api/stats/prefetch")
+async def prefetch_stats():
+    """Most requested grid cells and background prefetch counters"""
+    return prefetch.stats()
+
+@app.get("/api/stats/ratelimit")
+async def ratelimit_stats():
+    """Per-client limiter and upstream budget counters, with the tokens left in the budget"""
+    return await ratelimit.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/predict", response_model=PredictionResponse, dependencies=[Depends(limit_client)])
 async def predict_weather(
+    request: Request,
     lat: float,
     lon: float,
     date: str,  # YYYY-MM-DD format
@@ -38,7 +231,14 @@ async def predict_weather(
     """
     Predict weather for a given location and date.
     Blends short-term forecasts with climatology for longer ranges.
+    Predictions are per forecast grid cell (FORECAST_GRID_DEG): the anchor
+    and climatology are taken at the cell centre, so every point in a cell
+    gets the same answer and shares one cache entry.
+    Stage timings are returned in the Server-Timing header and recorded
+    for /metrics. Cacheable responses carry an ETag; a matching
+    If-None-Match is answered with 304 before any lookup.
     """
+    timer = metrics.StageTimer(metrics.predict_stage_seconds)
     try:
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
         today = datetime.now().date()
@@ -47,61 +247,385 @@ async def predict_weather(
         if days_ahead < 0:
             raise HTTPException(status_code=400, detail="Cannot predict for past dates")
         
-        # Get forecast data and climatology
-        anchor_temp = await get_forecast_anchor(lat, lon, days_ahead)
-        climo_temp, climo_std = get_climatology(lat, lon, target_date)
-        
-        # Blend based on time distance
-        if days_ahead <= 10:
-            # Use forecast directly for short term
-            if anchor_temp is not None:
-                predicted_temp = anchor_temp
-                w_anchor = 1.0
-            else:
-                # Fallback to climatology if forecast fails
-                predicted_temp = climo_temp
-                w_anchor = 0.0
-        else:
-            # Blend forecast anchor with climatology
-            w_anchor = 0.5 ** ((days_ahead - 10) / 7)
-            if anchor_temp is not None:
-                predicted_temp = w_anchor * anchor_temp + (1 - w_anchor) * climo_temp
-            else:
-                # Fallback to climatology if forecast fails
-                predicted_temp = climo_temp
-                w_anchor = 0.0
+        # Predictions are computed and memoized per forecast grid cell
+        grid_lat, grid_lon = cache.snap_to_grid(lat, lon)
+        prefetch.record(grid_lat, grid_lon)
+        version = predictions.inputs_version(days_ahead)
+        etag = responses.etag(version, grid_lat, grid_lon, target_date)
+        if responses.etag_matches(request.headers.get("if-none-match"), etag):
+            return timed_response(timer, None, cached="not_modified", etag=etag)
+        with timer.stage("cache"):
+            cached = await predictions.get(grid_lat, grid_lon, target_date, version)
+        if cached is not None:
+            return timed_response(timer, cached, cached="true", etag=etag)
         
-        # Add AI offset (placeholder for now)
-        ai_offset = 0.0  # Will implement AI model later
-        final_temp = predicted_temp + ai_offset
+        # Get forecast data and climatology
+        with timer.stage("forecast"):
+            anchor_temp = await get_forecast_anchor(grid_lat, grid_lon, days_ahead)
+        with timer.stage("climatology"):
+            climo_temp, climo_std = get_climatology(grid_lat, grid_lon, target_date)
         
-        # Calculate uncertainty bands
-        base_uncertainty = max(1.0, 0.6 * climo_std + 0.1 * days_ahead)
-        band80 = base_uncertainty
-        band95 = 1.6 * band80
+        with timer.stage("blend"):
+            residual_stats = residuals.lookup(target_date.month, days_ahead)
+            prediction = build_prediction(anchor_temp, climo_temp, climo_std, days_ahead, residual_stats)
         
-        return PredictionResponse(
-            temp=round(final_temp, 1),
-            low80=round(final_temp - band80, 1),
-            high80=round(final_temp + band80, 1),
-            low95=round(final_temp - band95, 1),
-            high95=round(final_temp + band95, 1),
-            explain={
-                "anchor": round(anchor_temp, 1) if anchor_temp else None,
-                "climo": round(climo_temp, 1),
-                "w_anchor": round(w_anchor, 2),
-                "ai_offset": round(ai_offset, 1),
-                "days_ahead": days_ahead,
-                "climo_std": round(climo_std, 1)
-            }
-        )
+        if anchor_temp is None:
+            metrics.climatology_fallbacks.inc(endpoint="predict")
+        # Climatology-only fallbacks and predictions from a stale (revalidating)
+        # forecast are not memoized (nor given an ETag) so the next request
+        # picks up the fresh one
+        elif forecast.is_fresh(grid_lat, grid_lon):
+            predictions.put(grid_lat, grid_lon, target_date, version, prediction.to_dict())
+            return timed_response(timer, prediction, cached="false", etag=etag)
+        return timed_response(timer, prediction, cached="false")
         
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 
+def timed_response(
+    timer: metrics.StageTimer,
+    prediction: "responses.Prediction | dict | None",
+    cached: str,
+    etag: Optional[str] = None,
+) -> Response:
+    """
+    Serialize the prediction (timed as its own stage) and attach
+    Server-Timing and caching headers; no prediction means 304.
+    """
+    headers = {"Cache-Control": responses.cache_control() if etag else responses.NO_STORE}
+    if etag:
+        headers["ETag"] = etag
+    if prediction is None:
+        body, status = b"", 304
+    else:
+        with timer.stage("serialize"):
+            body, status = responses.dumps(prediction), 200
+    total = time.perf_counter() - timer.started
+    metrics.predict_seconds.observe(total, cached=cached)
+    headers["Server-Timing"] = timer.server_timing(total)
+    return Response(body, status_code=status, media_type="application/json", headers=headers)
+
+
+@app.post("/api/predict/batch", dependencies=[Depends(limit_client)])
+async def predict_weather_batch(request: BatchRequest):
+    """
+    Predict many (lat, lon, date) items in one call.
+    Items are grouped by forecast grid cell, each cell's series is fetched once
+    (several cells per multi-location upstream call), climatology and blending
+    run vectorized per block, and results are streamed back as NDJSON in input
+    order. A bad item yields an error line instead of failing the batch.
+    """
+    if len(request.items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {config.BATCH_MAX_ITEMS} items)")
+    
+    today = datetime.now().date()
+    cells = [cache.snap_to_grid(item.lat, item.lon) for item in request.items]
+    
+    # Start one bulk fetch per chunk of distinct cells; results stream as chunks land
+    unique_cells = list(dict.fromkeys(cells))
+    chunk_size = config.BATCH_UPSTREAM_CHUNK
+    fetches: dict[tuple[float, float], asyncio.Task] = {}
+    for i in range(0, len(unique_cells), chunk_size):
+        chunk = unique_cells[i:i + chunk_size]
+        task = asyncio.ensure_future(forecast.get_series_many(chunk))
+        for cell in chunk:
+            fetches[cell] = task
+    
+    async def results():
+        # Vectorize in blocks of input order so early blocks stream out first
+        block_size = config.BATCH_BLOCK_SIZE
+        for start in range(0, len(request.items), block_size):
+            lines: dict[int, dict] = {}
+            index, lats, lons, doys, grid_doys, months, anchors, leads = [], [], [], [], [], [], [], []
+            for i in range(start, min(start + block_size, len(request.items))):
+                item, cell = request.items[i], cells[i]
+                try:
+                    target_date = datetime.strptime(item.date, "%Y-%m-%d").date()
+                except ValueError:
+                    lines[i] = {"index": i, "error": "Invalid date format. Use YYYY-MM-DD"}
+                    continue
+                days_ahead = (target_date - today).days
+                if days_ahead < 0:
+                    lines[i] = {"index": i, "error": "Cannot predict for past dates"}
+                    continue
+                
+                try:
+                    series = (await fetches[cell]).get(cell)
+                except Exception as e:
+                    print(f"Error fetching forecast: {e}")
+                    series = None
+                anchor_temp = forecast.value_for_day(series, min(days_ahead, 10)) if series else None
+                if anchor_temp is None:
+                    metrics.climatology_fallbacks.inc(endpoint="batch")
+                
+                index.append(i)
+                lats.append(cell[0])
+                lons.append(cell[1])
+                doys.append(target_date.timetuple().tm_yday)
+                grid_doys.append(climo_grid.calendar_day(target_date))
+                months.append(target_date.month)
+                anchors.append(math.nan if anchor_temp is None else anchor_temp)
+                leads.append(days_ahead)
+            
+            if index:
+                result = engine.predict(lats, lons, doys, anchors, leads, months=months, grid_doy=grid_doys)
+                for i, prediction in zip(index, engine.to_responses(result)):
+                    lines[i] = {"index": i, "result": prediction}
+            
+            yield b"".join(responses.dumps(lines[i]) + b"\n" for i in sorted(lines))
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.get("/api/predict/range", dependencies=[Depends(limit_client)])
+async def predict_weather_range(
+    request: Request,
+    lat: float,
+    lon: float,
+    start: str,  # YYYY-MM-DD format
+    end: str,  # YYYY-MM-DD format, inclusive
+    format: Optional[str] = None,  # "ndjson" (default) or "sse"
+):
+    """
+    Predict every day from start to end for one location.
+    The forecast series is fetched once for the grid cell and each day's
+    PredictionResponse is streamed as soon as it is computed, as NDJSON
+    lines or Server-Sent Events (format=sse or Accept: text/event-stream).
+    """
+    try:
+        start_date = datetime.strptime(start, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    today = datetime.now().date()
+    if start_date < today:
+        raise HTTPException(status_code=400, detail="Cannot predict for past dates")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    days = (end_date - start_date).days + 1
+    if days > config.RANGE_MAX_DAYS:
+        raise HTTPException(status_code=413, detail=f"Range too long (max {config.RANGE_MAX_DAYS} days)")
+    
+    sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+    grid_lat, grid_lon = cache.snap_to_grid(lat, lon)
+    prefetch.record(grid_lat, grid_lon)
+    
+    def encode(payload: dict, event: str = "prediction") -> bytes:
+        if sse:
+            return b"event: " + event.encode() + b"\ndata: " + responses.dumps(payload) + b"\n\n"
+        return responses.dumps(payload) + b"\n"
+    
+    async def results():
+        # Headers go out before the upstream fetch; one series serves every day
+        try:
+            series = await forecast.get_series(grid_lat, grid_lon)
+        except Exception as e:
+            print(f"Error fetching forecast: {e}")
+            series = None
+        
+        # Leads 0-10 each read their own forecast day; everything later shares the day-10 anchor
+        dates = [start_date + timedelta(days=i) for i in range(days)]
+        leads = [(d - today).days for d in dates]
+        anchors = [
+            forecast.value_for_day(series, min(lead, 10)) if series else None
+            for lead in leads
+        ]
+        fallbacks = sum(1 for anchor in anchors if anchor is None)
+        if fallbacks:
+            metrics.climatology_fallbacks.inc(fallbacks, endpoint="range")
+        
+        # Vectorize in month-sized blocks so the first days stream out before
+        # the whole range is computed (a range is shorter than a batch block)
+        block_size = max(1, config.RANGE_BLOCK_SIZE)
+        for first in range(0, days, block_size):
+            block = range(first, min(first + block_size, days))
+            result = engine.predict(
+                [grid_lat] * len(block),
+                [grid_lon] * len(block),
+                [dates[i].timetuple().tm_yday for i in block],
+                [math.nan if anchors[i] is None else anchors[i] for i in block],
+                [leads[i] for i in block],
+                months=[dates[i].month for i in block],
+                grid_doy=[climo_grid.calendar_day(dates[i]) for i in block],
+            )
+            yield b"".join(
+                encode({"date": dates[i].isoformat(), "result": prediction})
+                for i, prediction in zip(block, engine.to_responses(result))
+            )
+        if sse:
+            yield encode({"days": days}, event="done")
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} if sse else None
+    return StreamingResponse(results(), media_type=media_type, headers=headers)
+
+
+def parse_target_date(value: str) -> tuple[date, int]:
+    """(target date, days ahead) or a 400 for bad or past dates"""
+    try:
+        target_date = datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    days_ahead = (target_date - datetime.now().date()).days
+    if days_ahead < 0:
+        raise HTTPException(status_code=400, detail="Cannot predict for past dates")
+    return target_date, days_ahead
+
+
+def grid_response(values, format: str, headers: dict) -> Response:
+    """float32 (little-endian, row-major, north to south) or a colored PNG"""
+    if format == "png":
+        return Response(grid.encode_png(grid.colorize(values)), media_type="image/png", headers=headers)
+    return Response(values.astype("<f4").tobytes(), media_type="application/octet-stream", headers=headers)
+
+
+@app.get("/api/predict/grid", dependencies=[Depends(limit_client)])
+async def predict_weather_grid(
+    bbox: str,  # west,south,east,north in degrees
+    resolution: float,  # output cell size in degrees
+    date: str,  # YYYY-MM-DD format
+    field: str = "temp",
+    format: str = "f32",  # "f32" or "png"
+):
+    """
+    Predict one field for every cell of a bounding box.
+    Forecasts are fetched for a coarse lattice of upstream grid points in a
+    few bulk calls and interpolated; climatology and blending run over the
+    whole array at once. The shape is returned in X-Grid-Shape (rows,cols).
+    """
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+    if field not in grid.FIELDS or format not in ("f32", "png"):
+        raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(grid.FIELDS)}; format f32 or png")
+    if resolution <= 0:
+        raise HTTPException(status_code=400, detail="resolution must be positive")
+    lats, lons = grid.bbox_axes(west, south, east, north, resolution)
+    if len(lats) * len(lons) > config.GRID_MAX_CELLS:
+        raise HTTPException(status_code=413, detail=f"Grid too large (max {config.GRID_MAX_CELLS} cells)")
+    target_date, days_ahead = parse_target_date(date)
+    
+    values, _ = await grid.predict_grid(lats, lons, target_date, days_ahead, field)
+    return grid_response(values, format, {
+        "X-Grid-Shape": f"{len(lats)},{len(lons)}",
+        "X-Grid-Bbox": f"{west},{south},{east},{north}",
+    })
+
+
+@app.get("/api/predict/grid/{z}/{x}/{y}", dependencies=[Depends(limit_client)])
+async def predict_weather_tile(
+    z: int,
+    x: int,
+    y: int,
+    date: str,  # YYYY-MM-DD format
+    field: str = "temp",
+    format: str = "png",  # "png" or "f32"
+    size: int = 256,
+):
+    """
+    Slippy-map tile (Web Mercator z/x/y) of one predicted field.
+    Tiles are cached per (z, x, y, date) until the next forecast run and
+    sent with a matching Cache-Control so browsers and CDNs can keep them.
+    Tiles with climatology fallbacks (no forecast for some cells) are
+    neither cached nor cacheable, like /api/predict fallbacks.
+    """
+    if not (0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    if not 1 <= size <= config.GRID_TILE_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"size must be 1-{config.GRID_TILE_MAX_SIZE}")
+    if field not in grid.FIELDS or format not in ("f32", "png"):
+        raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(grid.FIELDS)}; format f32 or png")
+    target_date, days_ahead = parse_target_date(date)
+    
+    headers = {
+        "X-Grid-Shape": f"{size},{size}",
+        "X-Grid-Bbox": ",".join(str(round(v, 6)) for v in grid.tile_bounds(z, x, y)),
+        "Cache-Control": responses.cache_control(),
+    }
+    key = f"{z}/{x}/{y}:{target_date.isoformat()}:{days_ahead}:{field}:{size}:{format}"
+    body = grid.tile_cache.get(key)
+    if body is None:
+        lats, lons = grid.tile_axes(z, x, y, size)
+        values, complete = await grid.predict_grid(lats, lons, target_date, days_ahead, field)
+        body = grid_response(values, format, headers).body
+        if complete:
+            grid.tile_cache.set(key, body, cache.model_run_ttl())
+        else:
+            headers["Cache-Control"] = responses.NO_STORE
+    media_type = "image/png" if format == "png" else "application/octet-stream"
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def build_prediction(
+    anchor_temp: Optional[float],
+    climo_temp: float,
+    climo_std: float,
+    days_ahead: int,
+    residual_stats: Optional[tuple[float, tuple[float, float, float, float]]] = None,
+) -> responses.Prediction:
+    """
+    Blend the forecast anchor with climatology and add uncertainty bands.
+    residual_stats is (ai_offset, (lo95, lo80, hi80, hi95)) from the residual
+    tables; without it the offset is 0 and the bands use the spread heuristic.
+    """
+    # Blend based on time distance
+    if days_ahead <= 10:
+        # Use forecast directly for short term
+        if anchor_temp is not None:
+            predicted_temp = anchor_temp
+            w_anchor = 1.0
+        else:
+            # Fallback to climatology if forecast fails
+            predicted_temp = climo_temp
+            w_anchor = 0.0
+    else:
+        # Blend forecast anchor with climatology
+        w_anchor = 0.5 ** ((days_ahead - 10) / 7)
+        if anchor_temp is not None:
+            predicted_temp = w_anchor * anchor_temp + (1 - w_anchor) * climo_temp
+        else:
+            # Fallback to climatology if forecast fails
+            predicted_temp = climo_temp
+            w_anchor = 0.0
+    
+    if residual_stats is not None:
+        # Mean historical bias and empirical residual quantiles for this month and lead
+        ai_offset, (lo95, lo80, hi80, hi95) = residual_stats
+    else:
+        ai_offset = 0.0
+        # Calculate uncertainty bands
+        base_uncertainty = max(1.0, 0.6 * climo_std + 0.1 * days_ahead)
+        band80 = base_uncertainty
+        band95 = 1.6 * band80
+        lo95, lo80, hi80, hi95 = -band95, -band80, band80, band95
+    final_temp = predicted_temp + ai_offset
+    
+    return responses.Prediction(
+        temp=round(final_temp, 1),
+        low80=round(final_temp + lo80, 1),
+        high80=round(final_temp + hi80, 1),
+        low95=round(final_temp + lo95, 1),
+        high95=round(final_temp + hi95, 1),
+        explain=responses.Explain(
+            anchor=round(anchor_temp, 1) if anchor_temp else None,
+            climo=round(climo_temp, 1),
+            w_anchor=round(w_anchor, 2),
+            ai_offset=round(ai_offset, 1),
+            days_ahead=days_ahead,
+            climo_std=round(climo_std, 1),
+        ),
+    )
+
+
 async def get_forecast_anchor(lat: float, lon: float, days_ahead: int) -> Optional[float]:
     """
     Fetch weather forecast from Open-Meteo API.
@@ -110,28 +634,12 @@ async def get_forecast_anchor(lat: float, lon: float, days_ahead: int) -> Option
     try:
         anchor_day = min(days_ahead, 10)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.open-meteo.com/v1/forecast",
-                params={
-                    "latitude": lat,
-                    "longitude": lon,
-                    "daily": "temperature_2m_mean",
-                    "forecast_days": anchor_day + 1,
-                    "timezone": "auto"
-                },
-                timeout=10.0
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if "daily" in data and "temperature_2m_mean" in data["daily"]:
-                temps = data["daily"]["temperature_2m_mean"]
-                if len(temps) > anchor_day:
-                    return temps[anchor_day]
-            
+        # One cached 16-day series per grid cell serves every lead day
+        series = await forecast.get_series(lat, lon)
+        if series is None:
             return None
+        
+        return forecast.value_for_day(series, anchor_day)
             
     except Exception as e:
         print(f"Error fetching forecast: {e}")
@@ -141,8 +649,9 @@ async def get_forecast_anchor(lat: float, lon: float, days_ahead: int) -> Option
 def get_climatology(lat: float, lon: float, target_date: date) -> tuple[float, float]:
     """
     Get climatological temperature for a given location and date.
-    For now, uses a simple seasonal cycle based on latitude.
-    TODO: Replace with real historical data from Meteostat or ERA5.
+    Uses the memory-mapped climatology grid (built from climatology_daily)
+    when it is loaded and covers the point, otherwise a simple seasonal
+    cycle based on latitude. The spread still comes from the seasonal model.
     """
     # Simple seasonal model based on day of year and latitude
     day_of_year = target_date.timetuple().tm_yday
@@ -163,6 +672,14 @@ def get_climatology(lat: float, lon: float, target_date: date) -> tuple[float, f
     # Add seasonal variation
     climo_temp = base_temp + seasonal_amplitude * math.cos(seasonal_phase)
     
+    # Real normals from the precomputed grid when available
+    grid = climo_grid.get_grid()
+    if grid is not None:
+        # The grid is numbered on its leap-year calendar, as the ingest wrote it
+        grid_temp = grid.lookup(lat, lon, climo_grid.calendar_day(target_date))
+        if grid_temp is not None:
+            climo_temp = grid_temp
+    
     # Standard deviation increases with latitude and distance from summer
     base_std = 2.0 + abs(lat) * 0.05
     seasonal_std_factor = 1.0 + 0.5 * abs(math.cos(seasonal_phase))
@@ -171,6 +688,9 @@ def get_climatology(lat: float, lon: float, target_date: date) -> tuple[float, f
     return climo_temp, climo_std
 
 
+# Time spent importing this module and everything it pulls in (see `python -m app.startup`)
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
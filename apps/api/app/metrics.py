@@ -0,0 +1,213 @@
+"""
+Prometheus metrics in the text exposition format, served on /metrics.
+Counters and histograms are plain in-process objects (one event loop, no
+locking); cache and upstream stats that already live elsewhere are read
+at scrape time through callbacks instead of being copied on every request.
+"""
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+# Seconds; covers in-memory lookups (~10us) up to slow upstream calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name + "_total", help, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self.values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [non-cumulative bucket counts..., +Inf count], sum
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        return sum(self.counts.get(self._key(labels), ()))
+
+    def samples(self) -> Iterable[Sample]:
+        for key, counts in self.counts.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", labels, self.sums[key]
+            yield self.name + "_count", labels, cumulative
+
+
+class Callback(Metric):
+    """Values computed at scrape time, e.g. from an existing stats() dict"""
+
+    def __init__(self, name: str, help: str, type: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        super().__init__(name, help)
+        self.type = type
+        self.collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        return self.collect()
+
+
+REGISTRY: list[Metric] = []
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format (version 0.0.4)"""
+    lines = []
+    for metric in REGISTRY:
+        try:
+            samples = list(metric.samples())
+        except Exception as e:
+            print(f"Error collecting metric {metric.name}: {e}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class StageTimer:
+    """
+    Times the stages of one request: each stage is observed in a histogram
+    and listed in the Server-Timing header returned to the client.
+    """
+
+    def __init__(self, histogram: Histogram, **labels: str) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.stages: list[tuple[str, float]] = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append((name, elapsed))
+            self.histogram.observe(elapsed, stage=name, **self.labels)
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Server-Timing header value (durations in milliseconds)"""
+        total = time.perf_counter() - self.started if total is None else total
+        parts = [f"{name};dur={1000 * seconds:.3f}" for name, seconds in self.stages]
+        parts.append(f"total;dur={1000 * total:.3f}")
+        return ", ".join(parts)
+
+
+# -------------------------------
+# Prediction hot path
+# -------------------------------
+predict_stage_seconds = Histogram(
+    "weather_predict_stage_seconds",
+    "Time spent in each stage of /api/predict",
+    ("stage",),
+)
+predict_seconds = Histogram(
+    "weather_predict_seconds",
+    "End-to-end /api/predict handler time",
+    ("cached",),
+)
+climatology_fallbacks = Counter(
+    "weather_climatology_fallbacks",
+    "Predictions made without a forecast anchor (climatology only)",
+    ("endpoint",),
+)
+
+# -------------------------------
+# Upstream (Open-Meteo)
+# -------------------------------
+upstream_responses = Counter(
+    "weather_upstream_responses",
+    "Upstream forecast responses by HTTP status (\"error\" for transport failures)",
+    ("status",),
+)
+upstream_seconds = Histogram(
+    "weather_upstream_request_seconds",
+    "Latency of individual upstream forecast requests",
+)
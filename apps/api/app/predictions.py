@@ -0,0 +1,124 @@
+"""
+Prediction result cache: a hot in-process LRU, shared through Redis between
+workers and replicas, backed by the predictions table.
+Entries are keyed by snapped grid cell and target date and stamped with the
+version of the model inputs (forecast run, lead time, residual tables,
+model version), so a newer forecast run invalidates them without an
+explicit purge. The version names the latest scheduled run; predictions are
+only stored while the cell's series holds that run (forecast.is_fresh), so a
+late upstream run cannot be cached under the newer run's version.
+"""
+from datetime import date
+from typing import Optional
+
+from app import cache, config, db, residuals, spatial
+
+# Bump when the blend/climatology math changes so stored rows are ignored
+MODEL_VERSION = "blend-v1"
+
+prediction_cache = cache.TieredCache("pred:v2", config.PREDICTION_CACHE_SIZE)
+
+
+def inputs_version(days_ahead: int) -> str:
+    """
+    Version of everything a prediction depends on besides location and date.
+    Uses the scheduled model run, so it is known before the series is fetched.
+    """
+    run = cache.latest_model_run()
+    return f"{MODEL_VERSION}:{run:%Y%m%d%H}:{days_ahead}:{residuals.version()}"
+
+
+def cache_key(grid_lat: float, grid_lon: float, target_date: date) -> str:
+    return f"{spatial.forecast_cells.cell_id(grid_lat, grid_lon)}:{target_date.isoformat()}"
+
+
+def to_row(grid_lat: float, grid_lon: float, target_date: date, version: str, prediction: dict) -> dict:
+    """
+    Map a PredictionResponse dict onto a predictions row.
+    The 80% band is stored as p10/p90; the rest goes into components.
+    """
+    explain = prediction["explain"]
+    return {
+        "lat": grid_lat,
+        "lon": grid_lon,
+        "target_date": target_date,
+        "t_p50": prediction["temp"],
+        "t_p10": prediction["low80"],
+        "t_p90": prediction["high80"],
+        "method": "blend" if explain.get("w_anchor") else "climatology",
+        "components": {
+            "version": version,
+            "low95": prediction["low95"],
+            "high95": prediction["high95"],
+            "explain": explain,
+        },
+    }
+
+
+def from_row(row) -> dict:
+    components = row.components
+    return {
+        "temp": row.t_p50,
+        "low80": row.t_p10,
+        "high80": row.t_p90,
+        "low95": components["low95"],
+        "high95": components["high95"],
+        "explain": components["explain"],
+    }
+
+
+async def get(grid_lat: float, grid_lon: float, target_date: date, version: str) -> Optional[dict]:
+    """Cached prediction for these inputs, or None"""
+    key = cache_key(grid_lat, grid_lon, target_date)
+    entry = await prediction_cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    if not db.is_configured():
+        return None
+
+    import sqlalchemy as sa
+
+    p = db.predictions
+    stmt = sa.select(p.c.t_p50, p.c.t_p10, p.c.t_p90, p.c.components).where(
+        p.c.lat == grid_lat, p.c.lon == grid_lon, p.c.target_date == target_date
+    )
+    try:
+        async with db.get_engine().connect() as conn:
+            row = (await conn.execute(stmt)).first()
+    except Exception as e:
+        print(f"Error loading stored prediction: {e}")
+        return None
+    if row is None or not row.components or row.components.get("version") != version:
+        return None
+
+    prediction = from_row(row)
+    prediction_cache.set_behind(key, (version, prediction), cache.model_run_ttl())
+    return prediction
+
+
+async def store(rows: list[dict]) -> None:
+    """Bulk upsert on uq_predictions_lat_lon_date"""
+    import sqlalchemy as sa
+    from sqlalchemy.dialects.postgresql import insert
+
+    stmt = insert(db.predictions).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_predictions_lat_lon_date",
+        set_={
+            "t_p50": stmt.excluded.t_p50,
+            "t_p10": stmt.excluded.t_p10,
+            "t_p90": stmt.excluded.t_p90,
+            "method": stmt.excluded.method,
+            "components": stmt.excluded.components,
+            "created_at": sa.func.now(),
+        },
+    )
+    async with db.get_engine().begin() as conn:
+        await conn.execute(stmt)
+
+
+def put(grid_lat: float, grid_lon: float, target_date: date, version: str, prediction: dict) -> None:
+    """Memoize (until the next model run) and upsert into predictions, both write-behind"""
+    prediction_cache.set_behind(cache_key(grid_lat, grid_lon, target_date), (version, prediction), cache.model_run_ttl())
+    row = to_row(grid_lat, grid_lon, target_date, version, prediction)
+    db.write_behind(lambda: store([row]), "prediction")
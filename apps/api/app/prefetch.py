@@ -0,0 +1,169 @@
+"""
+Background prefetch of popular grid cells.
+Requests are counted per snapped grid cell; shortly after each upstream
+model run is published, the scheduler refreshes the top-N cells so hot
+locations are answered from the cache instead of waiting on Open-Meteo.
+With several workers or replicas one of them takes a Redis lock per model
+run and prefetches; the cells it refreshed are published so a freshly
+started worker can preload them from Redis before it takes traffic.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Optional
+
+from app import cache, climo_grid, config, forecast, ratelimit
+
+# Redis key listing the cells of the latest prefetch run
+HOT_CELLS_KEY = "prefetch:hot"
+
+# Request counts per grid cell; halved after every prefetch so the ranking follows recent traffic
+_counts: Counter = Counter()
+
+_runs = 0
+_prefetched = 0
+_errors = 0
+_last_run: Optional[float] = None
+_skipped = 0
+_budget_stops = 0
+_preloaded = 0
+
+
+def record(grid_lat: float, grid_lon: float) -> None:
+    """Count one request for a snapped grid cell"""
+    _counts[(grid_lat, grid_lon)] += 1
+    if len(_counts) > config.PREFETCH_TRACK_MAX:
+        # Keep the busier half
+        keep = dict(_counts.most_common(config.PREFETCH_TRACK_MAX // 2))
+        _counts.clear()
+        _counts.update(keep)
+
+
+def top_cells(n: int) -> list[tuple[float, float]]:
+    return [cell for cell, _ in _counts.most_common(n)]
+
+
+def decay() -> None:
+    for cell in list(_counts):
+        _counts[cell] //= 2
+        if not _counts[cell]:
+            del _counts[cell]
+
+
+def reset() -> None:
+    _counts.clear()
+
+
+async def prefetch(cells: list[tuple[float, float]]) -> int:
+    """Refresh every cell not already fresh, one multi-location call per chunk; returns cells fetched"""
+    global _errors, _budget_stops
+    pending = [cell for cell in cells if not forecast.is_fresh(*cell)]
+    fetched = 0
+    chunk_size = config.BATCH_UPSTREAM_CHUNK
+    for i in range(0, len(pending), chunk_size):
+        try:
+            with ratelimit.background():
+                results = await forecast.get_series_many(pending[i:i + chunk_size])
+        except ratelimit.BudgetExhausted:
+            # Down to the reserve kept for on-demand requests
+            _budget_stops += 1
+            break
+        except Exception as e:
+            _errors += 1
+            print(f"Error prefetching forecasts: {e}")
+            continue
+        fetched += sum(1 for series in results.values() if series is not None)
+    return fetched
+
+
+async def run_once(top_n: int = config.PREFETCH_TOP_N) -> int:
+    """Pre-warm the top_n most requested cells, then decay the counts"""
+    global _runs, _prefetched, _last_run, _skipped
+    # Every worker samples the same traffic, so whichever takes the lock prefetches for all
+    if not await cache.try_lock(f"prefetch:{cache.latest_model_run():%Y%m%d%H}", cache.model_run_ttl()):
+        _skipped += 1
+        decay()
+        return 0
+    cells = top_cells(top_n)
+    fetched = await prefetch(cells)
+    await publish_hot_cells(cells)
+    decay()
+    _runs += 1
+    _prefetched += fetched
+    _last_run = time.time()
+    return fetched
+
+
+async def publish_hot_cells(cells: list[tuple[float, float]]) -> None:
+    redis = cache.forecast_cache.redis
+    if redis is None or not cells:
+        return
+    try:
+        ttl = cache.model_run_ttl() + config.FORECAST_STALE_GRACE
+        await redis.set(HOT_CELLS_KEY, json.dumps(cells), ex=max(1, int(ttl)))
+    except Exception as e:
+        print(f"Error publishing hot cells: {e}")
+
+
+async def hot_cells() -> list[tuple[float, float]]:
+    """Cells of the latest prefetch run (from Redis), else this worker's own top cells"""
+    redis = cache.forecast_cache.redis
+    if redis is not None:
+        try:
+            raw = await redis.get(HOT_CELLS_KEY)
+            if raw is not None:
+                return [tuple(cell) for cell in json.loads(raw)]
+        except Exception as e:
+            print(f"Error reading hot cells: {e}")
+    return top_cells(config.PREFETCH_TOP_N)
+
+
+async def preload() -> dict:
+    """
+    Startup phase run before a worker accepts traffic: page in the
+    climatology grid and copy the hot forecast cells from Redis into the
+    local tier. Never calls the upstream.
+    """
+    global _preloaded
+    started = time.perf_counter()
+    grid = climo_grid.get_grid()
+    grid_bytes = await asyncio.to_thread(grid.touch) if grid is not None else 0
+    cells = await hot_cells()
+    keys = [forecast.series_key(*cell) for cell in cells]
+    chunk_size = config.BATCH_UPSTREAM_CHUNK
+    warmed = 0
+    for i in range(0, len(keys), chunk_size):
+        warmed += await cache.forecast_cache.warm(keys[i:i + chunk_size])
+    _preloaded = warmed
+    return {
+        "climo_grid_bytes": grid_bytes,
+        "hot_cells": len(cells),
+        "forecasts_warmed": warmed,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def run_scheduler(top_n: int = config.PREFETCH_TOP_N, delay: float = config.PREFETCH_DELAY_SECONDS) -> None:
+    """Background loop started from the FastAPI lifespan: wakes shortly after each model run"""
+    while True:
+        await asyncio.sleep(cache.model_run_ttl() + delay)
+        try:
+            fetched = await run_once(top_n)
+            print(f"Prefetched {fetched} forecast cells for model run {cache.latest_model_run():%Y-%m-%d %H}Z")
+        except Exception as e:
+            print(f"Error in prefetch scheduler: {e}")
+
+
+def stats() -> dict:
+    return {
+        "tracked_cells": len(_counts),
+        "top": [{"lat": lat, "lon": lon, "requests": n} for (lat, lon), n in _counts.most_common(10)],
+        "runs": _runs,
+        "prefetched": _prefetched,
+        "errors": _errors,
+        "skipped_runs": _skipped,
+        "budget_stops": _budget_stops,
+        "preloaded": _preloaded,
+        "last_run": _last_run,
+    }
@@ -0,0 +1,219 @@
+"""
+Token-bucket rate limits, shared through Redis when it is configured.
+
+Two levels:
+- per client at the /api/predict edge (API key, else client address);
+  over the limit the request gets 429 with Retry-After (see
+  limit_client() in app/main.py);
+- a global budget on upstream forecast calls sized from the Open-Meteo
+  daily quota. A multi-location call costs one token per location.
+  When the budget runs out, fetches raise UpstreamUnavailable and the API
+  answers from cache (stale entries included) or climatology only.
+  Background work (prefetch, stale revalidation) stops earlier, at
+  UPSTREAM_BUDGET_RESERVE, so on-demand requests keep the remainder.
+
+Buckets are refilled and taken atomically by a Lua script in Redis, so
+every worker and replica draws from the same buckets. Without Redis (or
+while it fails) each process uses an in-process bucket with the same
+parameters.
+"""
+import contextvars
+import hashlib
+import time
+from contextlib import contextmanager
+from typing import Iterator, Mapping, NamedTuple, Optional
+
+from app import cache, config, upstream
+
+# KEYS[1] bucket; ARGV rate/s, capacity, cost, floor. Returns {allowed, tokens}
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local floor = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens - cost >= floor then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {allowed, tostring(tokens)}
+"""
+
+
+class BudgetExhausted(upstream.CallSkipped):
+    """Not enough upstream budget left for the call (callers degrade like any outage)"""
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+
+class TokenBucket:
+    """
+    rate tokens per second up to capacity, one bucket per key.
+    take() with a floor only succeeds while that many tokens would be left.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, max_local_keys: int = 10_000) -> None:
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_local_keys = max_local_keys
+        self.enabled = rate > 0
+        self._local: dict[str, tuple[float, float]] = {}
+        self._script = None
+        self.allowed = 0
+        self.rejected = 0
+        self.redis_errors = 0
+        # Tokens left after the latest take/peek (whichever key); read for the upstream budget
+        self.last_remaining: Optional[float] = None
+
+    def _decision(self, allowed: bool, tokens: float, cost: float, floor: float) -> Decision:
+        retry_after = 0.0 if allowed else max(cost + floor - tokens, 0.0) / self.rate
+        return Decision(allowed, tokens, retry_after)
+
+    def _take_local(self, key: str, cost: float, floor: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._local.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        allowed = tokens - cost >= floor
+        if allowed:
+            tokens -= cost
+        self._local[key] = (tokens, now)
+        if len(self._local) > self.max_local_keys:
+            self._prune(now)
+        return allowed, tokens
+
+    def _prune(self, now: float) -> None:
+        """Forget buckets that have refilled (they start full anyway), else the older half"""
+        full = [k for k, (tokens, updated) in self._local.items() if tokens + (now - updated) * self.rate >= self.capacity]
+        for k in full:
+            del self._local[k]
+        if len(self._local) > self.max_local_keys:
+            for k in list(self._local)[: len(self._local) // 2]:
+                del self._local[k]
+
+    async def _take_redis(self, redis, key: str, cost: float, floor: float) -> tuple[bool, float]:
+        if self._script is None or self._script.registered_client is not redis:
+            self._script = redis.register_script(TAKE_SCRIPT)
+        allowed, tokens = await self._script(keys=[f"rl:{self.name}:{key}"], args=[self.rate, self.capacity, cost, floor])
+        return bool(int(allowed)), float(tokens)
+
+    async def _take(self, key: str, cost: float, floor: float) -> tuple[bool, float]:
+        redis = cache.forecast_cache.redis
+        if redis is not None:
+            try:
+                return await self._take_redis(redis, key, cost, floor)
+            except Exception as e:
+                self.redis_errors += 1
+                print(f"Redis rate limit failed, using the local bucket: {e}")
+        return self._take_local(key, cost, floor)
+
+    async def take(self, key: str = "", cost: float = 1.0, floor: float = 0.0) -> Decision:
+        if not self.enabled:
+            return Decision(True, self.capacity, 0.0)
+        allowed, tokens = await self._take(key, cost, floor)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        self.last_remaining = tokens
+        return self._decision(allowed, tokens, cost, floor)
+
+    async def peek(self, key: str = "") -> float:
+        """Tokens currently in the bucket (refilled, nothing taken)"""
+        if not self.enabled:
+            return self.capacity
+        _, tokens = await self._take(key, 0.0, 0.0)
+        self.last_remaining = tokens
+        return tokens
+
+    def reset(self) -> None:
+        self._local.clear()
+        self.last_remaining = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rate_per_s": self.rate,
+            "capacity": self.capacity,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "redis_errors": self.redis_errors,
+        }
+
+
+# -------------------------------
+# Per-client edge limit
+# -------------------------------
+client_limiter = TokenBucket("client", config.CLIENT_RATE_PER_SECOND, config.CLIENT_BURST)
+
+
+def client_key(headers: Mapping[str, str], host: Optional[str]) -> str:
+    """API key if the client sends one (hashed, it ends up in Redis keys), else its address"""
+    api_key = headers.get("x-api-key")
+    if api_key:
+        return "key:" + hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+    return "ip:" + (host or "unknown")
+
+
+# -------------------------------
+# Global upstream budget
+# -------------------------------
+upstream_budget = TokenBucket(
+    "upstream",
+    config.UPSTREAM_DAILY_BUDGET / 86400.0,
+    config.UPSTREAM_BUDGET_BURST,
+)
+
+# Set while running background work that should leave the reserve to on-demand requests
+_background: contextvars.ContextVar[bool] = contextvars.ContextVar("upstream_background", default=False)
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Mark upstream calls made inside (and in tasks started inside) as background work"""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+async def take_upstream(cost: int) -> Decision:
+    """Spend cost tokens of the upstream budget (background work keeps the reserve untouched)"""
+    floor = config.UPSTREAM_BUDGET_RESERVE * upstream_budget.capacity if _background.get() else 0.0
+    return await upstream_budget.take(cost=cost, floor=floor)
+
+
+def upstream_remaining() -> Optional[float]:
+    """Tokens left after the last upstream spend (None before the first one)"""
+    return upstream_budget.last_remaining
+
+
+def reset() -> None:
+    client_limiter.reset()
+    upstream_budget.reset()
+
+
+async def stats() -> dict:
+    remaining = await upstream_budget.peek()
+    return {
+        "client": client_limiter.stats(),
+        "upstream": {
+            **upstream_budget.stats(),
+            "daily_budget": config.UPSTREAM_DAILY_BUDGET,
+            "reserve": config.UPSTREAM_BUDGET_RESERVE,
+            "remaining": round(remaining, 1),
+        },
+    }
@@ -0,0 +1,325 @@
+"""
+Offline upstream: record Open-Meteo responses into an archive and replay
+them without network.
+
+RecordingTransport wraps the real transport and keeps every successful
+response, keyed by method, URL path and sorted query parameters.
+Multi-location responses are also split per location, so replay can
+answer batches grouped differently from the recording. save() writes a
+single archive file:
+
+    zlib-compressed bodies | JSON index | index length (8 bytes) | MAGIC
+
+ReplayTransport memory-maps the archive and serves matching responses
+with optional simulated latency (+ exponential jitter) and injected 503s.
+Recorded forecast dates are shifted by the days since recording, so an
+old archive still covers today's horizon. A request with no recording
+raises ReplayMiss (an httpx.TransportError), which the API treats like
+any upstream outage.
+
+Set UPSTREAM_RECORD_PATH or UPSTREAM_REPLAY_PATH to use them in the API
+(see app/http_client.py; record with one worker, as app/serve.py enforces),
+or from apps/api:
+
+    python -m app.replay record upstream.replay --location 59.33,18.07
+    python -m app.replay info tests/fixtures/stub_upstream.replay
+"""
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import random
+import struct
+import zlib
+from datetime import date, timedelta
+from typing import Optional
+
+import httpx
+import orjson
+
+from app import config
+
+MAGIC = b"WFREPLY1"
+_TRAILER = struct.Struct("<Q")
+
+# Query parameters holding comma-separated per-location values
+LOCATION_PARAMS = ("latitude", "longitude")
+
+
+class ReplayMiss(httpx.TransportError):
+    """No recorded response for the request"""
+
+
+def request_key(method: str, url: httpx.URL, params: Optional[dict[str, str]] = None) -> str:
+    """Stable key for a request: method, host and path, and sorted query parameters"""
+    query = params if params is not None else dict(url.params.multi_items())
+    encoded = "&".join(f"{name}={query[name]}" for name in sorted(query))
+    return f"{method} {url.host}{url.path}?{encoded}"
+
+
+def location_keys(method: str, url: httpx.URL) -> list[str]:
+    """One key per location of a multi-location request (empty for single-location ones)"""
+    query = dict(url.params.multi_items())
+    values = [query.get(name, "").split(",") for name in LOCATION_PARAMS]
+    if len(values[0]) < 2 or any(len(v) != len(values[0]) for v in values):
+        return []
+    return [
+        request_key(method, url, {**query, **dict(zip(LOCATION_PARAMS, location))})
+        for location in zip(*values)
+    ]
+
+
+def write_archive(path: str, entries: dict[str, tuple[int, str, bytes]], recorded_on: date) -> None:
+    """Write (status, content type, body) entries atomically"""
+    index = {}
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp, "wb") as f:
+        offset = 0
+        for key in sorted(entries):
+            status, content_type, body = entries[key]
+            packed = zlib.compress(body, 9)
+            f.write(packed)
+            index[key] = [offset, len(packed), status, content_type]
+            offset += len(packed)
+        header = json.dumps({"recorded_on": recorded_on.isoformat(), "entries": index}, separators=(",", ":")).encode()
+        f.write(header)
+        f.write(_TRAILER.pack(len(header)))
+        f.write(MAGIC)
+    os.replace(tmp, path)
+
+
+class Archive:
+    """Read-only, memory-mapped recording; bodies are decompressed on access"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = len(self._map) - len(MAGIC)
+        if tail < _TRAILER.size or self._map[tail:] != MAGIC:
+            raise ValueError(f"{path} is not a replay archive")
+        (header_size,) = _TRAILER.unpack_from(self._map, tail - _TRAILER.size)
+        header_start = tail - _TRAILER.size - header_size
+        header = json.loads(self._map[header_start:tail - _TRAILER.size])
+        self.recorded_on = date.fromisoformat(header["recorded_on"])
+        self.index: dict[str, list] = header["entries"]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def get(self, key: str) -> Optional[tuple[int, str, bytes]]:
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        offset, size, status, content_type = entry
+        return status, content_type, zlib.decompress(memoryview(self._map)[offset:offset + size])
+
+    def entries(self) -> dict[str, tuple[int, str, bytes]]:
+        return {key: self.get(key) for key in self.index}
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def shift_dates(body: bytes, days: int) -> bytes:
+    """Move the daily "time" columns of an Open-Meteo body (one location or a list) by days"""
+    data = orjson.loads(body)
+    for location in data if isinstance(data, list) else [data]:
+        daily = location.get("daily") if isinstance(location, dict) else None
+        if daily and "time" in daily:
+            daily["time"] = [(date.fromisoformat(day) + timedelta(days=days)).isoformat() for day in daily["time"]]
+    return orjson.dumps(data)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Pass requests through and keep successful responses for save()"""
+
+    def __init__(self, path: str, inner: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self.path = path
+        self.inner = inner or httpx.AsyncHTTPTransport(
+            http2=config.HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        # Re-recording adds to (and overrides) an existing archive
+        self.entries: dict[str, tuple[int, str, bytes]] = {}
+        if os.path.exists(path):
+            archive = Archive(path)
+            shift = (date.today() - archive.recorded_on).days
+            for key, (status, content_type, body) in archive.entries().items():
+                self.entries[key] = (status, content_type, shift_dates(body, shift) if shift else body)
+            archive.close()
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        content_type = response.headers.get("content-type", "application/json")
+        if response.status_code == 200:
+            self.record(request, content_type, body)
+        # Body is already decoded, so drop content-encoding and friends
+        return httpx.Response(response.status_code, headers={"content-type": content_type}, content=body, request=request)
+
+    def record(self, request: httpx.Request, content_type: str, body: bytes) -> None:
+        self.entries[request_key(request.method, request.url)] = (200, content_type, body)
+        keys = location_keys(request.method, request.url)
+        if keys:
+            locations = orjson.loads(body)
+            if isinstance(locations, list) and len(locations) == len(keys):
+                for key, location in zip(keys, locations):
+                    self.entries[key] = (200, content_type, orjson.dumps(location))
+
+    def save(self) -> None:
+        write_archive(self.path, self.entries, date.today())
+        print(f"Recorded {len(self.entries)} upstream responses to {self.path}")
+
+    async def aclose(self) -> None:
+        # Shared by every client http_client creates (one per event loop); the
+        # pooled connections go away with the process
+        pass
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serve requests from an Archive with optional latency and error injection"""
+
+    def __init__(
+        self,
+        archive: Archive,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        rebase_dates: bool = True,
+    ) -> None:
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.rebase_dates = rebase_dates
+        self._bodies: dict[tuple[str, int], Optional[tuple[int, str, bytes]]] = {}
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def delay(self) -> float:
+        return self.latency + (self.random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0)
+
+    def _entry(self, key: str) -> Optional[tuple[int, str, bytes]]:
+        shift = (date.today() - self.archive.recorded_on).days if self.rebase_dates else 0
+        cached = self._bodies.get((key, shift))
+        if cached is None and (key, shift) not in self._bodies:
+            cached = self.archive.get(key)
+            if cached is not None and shift and "json" in cached[1]:
+                cached = (cached[0], cached[1], shift_dates(cached[2], shift))
+            self._bodies[(key, shift)] = cached
+        return cached
+
+    def lookup(self, request: httpx.Request) -> Optional[httpx.Response]:
+        entry = self._entry(request_key(request.method, request.url))
+        if entry is None:
+            # A batch grouped differently from the recording: assemble it per location
+            parts = [self._entry(key) for key in location_keys(request.method, request.url)]
+            if parts and all(part is not None for part in parts):
+                entry = (200, parts[0][1], b"[" + b",".join(part[2] for part in parts) + b"]")
+        if entry is None:
+            return None
+        status, content_type, body = entry
+        return httpx.Response(status, headers={"content-type": content_type}, content=body, request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return httpx.Response(503, request=request)
+        response = self.lookup(request)
+        if response is None:
+            self.misses += 1
+            raise ReplayMiss(f"No recorded response for {request_key(request.method, request.url)}", request=request)
+        self.hits += 1
+        return response
+
+    async def aclose(self) -> None:
+        # The archive outlives the clients http_client recreates per event loop
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.archive),
+            "recorded_on": self.archive.recorded_on.isoformat(),
+            "calls": self.calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "injected_errors": self.errors,
+        }
+
+
+def from_config() -> Optional[httpx.AsyncBaseTransport]:
+    """Replay or recording transport from UPSTREAM_REPLAY_PATH / UPSTREAM_RECORD_PATH (replay wins)"""
+    if config.UPSTREAM_REPLAY_PATH:
+        return ReplayTransport(
+            Archive(config.UPSTREAM_REPLAY_PATH),
+            latency=config.REPLAY_LATENCY,
+            error_rate=config.REPLAY_ERROR_RATE,
+        )
+    if config.UPSTREAM_RECORD_PATH:
+        return RecordingTransport(config.UPSTREAM_RECORD_PATH)
+    return None
+
+
+async def record_locations(path: str, locations: list[tuple[float, float]], inner: Optional[httpx.AsyncBaseTransport] = None) -> int:
+    """Record the forecast of every location's grid cell, one call each (replay assembles batches)"""
+    from app import cache, forecast, http_client
+
+    recorder = RecordingTransport(path, inner)
+    http_client.use_transport(recorder)
+    try:
+        cells = list(dict.fromkeys(cache.snap_to_grid(lat, lon) for lat, lon in locations))
+        for cell in cells:
+            await forecast.fetch_series_many([cell])
+    finally:
+        http_client.use_transport(None)
+    recorder.save()
+    return recorder.calls
+
+
+def _location(value: str) -> tuple[float, float]:
+    lat, lon = value.split(",")
+    return float(lat), float(lon)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="fetch live forecasts for locations into an archive")
+    record.add_argument("path")
+    record.add_argument("--location", type=_location, action="append", required=True, metavar="LAT,LON")
+    info = commands.add_parser("info", help="list the requests recorded in an archive")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        asyncio.run(record_locations(args.path, args.location))
+        return
+    archive = Archive(args.path)
+    print(f"{args.path}: {len(archive)} responses recorded on {archive.recorded_on}, {os.path.getsize(args.path):,} bytes")
+    for key, (_, size, status, _) in sorted(archive.index.items()):
+        print(f"  {status} {size:7,d} B  {key}")
+
+
+if __name__ == "__main__":
+    main()
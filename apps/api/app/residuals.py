@@ -0,0 +1,123 @@
+"""
+Residual lookup tables for the AI offset and empirical uncertainty bands.
+The offline job (app/jobs/aggregate_residuals.py) reduces the residuals
+table (resid = observed - predicted) to per-(month, lead_days) statistics
+and writes them as one small float32 array. The API loads it at startup
+and reloads it when the file changes, so the request path only does an
+O(1) array lookup.
+"""
+import asyncio
+import os
+from typing import Optional
+
+import numpy as np
+
+from app import config
+
+# Last axis of the table
+STATS = ("count", "mean", "q025", "q10", "q90", "q975")
+COUNT, MEAN, Q025, Q10, Q90, Q975 = range(len(STATS))
+
+# Empirical bands are never narrower than the heuristic's 1.0 minimum
+MIN_HALF_WIDTH = 1.0
+
+
+class ResidualTable:
+    """(12 months, lead days, stats) array; leads past the end use the last row"""
+
+    def __init__(self, data: np.ndarray, version: str = "") -> None:
+        self.data = data
+        self.version = version
+        self.max_lead = data.shape[1] - 1
+
+    def lookup_many(self, month, lead_days, min_samples: int = config.RESIDUALS_MIN_SAMPLES) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Offsets and band offsets for arrays of target month (1-12) and lead days.
+        Returns (ai_offset, bands) where bands has rows (lo95, lo80, hi80, hi95)
+        relative to the offset-corrected temperature. Cells with fewer than
+        min_samples residuals get offset 0 and NaN bands (use the heuristic).
+        """
+        month = np.asarray(month, dtype=np.int64) - 1
+        lead = np.clip(np.asarray(lead_days, dtype=np.int64), 0, self.max_lead)
+        stats = self.data[month, lead].astype(np.float64)
+        known = stats[..., COUNT] >= min_samples
+
+        mean = stats[..., MEAN]
+        lo80 = np.minimum(stats[..., Q10] - mean, -MIN_HALF_WIDTH)
+        hi80 = np.maximum(stats[..., Q90] - mean, MIN_HALF_WIDTH)
+        lo95 = np.minimum(stats[..., Q025] - mean, lo80)
+        hi95 = np.maximum(stats[..., Q975] - mean, hi80)
+
+        offset = np.where(known, mean, 0.0)
+        bands = np.where(known, np.stack([lo95, lo80, hi80, hi95]), np.nan)
+        return offset, bands
+
+    def lookup(self, month: int, lead_days: int) -> Optional[tuple[float, tuple[float, float, float, float]]]:
+        """Scalar lookup (plain indexing, no array temporaries); None when there are too few residuals"""
+        count, mean, q025, q10, q90, q975 = self.data[month - 1, min(max(lead_days, 0), self.max_lead)].tolist()
+        if count < config.RESIDUALS_MIN_SAMPLES:
+            return None
+        lo80 = min(q10 - mean, -MIN_HALF_WIDTH)
+        hi80 = max(q90 - mean, MIN_HALF_WIDTH)
+        return mean, (min(q025 - mean, lo80), lo80, hi80, max(q975 - mean, hi80))
+
+
+def save(path: str, data: np.ndarray) -> None:
+    """Atomically replace the table file (the API reloads on mtime change)"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, data.astype(np.float32, copy=False))
+    os.replace(tmp, path)
+
+
+_table: Optional[ResidualTable] = None
+_loaded_mtime: Optional[float] = None
+
+
+def load(path: str = config.RESIDUALS_PATH) -> Optional[ResidualTable]:
+    """Load the table into memory; without a file the offset stays 0 and bands use the heuristic"""
+    global _table, _loaded_mtime
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    _table = ResidualTable(np.load(path), version=str(stat.st_mtime_ns))
+    _loaded_mtime = stat.st_mtime
+    return _table
+
+
+def reload_if_changed(path: str = config.RESIDUALS_PATH) -> bool:
+    if not path or not os.path.exists(path):
+        return False
+    if os.path.getmtime(path) == _loaded_mtime:
+        return False
+    load(path)
+    return True
+
+
+async def run_reloader(path: str = config.RESIDUALS_PATH, interval: float = config.RESIDUALS_RELOAD_INTERVAL) -> None:
+    """Background loop started from the FastAPI lifespan"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if reload_if_changed(path):
+                print(f"Reloaded residual tables from {path}")
+        except Exception as e:
+            print(f"Error reloading residual tables: {e}")
+
+
+def get_table() -> Optional[ResidualTable]:
+    return _table
+
+
+def set_table(table: Optional[ResidualTable]) -> None:
+    global _table
+    _table = table
+
+
+def lookup(month: int, lead_days: int) -> Optional[tuple[float, tuple[float, float, float, float]]]:
+    """(ai_offset, (lo95, lo80, hi80, hi95)) for the request path, or None"""
+    return _table.lookup(month, lead_days) if _table is not None else None
+
+
+def version() -> str:
+    return _table.version if _table is not None else "none"
@@ -0,0 +1,76 @@
+"""
+Fast response path for predictions.
+Predictions are built as slotted dataclasses and serialized with orjson
+directly, without constructing and re-validating a Pydantic model per
+request (PredictionResponse in app/main.py only documents the schema).
+Responses that can be memoized carry an ETag derived from the inputs
+version (forecast run, lead, residual tables, model version), the grid
+cell and the target date, so clients and CDNs can revalidate with 304s.
+"""
+import hashlib
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+import orjson
+
+from app import cache, config
+
+
+@dataclass(slots=True)
+class Explain:
+    """How a prediction was made"""
+
+    anchor: Optional[float]
+    climo: float
+    w_anchor: float
+    ai_offset: float
+    days_ahead: int
+    climo_std: float
+
+
+@dataclass(slots=True)
+class Prediction:
+    temp: float
+    low80: float
+    high80: float
+    low95: float
+    high95: float
+    explain: Explain
+
+    def to_dict(self) -> dict:
+        """Plain dict (for the prediction cache and the predictions table)"""
+        return asdict(self)
+
+
+def dumps(value: Any) -> bytes:
+    """JSON bytes; dataclasses, dicts and NumPy scalars serialize natively"""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def etag(version: str, grid_lat: float, grid_lon: float, target_date: date) -> str:
+    digest = hashlib.blake2b(f"{version}|{grid_lat}|{grid_lon}|{target_date}".encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == tag for c in candidates)
+
+
+def cache_control(now: Optional[datetime] = None) -> str:
+    """
+    Cacheable until the next forecast run is published or the local date
+    changes (days_ahead, and with it the inputs version, moves at midnight).
+    """
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    max_age = int(min(cache.model_run_ttl(), (midnight - now).total_seconds()))
+    return f"public, max-age={max(max_age, 0)}, stale-while-revalidate={int(config.FORECAST_STALE_GRACE)}"
+
+
+# Responses computed without a fresh forecast must not be reused
+NO_STORE = "no-store"
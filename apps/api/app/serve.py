@@ -0,0 +1,44 @@
+"""
+Production entry point: WEB_CONCURRENCY uvicorn worker processes sharing
+one listening socket.
+
+Each worker has its own event loop and in-process cache tier; forecasts
+and predictions are shared between workers through Redis, and the
+climatology grid is one memory-mapped file in the OS page cache. A worker
+runs the lifespan startup (including the preload phase) before it accepts
+connections, so a restarted worker never takes traffic cold.
+
+Recording the upstream (UPSTREAM_RECORD_PATH) needs a single worker:
+each worker would write its own responses over the same archive on shutdown.
+
+Usage (from apps/api):
+    python -m app.serve --workers 4
+"""
+import argparse
+
+import uvicorn
+
+from app import config
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--workers", type=int, default=config.WEB_CONCURRENCY)
+    args = parser.parse_args(argv)
+    if config.UPSTREAM_RECORD_PATH and args.workers > 1:
+        parser.error("UPSTREAM_RECORD_PATH is set: record with --workers 1")
+
+    # Workers import the app themselves, so it is passed as an import string
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=max(args.workers, 1),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Request coalescing (single-flight) for asyncio.
+Concurrent callers asking for the same key share one in-flight call
+instead of each hitting the upstream, which stops the thundering herd on
+cold keys and on cache expiry.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+    The first caller starts the call; later callers for the same key wait on
+    the same task and get the same result or exception. The task is shielded,
+    so a caller that times out or is cancelled does not abort it for others.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        self.timeout = timeout
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter timed out
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Await fn() for this key, joining an in-flight call if there is one"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self.coalesced += 1
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
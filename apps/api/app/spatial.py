@@ -0,0 +1,78 @@
+"""
+Canonical spatial cells.
+Coordinates are quantized onto a regular lat/lon grid and identified by
+an integer cell id (row-major from the south-west corner, row 0 at -90,
+column 0 at -180). Every cache key, database lookup and climatology
+lookup goes through the same cell centres, so coordinates a few metres
+apart share one entry everywhere. Latitudes are clamped to [-90, 90],
+longitudes wrap (180 and -180 are the same cell), and centres are rounded
+so they compare equal as floats (no 59.300000000000004, no -0.0).
+
+With the default 0.1 degree forecast grid a point is at most ~7.8 km from
+its cell centre, well inside the resolution of the upstream models.
+Interpolation between climatology grid points at a cell centre is done by
+ClimatologyGrid.interpolate (app/climo_grid.py).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from app import config
+
+# Cell centres are rounded to this many decimals (~0.1 m)
+DECIMALS = 6
+
+
+class CellGrid:
+    """Quantization of coordinates onto cells of resolution degrees"""
+
+    def __init__(self, resolution: float) -> None:
+        self.resolution = resolution
+        self.rows = int(round(180.0 / resolution)) + 1
+        self.cols = int(round(360.0 / resolution))
+
+    def index(self, lat: float, lon: float) -> tuple[int, int]:
+        """(row, col) of the cell whose centre is nearest to the point"""
+        row = min(max(round((lat + 90.0) / self.resolution), 0), self.rows - 1)
+        col = round((lon + 180.0) / self.resolution) % self.cols
+        return row, col
+
+    def cell_id(self, lat: float, lon: float) -> int:
+        row, col = self.index(lat, lon)
+        return row * self.cols + col
+
+    def center(self, cell_id: int) -> tuple[float, float]:
+        """Canonical (lat, lon) of a cell"""
+        row, col = divmod(cell_id, self.cols)
+        # + 0.0 turns -0.0 into 0.0
+        return (
+            round(row * self.resolution - 90.0, DECIMALS) + 0.0,
+            round(col * self.resolution - 180.0, DECIMALS) + 0.0,
+        )
+
+    def snap(self, lat: float, lon: float) -> tuple[float, float]:
+        return self.center(self.cell_id(lat, lon))
+
+    def cell_ids(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Vectorized cell_id() (same rounding as the scalar path)"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows = np.clip(np.round((lats + 90.0) / self.resolution), 0, self.rows - 1).astype(np.int64)
+        cols = np.mod(np.round((lons + 180.0) / self.resolution).astype(np.int64), self.cols)
+        return rows * self.cols + cols
+
+    def centers(self, cell_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized center()"""
+        rows, cols = np.divmod(np.asarray(cell_ids, dtype=np.int64), self.cols)
+        lats = np.round(rows * self.resolution - 90.0, DECIMALS) + 0.0
+        lons = np.round(cols * self.resolution - 180.0, DECIMALS) + 0.0
+        return lats, lons
+
+
+@lru_cache(maxsize=8)
+def cell_grid(resolution: float = config.FORECAST_GRID_DEG) -> CellGrid:
+    return CellGrid(resolution)
+
+
+# Cells of the upstream forecast grid: the unit of caching and storage
+forecast_cells = cell_grid(config.FORECAST_GRID_DEG)
@@ -0,0 +1,210 @@
+"""
+Startup warm-up and import-time budget.
+
+The lifespan registers each heavy subsystem (HTTP client, Redis, database,
+climatology grid, residual tables, hot-data preload) as a warm-up step.
+Independent steps run concurrently; blocking loads run in threads. The
+lifespan waits at most STARTUP_BUDGET seconds, after which unfinished
+steps keep running in the background and /ready answers 503 until they
+are done. Each step's status and duration is reported on /ready.
+
+Import time is checked separately (it happens before the lifespan):
+
+    python -m app.startup            # top imports by cumulative time
+    python -m app.startup --check    # exit 1 if over STARTUP_IMPORT_BUDGET
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from app import config
+
+PENDING, RUNNING, READY, SKIPPED, FAILED = "pending", "running", "ready", "skipped", "failed"
+
+
+class Step:
+    """One subsystem warm-up; fn returns False when there is nothing to do"""
+
+    __slots__ = ("name", "fn", "after", "required", "status", "seconds", "error", "task")
+
+    def __init__(self, name: str, fn: Callable[[], Awaitable[Any]], after: tuple[str, ...], required: bool) -> None:
+        self.name = name
+        self.fn = fn
+        self.after = after
+        self.required = required
+        self.status = PENDING
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def done(self) -> bool:
+        return self.status in (READY, SKIPPED, FAILED)
+
+
+class Warmup:
+    """Concurrent warm-up steps with dependencies and a time budget"""
+
+    def __init__(self) -> None:
+        self.steps: dict[str, Step] = {}
+        self.import_seconds: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.budget: Optional[float] = None
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[Any]],
+        after: tuple[str, ...] = (),
+        required: bool = True,
+    ) -> None:
+        """Register a step; optional steps may fail without making the process unready"""
+        self.steps[name] = Step(name, fn, after, required)
+
+    async def _run_step(self, step: Step) -> None:
+        for name in step.after:
+            dependency = self.steps[name].task
+            if dependency is not None:
+                await asyncio.wait({dependency})
+        step.status = RUNNING
+        started = time.perf_counter()
+        try:
+            result = await step.fn()
+            step.status = SKIPPED if result is False else READY
+        except Exception as e:
+            step.status = FAILED
+            step.error = str(e) or type(e).__name__
+            print(f"Warm-up of {step.name} failed: {step.error}")
+        finally:
+            step.seconds = time.perf_counter() - started
+            if self.finished_at is None and all(s.done() for s in self.steps.values()):
+                self.finished_at = time.perf_counter()
+
+    async def run(self, budget: float = config.STARTUP_BUDGET) -> bool:
+        """Start every step and wait up to budget seconds; True when all finished in time"""
+        self.budget = budget
+        self.started_at = time.perf_counter()
+        for step in self.steps.values():
+            step.task = asyncio.create_task(self._run_step(step))
+        tasks = [step.task for step in self.steps.values()]
+        if not tasks:
+            self.finished_at = self.started_at
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=budget)
+        if pending:
+            late = [step.name for step in self.steps.values() if not step.done()]
+            print(f"Startup budget of {budget}s exceeded; still warming up in the background: {', '.join(late)}")
+        return not pending
+
+    def cancel(self) -> None:
+        for step in self.steps.values():
+            if step.task is not None and not step.task.done():
+                step.task.cancel()
+
+    def ready(self) -> bool:
+        """Every step finished and no required one failed"""
+        return all(
+            step.done() and not (step.required and step.status == FAILED)
+            for step in self.steps.values()
+        )
+
+    def report(self) -> dict:
+        total = None
+        if self.started_at is not None and self.finished_at is not None:
+            total = round(self.finished_at - self.started_at, 3)
+        return {
+            "ready": self.ready(),
+            "import_seconds": round(self.import_seconds, 3) if self.import_seconds is not None else None,
+            "warmup_seconds": total,
+            "budget_seconds": self.budget,
+            "subsystems": {
+                step.name: {
+                    "status": step.status,
+                    "required": step.required,
+                    "seconds": round(step.seconds, 3) if step.seconds is not None else None,
+                    **({"error": step.error} if step.error else {}),
+                }
+                for step in self.steps.values()
+            },
+        }
+
+
+def in_thread(fn: Callable[..., Any], *args: Any) -> Callable[[], Awaitable[Any]]:
+    """Warm-up step that runs a blocking load off the event loop (None counts as skipped)"""
+
+    async def run() -> Any:
+        result = await asyncio.to_thread(fn, *args)
+        return False if result is None else result
+
+    return run
+
+
+# -------------------------------
+# Import-time profiling
+# -------------------------------
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) from `python -X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile_imports(module: str = "app.main") -> tuple[float, list[tuple[str, int, int]]]:
+    """Import module in a fresh interpreter; returns (wall seconds, importtime rows)"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def top_level(rows: list[tuple[str, int, int]]) -> dict[str, int]:
+    """Cumulative microseconds per top-level package (counted once, at its first import)"""
+    packages: dict[str, int] = {}
+    for module, _, cumulative in rows:
+        package = module.lstrip().split(".")[0]
+        # importtime lists a package after its submodules, so the largest entry is the package itself
+        packages[package] = max(packages.get(package, 0), cumulative)
+    return packages
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, default=config.STARTUP_IMPORT_BUDGET)
+    parser.add_argument("--check", action="store_true", help="exit 1 when the import takes longer than the budget")
+    args = parser.parse_args(argv)
+
+    elapsed, rows = profile_imports(args.module)
+    own = next((cumulative for module, _, cumulative in rows if module == args.module), 0) / 1e6
+    print(f"import {args.module}: {own:.3f}s ({elapsed:.3f}s with interpreter start), budget {args.budget}s")
+    # The module's own package includes everything it imports; list its dependencies instead
+    own_package = args.module.split(".")[0]
+    packages = sorted(
+        ((package, us) for package, us in top_level(rows).items() if package != own_package),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    for package, cumulative in packages[:args.top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {package}")
+    if args.check and own > args.budget:
+        raise SystemExit(f"import time {own:.3f}s exceeds the budget of {args.budget}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+SQLAlchemy table definitions, mirroring the Alembic migrations in
+alembic/versions/ (the migrations stay the source of truth for the schema).
+Imported on first use through app.db so processes without a database
+never load SQLAlchemy.
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+metadata = sa.MetaData()
+
+climatology_daily = sa.Table(
+    "climatology_daily",
+    metadata,
+    sa.Column("id", psql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+    sa.Column("lat", sa.Float(), nullable=False),
+    sa.Column("lon", sa.Float(), nullable=False),
+    sa.Column("doy", sa.Integer(), nullable=False),
+    sa.Column("tmean", sa.Float()),
+    sa.Column("tmin", sa.Float()),
+    sa.Column("tmax", sa.Float()),
+    sa.Column("period_start", sa.Date()),
+    sa.Column("period_end", sa.Date()),
+    sa.Column("source", sa.Text(), server_default=sa.text("'meteostat'")),
+    sa.Column("tmean_n", sa.Integer()),
+    sa.Column("tmin_n", sa.Integer()),
+    sa.Column("tmax_n", sa.Integer()),
+    sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")),
+)
+
+forecast_cache = sa.Table(
+    "forecast_cache",
+    metadata,
+    sa.Column("id", psql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+    sa.Column("lat", sa.Float(), nullable=False),
+    sa.Column("lon", sa.Float(), nullable=False),
+    sa.Column("run_time", sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column("target_date", sa.Date(), nullable=False),
+    sa.Column("tmean", sa.Float()),
+    sa.Column("payload", psql.JSONB()),
+    sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")),
+    sa.UniqueConstraint("lat", "lon", "run_time", "target_date", name="uq_fc_lat_lon_run_target"),
+)
+
+residuals = sa.Table(
+    "residuals",
+    metadata,
+    sa.Column("id", psql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+    sa.Column("month", sa.Integer()),
+    sa.Column("lead_days", sa.Integer()),
+    sa.Column("variable", sa.Text(), server_default=sa.text("'tmean'")),
+    sa.Column("resid", sa.Float(), nullable=False),
+    sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")),
+)
+
+backtest_runs = sa.Table(
+    "backtest_runs",
+    metadata,
+    sa.Column("id", psql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+    sa.Column("started_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")),
+    sa.Column("finished_at", sa.TIMESTAMP(timezone=True)),
+    sa.Column("params", psql.JSONB()),
+    sa.Column("summary", psql.JSONB()),
+)
+
+predictions = sa.Table(
+    "predictions",
+    metadata,
+    sa.Column("id", psql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+    sa.Column("lat", sa.Float, nullable=False),
+    sa.Column("lon", sa.Float, nullable=False),
+    sa.Column("target_date", sa.Date, nullable=False),
+    sa.Column("t_p50", sa.Float),
+    sa.Column("t_p10", sa.Float),
+    sa.Column("t_p90", sa.Float),
+    sa.Column("method", sa.Text),
+    sa.Column("components", psql.JSONB),
+    sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")),
+    sa.UniqueConstraint("lat", "lon", "target_date", name="uq_predictions_lat_lon_date"),
+)
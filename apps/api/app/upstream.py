@@ -0,0 +1,270 @@
+"""
+Resilience around the upstream forecast call (Open-Meteo).
+Every request goes through one Upstream guard that bounds concurrency,
+derives its timeout from recently observed latency, sends a hedged
+duplicate when the first attempt is slower than the usual p95, and trips
+a circuit breaker after repeated failures. While the breaker is open
+calls fail immediately, so the API falls back to climatology instead of
+holding workers for the full timeout.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+from app import config
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream was not called (breaker open, queue full) or timed out"""
+
+
+class CallSkipped(UpstreamUnavailable):
+    """fn decided not to call the upstream (e.g. out of budget): no verdict on its health"""
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies (seconds)"""
+
+    def __init__(self, window: int, min_samples: int) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-quantile of the window, or None until min_samples calls were seen"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures.
+    Open rejects calls for reset_timeout seconds, then half-open lets a
+    single probe through: success closes the breaker, failure reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            self.rejected += 1
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """The call ended without a verdict (cancelled, never sent)"""
+        self._probing = False
+
+
+def is_failure(error: BaseException) -> bool:
+    """Errors that say the upstream is unhealthy (a 4xx is our fault, not theirs)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, UpstreamUnavailable))
+
+
+class Upstream:
+    """Concurrency limit, adaptive timeout, hedging and circuit breaker for one upstream"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_timeout: float,
+        min_timeout: float,
+        max_timeout: float,
+        timeout_factor: float,
+        hedge_quantile: Optional[float],
+        breaker: CircuitBreaker,
+        latency: LatencyTracker,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.hedge_quantile = hedge_quantile
+        self.breaker = breaker
+        self.latency = latency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.queue_timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Like the HTTP client, a semaphore belongs to one event loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def timeout(self) -> float:
+        """timeout_factor x the observed p99, clamped; max_timeout until there is data"""
+        p99 = self.latency.percentile(0.99)
+        if p99 is None:
+            return self.max_timeout
+        return min(max(p99 * self.timeout_factor, self.min_timeout), self.max_timeout)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Send a second attempt once the first is slower than this (None: no hedging)"""
+        if not self.hedge_quantile:
+            return None
+        return self.latency.percentile(self.hedge_quantile)
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn() under the guard. fn must be safe to run twice (it is
+        hedged). Raises UpstreamUnavailable when the breaker is open, no
+        slot frees up within queue_timeout, or the adaptive timeout passes.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("upstream circuit is open")
+        semaphore = self._get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.breaker.release()
+            self.queue_timeouts += 1
+            raise UpstreamUnavailable("too many concurrent upstream calls")
+
+        self.calls += 1
+        timeout = self.timeout()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._hedged(fn, semaphore), timeout)
+        except (asyncio.CancelledError, CallSkipped):
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.failures += 1
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise UpstreamUnavailable(f"upstream timed out after {timeout:.2f}s") from e
+            raise
+        finally:
+            semaphore.release()
+
+        self.latency.record(time.perf_counter() - started)
+        self.breaker.record_success()
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[Any]], semaphore: asyncio.Semaphore) -> Any:
+        primary = asyncio.ensure_future(fn())
+        delay = self.hedge_delay()
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        hedge = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            # Hedges only use spare capacity; they never queue behind other calls
+            if not done and not semaphore.locked():
+                await semaphore.acquire()
+                hedge = asyncio.ensure_future(fn())
+                hedge.add_done_callback(lambda _: semaphore.release())
+                pending.add(hedge)
+                self.hedges += 1
+
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Every attempt failed: report the primary's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def reset(self) -> None:
+        """Forget latency history and close the breaker (tests, upstream swaps)"""
+        self.latency.samples.clear()
+        self.breaker.record_success()
+
+    def stats(self) -> dict:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "breaker_rejected": self.breaker.rejected,
+            "consecutive_failures": self.breaker.failures,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "queue_timeouts": self.queue_timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeout_s": round(self.timeout(), 3),
+            "latency_p50_ms": round(1000 * p50, 1) if p50 is not None else None,
+            "latency_p95_ms": round(1000 * p95, 1) if p95 is not None else None,
+        }
+
+
+def create_forecast_upstream() -> Upstream:
+    """Build the guard for Open-Meteo from config"""
+    return Upstream(
+        max_concurrency=config.UPSTREAM_MAX_CONCURRENCY,
+        queue_timeout=config.UPSTREAM_QUEUE_TIMEOUT,
+        min_timeout=config.UPSTREAM_TIMEOUT_MIN,
+        max_timeout=config.HTTP_TIMEOUT,
+        timeout_factor=config.UPSTREAM_TIMEOUT_FACTOR,
+        hedge_quantile=config.UPSTREAM_HEDGE_QUANTILE,
+        breaker=CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_SECONDS),
+        latency=LatencyTracker(config.UPSTREAM_LATENCY_WINDOW, config.UPSTREAM_LATENCY_MIN_SAMPLES),
+    )
+
+
+forecast_upstream = create_forecast_upstream()
@@ -0,0 +1 @@
+# Microbenchmarks and load harness for the API (python -m benchmarks --help)
@@ -0,0 +1,78 @@
+"""
+Run the benchmark suite.
+
+Usage (from apps/api):
+    python -m benchmarks micro
+    python -m benchmarks load --requests 5000 --concurrency 100 --latency-ms 80
+    python -m benchmarks all --save benchmarks/baselines/main.json
+    python -m benchmarks all --compare benchmarks/baselines/main.json --tolerance 0.15
+    python -m benchmarks load --record data/bench.replay --cells 200   # live Open-Meteo, once
+    python -m benchmarks load --replay data/bench.replay --latency-ms 80 --error-rate 0.01
+
+Exits with status 1 when --compare finds a regression.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from app import replay
+from benchmarks import baseline, load, micro
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suite", choices=("micro", "load", "all"))
+    parser.add_argument("--repeat", type=int, default=5, help="microbenchmark repeats (best is kept)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--cells", type=int, default=200, help="distinct locations in the request mix")
+    parser.add_argument("--days", type=int, default=60, help="lead days in the request mix")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="mean extra exponential latency")
+    parser.add_argument("--warm", action="store_true", help="warm the caches before measuring")
+    parser.add_argument("--replay", help="serve the upstream from this recorded archive instead of the stub")
+    parser.add_argument("--record", help="record the request mix's locations from the live upstream into this archive and exit")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls answered with 503")
+    parser.add_argument("--save", help="write the report as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        asyncio.run(replay.record_locations(args.record, load.plan_locations(args.cells)))
+        return 0
+
+    report = {"environment": baseline.environment()}
+    if args.suite in ("micro", "all"):
+        report["micro"] = micro.run(args.repeat)
+    if args.suite in ("load", "all"):
+        report["load"] = load.run(
+            requests=args.requests,
+            concurrency=args.concurrency,
+            cells=args.cells,
+            days=args.days,
+            latency=args.latency_ms / 1000,
+            jitter=args.jitter_ms / 1000,
+            warm=args.warm,
+            replay_path=args.replay,
+            error_rate=args.error_rate,
+        )
+    print(json.dumps({k: v for k, v in report.items() if k != "environment"}, indent=2))
+
+    if args.save:
+        baseline.save(args.save, report)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        previous = baseline.load(args.compare)
+        if "load" in report and "load" in previous and not baseline.same_load_setup(report["load"], previous["load"]):
+            print(f"Load setup differs from the baseline ({', '.join(baseline.LOAD_SETUP)}); skipping load comparison")
+        rows = baseline.compare(report, previous, args.tolerance)
+        print(baseline.format_rows(rows))
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Saved benchmark baselines and regression checks.
+A baseline is the JSON report of one run; comparing a new report against
+it flags microbenchmarks that got slower, and load runs whose p95 rose or
+throughput fell, by more than the tolerance.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+
+def environment() -> dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        revision = ""
+    return {
+        "revision": revision or None,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path: str, report: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _change(new: float, old: float) -> Optional[float]:
+    return (new - old) / old if old else None
+
+
+# Load numbers are only comparable between runs with the same setup
+LOAD_SETUP = (
+    "requests", "concurrency", "cells", "days", "upstream_latency_ms", "upstream_jitter_ms",
+    "error_rate", "replay", "warm",
+)
+
+
+def same_load_setup(a: dict, b: dict) -> bool:
+    return all(a.get(key) == b.get(key) for key in LOAD_SETUP)
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.2) -> list[dict]:
+    """One row per compared number; regression=True when it is worse by more than tolerance"""
+    rows = []
+    for name, result in report.get("micro", {}).items():
+        old = baseline.get("micro", {}).get(name)
+        if old:
+            change = _change(result["ns_per_op"], old["ns_per_op"])
+            rows.append({"metric": f"micro.{name}.ns_per_op", "old": old["ns_per_op"], "new": result["ns_per_op"],
+                         "change": change, "regression": change is not None and change > tolerance})
+
+    old_load, new_load = baseline.get("load"), report.get("load")
+    if old_load and new_load and same_load_setup(old_load, new_load):
+        for key, worse_if_higher in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("rps", False)):
+            change = _change(new_load[key], old_load[key])
+            worse = change is not None and (change > tolerance if worse_if_higher else change < -tolerance)
+            rows.append({"metric": f"load.{key}", "old": old_load[key], "new": new_load[key],
+                         "change": change, "regression": worse})
+    return rows
+
+
+def format_rows(rows: list[dict]) -> str:
+    lines = [f"{'metric':<44} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for row in rows:
+        change = f"{100 * row['change']:+.1f}%" if row["change"] is not None else "n/a"
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['metric']:<44} {row['old']:>12} {row['new']:>12} {change:>8}{flag}")
+    return "\n".join(lines)
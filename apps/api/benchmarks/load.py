@@ -0,0 +1,130 @@
+"""
+End-to-end load harness: drives /api/predict through ASGI (no sockets)
+at a fixed concurrency, with Open-Meteo replaced by the local stub or by
+a recorded archive (app/replay.py).
+"""
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import httpx
+import numpy as np
+
+from app import cache, http_client, predictions, ratelimit, replay, upstream
+from app.main import app
+from benchmarks.stub import OpenMeteoStub
+
+
+def _locations(rng: np.random.Generator, cells: int) -> tuple[np.ndarray, np.ndarray]:
+    return rng.uniform(-60, 70, cells).round(2), rng.uniform(-180, 180, cells).round(2)
+
+
+def plan_locations(cells: int, seed: int = 0) -> list[tuple[float, float]]:
+    """The distinct locations request_plan() draws from (to record them for replay)"""
+    lats, lons = _locations(np.random.default_rng(seed), cells)
+    return list(zip(lats.tolist(), lons.tolist()))
+
+
+def request_plan(requests: int, cells: int, days: int, seed: int = 0) -> list[dict]:
+    """Query params for each request: random cells (lat, lon) and lead days"""
+    rng = np.random.default_rng(seed)
+    lats, lons = _locations(rng, cells)
+    picks = rng.integers(0, cells, requests)
+    leads = rng.integers(0, days, requests)
+    today = date.today()
+    return [
+        {"lat": float(lats[c]), "lon": float(lons[c]), "date": (today + timedelta(days=int(d))).isoformat()}
+        for c, d in zip(picks, leads)
+    ]
+
+
+def summarize(latencies: list[float], seconds: float, errors: int) -> dict:
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "rps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3) if len(values) else 0.0,
+    }
+
+
+async def run_async(
+    requests: int = 2000,
+    concurrency: int = 50,
+    cells: int = 200,
+    days: int = 60,
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    warm: bool = False,
+    replay_path: Optional[str] = None,
+    error_rate: float = 0.0,
+) -> dict:
+    if replay_path:
+        source = replay.ReplayTransport(replay.Archive(replay_path), latency, jitter, error_rate)
+        http_client.use_transport(source)
+    else:
+        source = OpenMeteoStub(latency, jitter, error_rate)
+        http_client.use_transport(source.transport())
+    cache.forecast_cache.local.clear()
+    predictions.prediction_cache.clear()
+    upstream.forecast_upstream.reset()
+    # All benchmark traffic comes from one address and would be throttled
+    limiters = (ratelimit.client_limiter, ratelimit.upstream_budget)
+    enabled = [limiter.enabled for limiter in limiters]
+    for limiter in limiters:
+        limiter.enabled = False
+
+    plan = request_plan(requests, cells, days)
+    latencies: list[float] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if warm:
+                # One pass over the plan so the measured run is served from cache
+                await asyncio.gather(*(client.get("/api/predict", params=p) for p in plan[:cells * 2]))
+            queue = iter(plan)
+
+            async def worker() -> None:
+                nonlocal errors
+                for params in queue:
+                    started = time.perf_counter()
+                    response = await client.get("/api/predict", params=params)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            seconds = time.perf_counter() - started
+    finally:
+        http_client.use_transport(None)
+        for limiter, was_enabled in zip(limiters, enabled):
+            limiter.enabled = was_enabled
+
+    report = summarize(latencies, seconds, errors)
+    report.update({
+        "concurrency": concurrency,
+        "cells": cells,
+        "days": days,
+        "upstream_latency_ms": latency * 1000,
+        "upstream_jitter_ms": jitter * 1000,
+        "error_rate": error_rate,
+        "replay": os.path.basename(replay_path) if replay_path else None,
+        "upstream_calls": source.calls,
+        "warm": warm,
+    })
+    if replay_path:
+        report["replay_misses"] = source.misses
+    return report
+
+
+def run(**options) -> dict:
+    return asyncio.run(run_async(**options))
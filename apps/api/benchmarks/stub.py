@@ -0,0 +1,49 @@
+"""
+Local Open-Meteo stand-in for benchmarks.
+Answers forecast requests (single or comma-separated multi-location) with
+a deterministic 16-day series after an injectable latency, so load runs
+measure the API rather than the network.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import httpx
+
+
+class OpenMeteoStub:
+    """httpx transport factory that counts calls and sleeps latency (+ exponential jitter)"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def delay(self) -> float:
+        return self.latency + (self.random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.delay())
+        if self.error_rate and self.random.random() < self.error_rate:
+            return httpx.Response(503)
+
+        lats = request.url.params["latitude"].split(",")
+        days = int(request.url.params.get("forecast_days", 16))
+        today = datetime.now().date()
+        times = [(today + timedelta(days=i)).isoformat() for i in range(days)]
+        locations = []
+        for lat in lats:
+            base = 25 - abs(float(lat)) * 0.6
+            locations.append({"daily": {
+                "time": times,
+                "temperature_2m_mean": [round(base + 0.3 * i, 1) for i in range(days)],
+                "temperature_2m_min": [round(base - 4 + 0.3 * i, 1) for i in range(days)],
+                "temperature_2m_max": [round(base + 4 + 0.3 * i, 1) for i in range(days)],
+            }})
+        return httpx.Response(200, json=locations if len(locations) > 1 else locations[0])
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
@@ -0,0 +1,96 @@
+"""
+Shared test fixtures
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Union
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache, http_client, predictions, ratelimit, upstream
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "upstream(**options): shape the fake Open-Meteo of the mock_upstream fixture (see FakeOpenMeteo)",
+    )
+
+
+@pytest.fixture(autouse=True)
+def healthy_upstream():
+    """Every test starts with a closed breaker, no latency history and full rate-limit buckets"""
+    upstream.forecast_upstream.reset()
+    ratelimit.reset()
+    yield
+
+
+class FakeOpenMeteo:
+    """
+    Open-Meteo's daily endpoint behind an httpx.MockTransport.
+
+    Every location of a (comma-separated, multi-location) request gets a
+    forecast_days-long series starting today, series(lat, day) degrees on
+    each day; spread adds temperature_2m_min/max that far either side.
+    status (an int, or a function of the request) other than 200 answers
+    with that error instead, and delay (seconds, or a function of the call
+    number starting at 1) holds the response back. All of them can be
+    changed while a test runs; requests are kept in calls.
+    """
+
+    def __init__(
+        self,
+        series: Callable[[float, int], float] = lambda lat, day: 5.0 + day,
+        spread: float = 0.0,
+        status: Union[int, Callable[[httpx.Request], int]] = 200,
+        delay: Union[float, Callable[[int], float]] = 0.0,
+    ) -> None:
+        self.series = series
+        self.spread = spread
+        self.status = status
+        self.delay = delay
+        self.calls: list[httpx.Request] = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def daily(self, lat: float, days: int) -> dict:
+        today = datetime.now().date()
+        mean = [self.series(lat, i) for i in range(days)]
+        daily = {"time": [(today + timedelta(days=i)).isoformat() for i in range(days)], "temperature_2m_mean": mean}
+        if self.spread:
+            daily["temperature_2m_min"] = [t - self.spread for t in mean]
+            daily["temperature_2m_max"] = [t + self.spread for t in mean]
+        return {"daily": daily}
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        delay = self.delay(len(self.calls)) if callable(self.delay) else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        status = self.status(request) if callable(self.status) else self.status
+        if status != 200:
+            return httpx.Response(status)
+        days = int(request.url.params.get("forecast_days", 16))
+        locations = [self.daily(float(lat), days) for lat in request.url.params["latitude"].split(",")]
+        return httpx.Response(200, json=locations if len(locations) > 1 else locations[0])
+
+
+@pytest.fixture
+def mock_upstream(request):
+    """
+    Serve the upstream from a FakeOpenMeteo, configured by the closest
+    @pytest.mark.upstream(...) marker, with empty forecast and prediction
+    caches so requests reach it
+    """
+    marker = request.node.get_closest_marker("upstream")
+    fake = FakeOpenMeteo(**(marker.kwargs if marker else {}))
+    cache.forecast_cache.local.clear()
+    predictions.prediction_cache.clear()
+    http_client.use_transport(fake.transport)
+    yield fake
+    http_client.use_transport(None)
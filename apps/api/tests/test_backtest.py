@@ -0,0 +1,74 @@
+"""
+Tests for the backtest job (no database needed)
+"""
+
+import math
+import numpy as np
+from datetime import date, timedelta
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.jobs.backtest import crps_gaussian, read_table, run_backtest, score_shard
+
+
+def write_fixtures(tmp_path, obs_offset=0.0):
+    """Two locations, 20 issue dates, perfect 16-day forecasts of a constant 10 degrees"""
+    start = date(2024, 3, 1)
+    fc_lines = ["lat,lon,issue_date,date,tmean"]
+    obs_lines = ["lat,lon,date,tmean"]
+    for lat, lon in ((59.33, 18.07), (-33.87, 151.21)):
+        for i in range(60):
+            day = start + timedelta(days=i)
+            obs_lines.append(f"{lat},{lon},{day},{10.0 + obs_offset}")
+        for i in range(20):
+            issue = start + timedelta(days=i)
+            for lead in range(16):
+                fc_lines.append(f"{lat},{lon},{issue},{issue + timedelta(days=lead)},10.0")
+    (tmp_path / "fc.csv").write_text("\n".join(fc_lines) + "\n")
+    (tmp_path / "obs.csv").write_text("\n".join(obs_lines) + "\n")
+    forecasts = read_table(str(tmp_path / "fc.csv"), ("lat", "lon", "issue_date", "date", "tmean"))
+    observations = read_table(str(tmp_path / "obs.csv"), ("lat", "lon", "date", "tmean"))
+    return forecasts, observations
+
+
+class TestBacktest:
+    """Replay, join and scoring"""
+
+    def test_short_leads_are_exact(self, tmp_path):
+        forecasts, observations = write_fixtures(tmp_path)
+        parts = score_shard(forecasts, observations, max_lead=10)
+
+        # 2 locations x 20 issues x 11 leads, all observed
+        assert parts["n"].sum() == 2 * 20 * 11
+        assert np.allclose(parts["resid"], 0.0)
+        assert parts["in80"].sum() == parts["n"].sum()
+
+    def test_long_leads_reuse_day_10_anchor(self, tmp_path):
+        forecasts, observations = write_fixtures(tmp_path)
+        parts = score_shard(forecasts, observations, max_lead=30)
+        long = parts["lead"] > 10
+        assert long.any()
+        # Blend pulls toward climatology, so residuals appear past day 10
+        assert np.abs(parts["resid"][long]).max() > 0
+
+    def test_parallel_matches_single_shard(self, tmp_path):
+        forecasts, observations = write_fixtures(tmp_path, obs_offset=1.0)
+        summary, samples = run_backtest(forecasts, observations, max_lead=20, workers=2)
+        single = score_shard(forecasts, observations, max_lead=20)
+
+        assert summary["samples"] == len(samples["resid"]) == int(single["n"].sum())
+        assert summary["by_lead"]["0"]["mae"] == 1.0
+        assert abs(float(np.sort(samples["resid"]).sum()) - float(np.sort(single["resid"]).sum())) < 1e-3
+
+    def test_crps_matches_closed_form(self):
+        obs, mu, sigma = 1.3, 0.2, 1.7
+        z = (obs - mu) / sigma
+        expected = sigma * (
+            z * math.erf(z / math.sqrt(2))
+            + 2 * math.exp(-z * z / 2) / math.sqrt(2 * math.pi)
+            - 1 / math.sqrt(math.pi)
+        )
+        value = crps_gaussian(np.array([obs]), np.array([mu]), np.array([sigma]))[0]
+        assert abs(value - expected) < 1e-6
@@ -0,0 +1,60 @@
+"""
+Tests for the batch prediction endpoint
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def day(offset: int) -> str:
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+@pytest.mark.upstream(series=lambda lat, day: lat / 10 + day)
+@pytest.mark.usefixtures("mock_upstream")
+class TestBatchPrediction:
+    """POST /api/predict/batch"""
+
+    def post(self, items):
+        response = client.post("/api/predict/batch", json={"items": items})
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_results_in_input_order_with_one_upstream_call(self, mock_upstream):
+        lines = self.post([
+            {"lat": 50.0, "lon": 10.0, "date": day(2)},
+            {"lat": 40.0, "lon": 10.0, "date": day(3)},
+            {"lat": 50.01, "lon": 10.01, "date": day(4)},  # same grid cell as the first
+        ])
+
+        assert [line["index"] for line in lines] == [0, 1, 2]
+        assert [line["result"]["explain"]["anchor"] for line in lines] == [7.0, 7.0, 9.0]
+        assert len(mock_upstream.calls) == 1
+        assert mock_upstream.calls[0].url.params["latitude"] == "50.0,40.0"
+
+    def test_bad_items_do_not_fail_the_batch(self):
+        lines = self.post([
+            {"lat": 50.0, "lon": 10.0, "date": "not-a-date"},
+            {"lat": 50.0, "lon": 10.0, "date": day(-1)},
+            {"lat": 50.0, "lon": 10.0, "date": day(30)},
+        ])
+
+        assert "error" in lines[0]
+        assert "past dates" in lines[1]["error"]
+        assert lines[2]["result"]["explain"]["w_anchor"] < 0.5
+
+    def test_matches_single_endpoint(self):
+        date = day(12)
+        single = client.get("/api/predict", params={"lat": 50.0, "lon": 10.0, "date": date}).json()
+        batch = self.post([{"lat": 50.0, "lon": 10.0, "date": date}])
+        assert batch[0]["result"] == single
@@ -0,0 +1,40 @@
+"""
+Smoke tests for the benchmark suite (tiny runs; numbers are not asserted)
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import baseline, load, micro
+
+
+class TestBenchmarks:
+    """Harness runs against the stub and baselines flag regressions"""
+
+    def test_load_run_against_stub(self):
+        report = load.run(requests=60, concurrency=6, cells=5, days=30, latency=0.0)
+        assert report["requests"] == 60
+        assert report["errors"] == 0
+        # Each cell is fetched once; everything else comes from the caches
+        assert report["upstream_calls"] == 5
+        assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+
+    def test_micro_cases_run(self):
+        for fn in micro.cases(batch_size=10).values():
+            fn()
+
+    def test_compare_flags_regressions(self):
+        setup = load.run(requests=10, concurrency=2, cells=2, days=30, latency=0.0)
+        setup = {key: setup[key] for key in baseline.LOAD_SETUP}
+        old = {"micro": {"blend": {"ns_per_op": 100.0}}, "load": {**setup, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "rps": 100.0}}
+        new = {"micro": {"blend": {"ns_per_op": 130.0}}, "load": {**setup, "p50_ms": 1.0, "p95_ms": 2.1, "p99_ms": 3.0, "rps": 70.0}}
+
+        flagged = {row["metric"] for row in baseline.compare(new, old, tolerance=0.2) if row["regression"]}
+        assert flagged == {"micro.blend.ns_per_op", "load.rps"}
+
+        # Runs with a different setup are not compared
+        for key, value in (("concurrency", 50), ("upstream_jitter_ms", 20.0), ("error_rate", 0.1), ("replay", "x.replay")):
+            changed = {**new, "load": {**new["load"], key: value}}
+            assert all(row["metric"].startswith("micro.") for row in baseline.compare(changed, old)), key
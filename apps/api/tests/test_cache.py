@@ -0,0 +1,160 @@
+"""
+Tests for the two-tier forecast cache
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timezone
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.cache import TTLCache, TieredCache, model_run_ttl, snap_to_grid
+
+
+class TestTTLCache:
+    """In-process LRU tier"""
+
+    def test_lru_eviction(self):
+        local = TTLCache(maxsize=2)
+        local.set("a", 1, 60)
+        local.set("b", 2, 60)
+        assert local.get("a") == 1  # "b" is now least recently used
+        local.set("c", 3, 60)
+
+        assert local.get("b") is None
+        assert local.get("a") == 1
+        assert local.get("c") == 3
+        assert local.evictions == 1
+
+    def test_expiry(self):
+        local = TTLCache(maxsize=10)
+        local.set("a", 1, -1)
+        assert local.get("a") is None
+        assert local.expirations == 1
+        assert local.misses == 1
+
+    def test_grace_period_serves_stale(self):
+        local = TTLCache(maxsize=10)
+        local.set("a", 1, -1, grace=60)
+        assert local.get("a") is None
+        assert local.get_stale("a") == (1, True)
+        assert not local.is_fresh("a")
+
+        local.set("b", 2, -2, grace=1)
+        assert local.get_stale("b") == (None, False)
+        assert local.expirations == 1
+
+
+class TestTieredCache:
+    """Local tier backed by Redis (fakeredis stand-in)"""
+
+    def test_redis_tier_fills_local(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def run():
+            shared = fakeredis.FakeAsyncRedis()
+            writer = TieredCache("test", maxsize=10)
+            reader = TieredCache("test", maxsize=10)
+            writer.redis = shared
+            reader.redis = shared
+
+            await writer.set("k", [1.0, 2.0], 60)
+            first = await reader.get("k")
+            second = await reader.get("k")
+            return reader, first, second
+
+        reader, first, second = asyncio.run(run())
+        assert first == [1.0, 2.0]
+        assert second == [1.0, 2.0]
+        assert reader.redis_hits == 1
+        assert reader.local.hits == 1
+
+    def test_redis_ttl_includes_grace(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def run():
+            shared = fakeredis.FakeAsyncRedis()
+            writer = TieredCache("test", maxsize=10, grace=600)
+            reader = TieredCache("test", maxsize=10, grace=600)
+            writer.redis = shared
+            reader.redis = shared
+
+            await writer.set("fresh", 1, 60)
+            await shared.set("test:stale", "2", ex=300)  # past its TTL, inside the grace period
+            return (
+                await shared.ttl("test:fresh"),
+                await reader.get_stale("fresh"),
+                await reader.get("stale"),
+                await reader.get_stale("stale"),
+            )
+
+        redis_ttl, fresh, plain, stale = asyncio.run(run())
+        assert redis_ttl > 600
+        assert fresh == (1, False)
+        assert plain is None
+        assert stale == (2, True)
+
+    def test_warm_copies_fresh_redis_entries(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def run():
+            shared = fakeredis.FakeAsyncRedis()
+            writer = TieredCache("test", maxsize=10, grace=600)
+            worker = TieredCache("test", maxsize=10, grace=600)
+            writer.redis = shared
+            worker.redis = shared
+
+            await writer.set("a", 1, 60)
+            await shared.set("test:stale", "2", ex=300)
+            warmed = await worker.warm(["a", "stale", "missing"])
+            return warmed, worker.local.get("a")
+
+        warmed, value = asyncio.run(run())
+        assert warmed == 1
+        assert value == 1
+
+    def test_set_behind_writes_redis_in_background(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def run():
+            tiered = TieredCache("test", maxsize=10)
+            tiered.redis = fakeredis.FakeAsyncRedis()
+            tiered.set_behind("k", {"v": 1}, 60)
+            local = tiered.local.get("k")
+            await asyncio.sleep(0.01)
+            return local, await tiered.redis.get("test:k")
+
+        local, stored = asyncio.run(run())
+        assert local == {"v": 1}
+        assert stored == b'{"v": 1}'
+
+    def test_works_without_redis(self):
+        async def run():
+            tiered = TieredCache("test", maxsize=10)
+            miss = await tiered.get("k")
+            await tiered.set("k", 5, 60)
+            return miss, await tiered.get("k"), tiered.stats()
+
+        miss, hit, stats = asyncio.run(run())
+        assert miss is None
+        assert hit == 5
+        assert stats["hit_ratio"] == 0.5
+
+
+class TestForecastKeys:
+    """Grid snapping and model-run TTL"""
+
+    def test_nearby_points_share_a_cell(self):
+        assert snap_to_grid(59.3293, 18.0686) == snap_to_grid(59.3301, 18.0712)
+        assert snap_to_grid(59.3293, 18.0686) != snap_to_grid(59.4, 18.0686)
+
+    def test_ttl_ends_at_next_run(self, monkeypatch):
+        monkeypatch.setattr(config, "MODEL_RUN_INTERVAL_HOURS", 6)
+        monkeypatch.setattr(config, "MODEL_RUN_DELAY_MINUTES", 180)
+
+        # 00 UTC run is published at 03:00, the 06 UTC run at 09:00
+        now = datetime(2025, 1, 1, 4, 0, tzinfo=timezone.utc)
+        assert model_run_ttl(now) == 5 * 3600
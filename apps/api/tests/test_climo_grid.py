@@ -0,0 +1,140 @@
+"""
+Tests for the memory-mapped climatology grid and its build step
+"""
+
+import numpy as np
+from datetime import date
+from functools import lru_cache
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import climo_grid, engine
+from app.cache import snap_to_grid
+from app.jobs.build_climo_grid import build_grid, grid_axes
+from app.main import get_climatology
+
+
+@lru_cache(maxsize=1)
+def grid_data() -> tuple[np.ndarray, tuple]:
+    """
+    Global 1-degree test grid: tmean = lat + lon / 100 + doy / 1000, from
+    common-year normals (no February 29, day 60)
+    """
+    lats = [50.0, 51.0, 52.0]
+    lons = [float(x) for x in range(-180, 180)]
+    rows = [
+        (lat, lon, doy, lat + lon / 100 + doy / 1000, lat - 5, lat + 5)
+        for lat in lats for lon in lons for doy in range(1, 367) if doy != 60
+    ]
+    axes = grid_axes(lats, lons, resolution=1.0)
+    return build_grid(rows, *axes), axes
+
+
+def make_grid(path: str) -> climo_grid.ClimatologyGrid:
+    data, (lat0, dlat, _, lon0, dlon, _) = grid_data()
+    climo_grid.save(path, data, lat0, dlat, lon0, dlon)
+    return climo_grid.ClimatologyGrid.load(path)
+
+
+class TestClimatologyGrid:
+    """Bilinear lookups on the memory-mapped file"""
+
+    def test_is_memory_mapped(self, tmp_path):
+        grid = make_grid(str(tmp_path / "climo.npy"))
+        assert isinstance(grid.data, np.memmap)
+        assert grid.data.shape == (3, 3, 360, 366)
+        assert grid.wraps
+
+    def test_bilinear_interpolation(self, tmp_path):
+        grid = make_grid(str(tmp_path / "climo.npy"))
+        assert abs(grid.lookup(50.5, 45.0, 100) - (50.5 + 0.45 + 0.1)) < 1e-4
+        assert abs(grid.lookup(51.0, 0.0, 1, "tmin") - 46.0) < 1e-4
+
+    def test_missing_leap_day_is_interpolated(self, tmp_path):
+        grid = make_grid(str(tmp_path / "climo.npy"))
+        leap_day = climo_grid.calendar_day(date(2024, 2, 29))
+        assert abs(grid.lookup(50.0, 0.0, leap_day) - (50.0 + leap_day / 1000)) < 1e-4
+        assert grid.lookup(50.0, 0.0, 366) == np.float32(50.0 + 366 / 1000)
+
+    def test_missing_corner_is_reweighted(self, tmp_path):
+        grid = make_grid(str(tmp_path / "climo.npy"))
+        data = np.array(grid.data)
+        data[0, 1, 180, 99] = np.nan  # (51.0, 0.0)
+        sparse = climo_grid.ClimatologyGrid(data, grid.lat0, grid.dlat, grid.lon0, grid.dlon)
+        # Halfway between (50, 0) and (51, 0): only the valid corner is left
+        assert abs(sparse.lookup(50.5, 0.0, 100) - (50.0 + 0.1)) < 1e-4
+        data[0, 0, 180, 99] = np.nan
+        assert sparse.lookup(50.5, 0.0, 100) is None
+
+    def test_leap_year_calendar(self):
+        days = [date(2020, 2, 28), date(2020, 2, 29), date(2020, 3, 1), date(2021, 3, 1), date(2021, 12, 31), date(1900, 3, 1)]
+        assert [climo_grid.calendar_day(d) for d in days] == [59, 60, 61, 61, 366, 61]
+        assert climo_grid.calendar_days(np.array(days, dtype="datetime64[D]")).tolist() == [59, 60, 61, 61, 366, 61]
+
+    def test_outside_grid(self, tmp_path):
+        grid = make_grid(str(tmp_path / "climo.npy"))
+        assert grid.lookup(10.0, 0.0, 100) is None
+
+
+class TestBuildGrid:
+    """Rows snapped onto a fixed-resolution grid"""
+
+    def test_station_spacing_does_not_set_the_resolution(self):
+        lat0, dlat, nlat, lon0, dlon, nlon = grid_axes([59.3293, 59.33, 60.4833, 78.2232], [18.0686, 18.07, 15.4167, 15.6267])
+        assert (dlat, dlon) == (0.1, 0.1)
+        assert (lat0, lon0) == (59.3, 15.4)
+        assert (nlat, nlon) == (190, 28)
+
+    def test_stations_in_one_cell_are_averaged(self):
+        axes = grid_axes([59.3, 59.8], [18.0, 18.5], resolution=0.5)
+        rows = [(59.32, 18.07, 10, 1.0, None, 5.0), (59.29, 18.1, 10, 3.0, 0.0, None), (59.8, 18.5, 11, 7.0, None, None)]
+        data = build_grid(iter(rows), *axes, batch_rows=2)
+        assert data.shape == (3, 2, 2, 366)
+        assert data[:, 0, 0, 9].tolist() == [2.0, 0.0, 5.0]
+        assert data[0, 1, 1, 10] == 7.0
+        assert np.isnan(data[0, 1, 1, 9])
+
+
+class TestGridClimatology:
+    """get_climatology() and the engine use the grid when it is loaded"""
+
+    def teardown_method(self):
+        climo_grid.set_grid(None)
+
+    def test_scalar_and_vectorized_agree(self, tmp_path):
+        climo_grid.set_grid(make_grid(str(tmp_path / "climo.npy")))
+        target = date(2025, 4, 10)
+        doy = climo_grid.calendar_day(target)
+
+        climo_temp, _ = get_climatology(51.0, 0.0, target)
+        assert abs(climo_temp - (51.0 + doy / 1000)) < 1e-4
+
+        # Outside the grid both paths fall back to the seasonal model
+        targets = [target, target]
+        vec_temp, _ = engine.climatology([51.0, 10.0], engine.day_of_year(targets), [0.0, 0.0], engine.grid_days(targets))
+        fallback, _ = get_climatology(10.0, 0.0, target)
+        assert vec_temp[0] == climo_temp
+        assert vec_temp[1] == fallback
+
+    def test_seasonal_model_uses_the_plain_day_of_year(self, tmp_path):
+        # March 1 of a common year is day 60 for the cosine model, day 61 on the grid
+        target = date(2025, 3, 1)
+        seasonal, _ = get_climatology(10.0, 0.0, target)
+        assert seasonal == engine.climatology([10.0], [60])[0][0]
+        assert seasonal != engine.climatology([10.0], [61])[0][0]
+
+        climo_grid.set_grid(make_grid(str(tmp_path / "climo.npy")))
+        climo_temp, _ = get_climatology(51.0, 0.0, target)
+        assert abs(climo_temp - (51.0 + 61 / 1000)) < 1e-4
+
+    def test_snapped_climatology_is_close_to_exact(self, tmp_path):
+        climo_grid.set_grid(make_grid(str(tmp_path / "climo.npy")))
+        target = date(2025, 4, 10)
+        rng = np.random.default_rng(3)
+        # On the grid (1 degree C per degree of latitude) and on the seasonal fallback
+        for lat, lon in zip(rng.uniform(50, 52, 200).tolist() + rng.uniform(-60, 40, 200).tolist(), rng.uniform(-180, 180, 400)):
+            exact, _ = get_climatology(lat, lon, target)
+            snapped, _ = get_climatology(*snap_to_grid(lat, lon), target)
+            assert abs(snapped - exact) <= 0.06, (lat, lon)
@@ -0,0 +1,41 @@
+"""
+Tests for the vectorized engine against the scalar implementation
+"""
+
+import numpy as np
+from datetime import date, timedelta
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import engine
+from app.main import build_prediction, get_climatology
+
+
+class TestEngineMatchesScalar:
+    """engine.predict() must reproduce get_climatology() + build_prediction()"""
+
+    def test_random_points(self):
+        rng = np.random.default_rng(7)
+        n = 2000
+        lats = rng.uniform(-90, 90, n)
+        lons = rng.uniform(-180, 180, n)
+        leads = rng.integers(0, 90, n)
+        anchors = rng.uniform(-30, 35, n)
+        anchors[rng.random(n) < 0.2] = np.nan  # some forecasts missing
+        dates = [date(2025, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 365, n)]
+
+        result = engine.predict(lats, lons, engine.day_of_year(dates), anchors, leads)
+        vectorized = engine.to_responses(result)
+
+        for i in range(n):
+            anchor = None if np.isnan(anchors[i]) else float(anchors[i])
+            climo_temp, climo_std = get_climatology(float(lats[i]), float(lons[i]), dates[i])
+            scalar = build_prediction(anchor, climo_temp, climo_std, int(leads[i])).to_dict()
+            # Identical after rounding, not just close
+            assert vectorized[i] == scalar, i
+
+    def test_anchor_weight(self):
+        weights = engine.anchor_weight([0, 10, 17, 24])
+        assert np.allclose(weights, [1.0, 1.0, 0.5, 0.25])
@@ -0,0 +1,119 @@
+"""
+Tests for the columnar export job (no database needed)
+"""
+
+import numpy as np
+import pytest
+from datetime import date, datetime, timezone
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.jobs import backtest, export_columnar
+from app.jobs.aggregate_residuals import aggregate_arrays, aggregate_export
+
+
+class RecordingWriter:
+    """Stands in for PartitionWriter: remembers what would be written"""
+
+    table = "residuals"
+
+    def __init__(self):
+        self.writes = []
+        self.rows = 0
+
+    def write(self, key, rows):
+        self.writes.append((key, len(rows)))
+        self.rows += len(rows)
+
+
+def residual_rows(n):
+    # (month, lead_days, variable, resid, created_at)
+    return [(1 + i % 2, i % 3, "tmean", float(i), None) for i in range(n)]
+
+
+class TestPartitioning:
+    """Streaming rows into (month, lead) partitions with bounded buffers"""
+
+    def test_flushes_full_partitions(self):
+        writer = RecordingWriter()
+        rows = export_columnar.export_rows([residual_rows(60)], writer, batch_rows=10, max_buffered_rows=1000)
+        assert rows == 60
+        # 6 partitions of 10 rows each, every one flushed as soon as it was full
+        assert sorted(writer.writes) == [((m, lead), 10) for m in (1, 2) for lead in (0, 1, 2)]
+
+    def test_buffer_limit(self):
+        writer = RecordingWriter()
+        batches = [residual_rows(12) for _ in range(3)]
+        export_columnar.export_rows(batches, writer, batch_rows=100, max_buffered_rows=20)
+        assert writer.rows == 36
+        # Flushed after the second batch (24 buffered rows) and at the end
+        assert sum(n for _, n in writer.writes[:6]) == 24
+
+    def test_sharded_query(self):
+        sql, params = export_columnar.build_query("predictions", shard=1, workers=4, since="2025-01-01")
+        assert "EXTRACT(MONTH FROM target_date)::int - 1) % :workers = :shard" in sql
+        assert "created_at >= :since" in sql
+        assert params == {"workers": 4, "shard": 1, "since": "2025-01-01"}
+        # Rows without a partition key are never selected, sharded or not
+        assert "WHERE month IS NOT NULL AND lead_days IS NOT NULL" in export_columnar.build_query("residuals")[0]
+        assert "target_date IS NOT NULL AND created_at IS NOT NULL" in sql
+
+    def test_partition_path(self):
+        path = export_columnar.partition_path("out", "residuals", 7, 3, 0, "arrow")
+        assert path == os.path.join("out", "residuals", "month=07", "lead=03", "part-000.arrow")
+        assert export_columnar.partition_path("out", "residuals", 7, 3, 0, "arrow", part=2).endswith("part-000-2.arrow")
+
+
+class TestRoundTrip:
+    """Files written by the export read back memory-mapped"""
+
+    @pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+    def test_aggregate_from_export(self, tmp_path, fmt):
+        pytest.importorskip("pyarrow")
+        rng = np.random.default_rng(0)
+        rows = [(int(m), int(lead), "tmean", float(r), None) for m, lead, r in zip(
+            rng.integers(1, 13, 500), rng.integers(0, 5, 500), rng.normal(0, 2, 500)
+        )]
+        rows.append((1, 0, "tmin", 99.0, None))
+
+        writer = export_columnar.PartitionWriter(str(tmp_path), "residuals", fmt)
+        export_columnar.export_rows([rows[:200], rows[200:]], writer, batch_rows=16)
+        files = writer.close()
+        assert all(f.endswith(fmt) for f in files)
+
+        # Leads 3 and 4 are past max_lead and pool into the last row, as in aggregate_arrays
+        data = aggregate_export(str(tmp_path / "residuals"), max_lead=2)
+        tmean = [r for r in rows if r[2] == "tmean"]
+        expected = aggregate_arrays(*(np.array([r[i] for r in tmean]) for i in (0, 1, 3)), max_lead=2)
+        np.testing.assert_allclose(data, expected, rtol=1e-5, atol=1e-5)
+        assert data[..., 0].sum() == len(tmean)
+
+    def test_open_files_are_capped(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        writer = export_columnar.PartitionWriter(str(tmp_path), "residuals", "arrow", max_open=2)
+        # Six interleaved partitions written in several flushes each: evicted
+        # partitions continue in new part files
+        rows = residual_rows(30)
+        export_columnar.export_rows([rows], writer, batch_rows=2)
+        assert len(writer._writers) <= 2
+        files = writer.close()
+        assert len(files) == len(set(files)) > 6
+        assert any(f.endswith("part-000-1.arrow") for f in files)
+        back = list(export_columnar.read_batches(str(tmp_path / "residuals"), columns=["resid"]))
+        assert sorted(np.concatenate([b["resid"] for b in back]).tolist()) == [r[3] for r in rows]
+
+    def test_predictions_export_is_not_a_forecast_source(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        made = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+        rows = [
+            (59.33, 18.07, date(2025, 3, 1 + lead), 3, lead, 1.5 + lead, 0.0, 3.0, "blend", made)
+            for lead in range(3)
+        ]
+        writer = export_columnar.PartitionWriter(str(tmp_path), "predictions", "arrow")
+        export_columnar.export_rows([rows], writer)
+        writer.close()
+
+        with pytest.raises(SystemExit, match="predictions export"):
+            backtest.read_table(str(tmp_path / "predictions"), ("lat", "lon", "issue_date", "date", "tmean"))
@@ -0,0 +1,94 @@
+"""
+Tests for the cached 16-day forecast series
+"""
+
+import asyncio
+import pytest
+from datetime import date, timedelta
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache, forecast
+from app.main import get_forecast_anchor
+
+
+@pytest.mark.upstream(series=lambda lat, day: float(day), spread=5.0)
+@pytest.mark.usefixtures("mock_upstream")
+class TestForecastSeries:
+    """One upstream call serves every lead day for a grid cell"""
+
+    def test_all_lead_days_from_one_fetch(self, mock_upstream):
+        async def run():
+            return [await get_forecast_anchor(59.33, 18.07, d) for d in (0, 3, 7, 10, 20)]
+
+        anchors = asyncio.run(run())
+        assert anchors == [0.0, 3.0, 7.0, 10.0, 10.0]
+        assert len(mock_upstream.calls) == 1
+        params = mock_upstream.calls[0].url.params
+        assert params["forecast_days"] == str(forecast.FORECAST_DAYS)
+        assert "temperature_2m_max" in params["daily"]
+
+    def test_concurrent_misses_coalesce(self, mock_upstream):
+        async def run():
+            return await asyncio.gather(*(forecast.get_series(48.85, 2.35) for _ in range(20)))
+
+        results = asyncio.run(run())
+        assert all(r == results[0] for r in results)
+        assert len(mock_upstream.calls) == 1
+
+    def test_stale_entry_served_while_refreshing(self, mock_upstream):
+        async def run():
+            first = await forecast.get_series(59.33, 18.07)
+            # Expire the entry but keep it inside the grace period
+            key = forecast.series_key(59.3, 18.1)
+            cache.forecast_cache.local.set(key, {**first, "tmean": [99.0] * 16}, -1, grace=60)
+
+            stale = await forecast.get_series(59.33, 18.07)
+            assert not forecast.is_fresh(59.3, 18.1)
+            await asyncio.gather(*forecast._revalidating.values())
+            return stale, await forecast.get_series(59.33, 18.07)
+
+        stale, refreshed = asyncio.run(run())
+        assert stale["tmean"][0] == 99.0
+        assert refreshed["tmean"][0] == 0.0
+        assert forecast.is_fresh(59.3, 18.1)
+        assert len(mock_upstream.calls) == 2
+
+    def test_late_run_keeps_its_stamp(self, mock_upstream, monkeypatch):
+        cell = (59.3, 18.1)
+        first_run = cache.latest_model_run()
+        next_run = first_run + timedelta(hours=6)
+
+        async def run():
+            first = await forecast.get_series(*cell)
+            monkeypatch.setattr(cache, "latest_model_run", lambda now=None: next_run)
+            cache.forecast_cache.local.set(forecast.series_key(*cell), first, -1, grace=60)
+            # The upstream has not published the new run yet: same values
+            late = (await forecast.fetch_series_many([cell]))[0]
+            mock_upstream.series = lambda lat, day: day + 1.0
+            return first, late, (await forecast.fetch_series_many([cell]))[0]
+
+        first, late, published = asyncio.run(run())
+        assert first["run"] == first_run.isoformat()
+        assert late["run"] == first_run.isoformat()
+        assert not forecast.is_current(late)
+        assert forecast.series_ttl(late) <= forecast.config.FORECAST_LATE_RETRY
+        assert published["run"] == next_run.isoformat()
+        assert forecast.is_current(published)
+
+    def test_series_has_min_and_max(self):
+        series = asyncio.run(forecast.get_series(59.33, 18.07))
+        assert forecast.value_for_day(series, 2, "tmin") == -3.0
+        assert forecast.value_for_day(series, 2, "tmax") == 7.0
+
+
+class TestValueForDay:
+    """Lead-day lookup in a stored series"""
+
+    def test_stale_series_is_shifted(self):
+        series = {"time": ["2025-01-01", "2025-01-02", "2025-01-03"], "tmean": [1.0, 2.0, 3.0]}
+        assert forecast.value_for_day(series, 0, today=date(2025, 1, 1)) == 1.0
+        assert forecast.value_for_day(series, 0, today=date(2025, 1, 2)) == 2.0
+        assert forecast.value_for_day(series, 2, today=date(2025, 1, 2)) is None
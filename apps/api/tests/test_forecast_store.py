@@ -0,0 +1,49 @@
+"""
+Tests for the forecast_cache persistence layer (no database needed)
+"""
+
+from collections import namedtuple
+from datetime import date, datetime, timezone
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.forecast_store import rows_to_series, series_to_rows
+
+Row = namedtuple("Row", "run_time target_date tmean payload")
+
+
+class TestForecastRows:
+    """Series <-> forecast_cache rows"""
+
+    def test_round_trip(self):
+        series = {
+            "lat": 59.3, "lon": 18.1,
+            "time": ["2025-06-01", "2025-06-02"],
+            "tmean": [15.0, 16.0], "tmin": [10.0, 11.0], "tmax": [20.0, 21.0],
+        }
+        run_time = datetime(2025, 6, 1, 0, tzinfo=timezone.utc)
+        expires_at = datetime(2025, 6, 1, 9, tzinfo=timezone.utc)
+
+        rows = series_to_rows(series, run_time, expires_at)
+        assert len(rows) == 2
+        assert rows[1]["target_date"] == date(2025, 6, 2)
+        assert rows[1]["payload"] == {"tmin": 11.0, "tmax": 21.0}
+
+        stored = [Row(r["run_time"], r["target_date"], r["tmean"], r["payload"]) for r in rows]
+        # The series comes back stamped with the run it was stored under
+        assert rows_to_series(stored, 59.3, 18.1) == {**series, "run": run_time.isoformat()}
+
+    def test_only_newest_run_is_used(self):
+        old = datetime(2025, 6, 1, 0, tzinfo=timezone.utc)
+        new = datetime(2025, 6, 1, 6, tzinfo=timezone.utc)
+        rows = [
+            Row(new, date(2025, 6, 1), 2.0, {}),
+            Row(old, date(2025, 6, 1), 1.0, {}),
+        ]
+        series = rows_to_series(rows, 0.0, 0.0)
+        assert series["tmean"] == [2.0]
+
+    def test_no_rows(self):
+        assert rows_to_series([], 0.0, 0.0) is None
@@ -0,0 +1,125 @@
+"""
+Tests for the grid and map tile prediction endpoints
+"""
+
+import numpy as np
+import pytest
+import struct
+import zlib
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config, engine, grid
+from app.main import app
+
+client = TestClient(app)
+
+
+def day(offset: int) -> str:
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+class TestGridHelpers:
+    """Axes, lattice, interpolation and PNG encoding"""
+
+    def test_tile_bounds(self):
+        west, south, east, north = grid.tile_bounds(1, 1, 0)
+        assert (west, east) == (0.0, 180.0)
+        assert abs(north - 85.0511) < 1e-3 and abs(south) < 1e-9
+
+    def test_lattice_is_coarse_and_covers_output(self):
+        lats, lons = grid.bbox_axes(10.0, 50.0, 20.0, 60.0, 0.05)
+        anchor_lats, anchor_lons = grid.anchor_lattice(lats, lons)
+        assert len(lats) == len(lons) == 200
+        assert len(anchor_lats) <= 17 and len(anchor_lons) <= 17
+        assert anchor_lats[0] <= lats.min() and anchor_lats[-1] >= lats.max()
+
+    def test_interpolation_is_exact_for_linear_fields(self):
+        axis_lats = np.array([0.0, 1.0, 2.0])
+        axis_lons = np.array([10.0, 12.0])
+        values = axis_lats[:, None] * 3 + axis_lons[None, :]
+        out = grid.interpolate(values, axis_lats, axis_lons, np.array([0.5, 1.75]), np.array([11.0]))
+        assert np.allclose(out[:, 0], [0.5 * 3 + 11, 1.75 * 3 + 11])
+
+    def test_png_is_valid(self):
+        values = np.array([[-10.0, np.nan], [20.0, 40.0]], dtype=np.float32)
+        png = grid.encode_png(grid.colorize(values))
+        assert png.startswith(b"\x89PNG\r\n\x1a\n")
+        width, height = struct.unpack(">II", png[16:24])
+        assert (width, height) == (2, 2)
+        idat_length = struct.unpack(">I", png[33:37])[0]
+        raw = zlib.decompress(png[41:41 + idat_length])
+        assert len(raw) == 2 * (1 + 2 * 4)
+        assert raw[1 + 4 + 3] == 0  # NaN pixel is transparent
+
+
+@pytest.mark.upstream(series=lambda lat, day: lat)
+@pytest.mark.usefixtures("mock_upstream")
+class TestGridEndpoints:
+    """Bulk forecast fetches and binary payloads"""
+
+    def setup_method(self):
+        grid.tile_cache.clear()
+
+    def test_bbox_float32(self, mock_upstream):
+        response = client.get("/api/predict/grid", params={
+            "bbox": "10,50,12,51", "resolution": 0.25, "date": day(3),
+        })
+        assert response.status_code == 200
+        rows, cols = map(int, response.headers["x-grid-shape"].split(","))
+        assert (rows, cols) == (4, 8)
+        values = np.frombuffer(response.content, dtype="<f4").reshape(rows, cols)
+
+        # Short lead: the temperature is the forecast anchor, here equal to the latitude
+        lats, _ = grid.bbox_axes(10, 50, 12, 51, 0.25)
+        assert np.allclose(values[:, 0], lats, atol=1e-4)
+        # Only the coarse lattice is fetched, in multi-location chunks
+        anchor_lats, anchor_lons = grid.anchor_lattice(*grid.bbox_axes(10, 50, 12, 51, 0.25))
+        points = len(anchor_lats) * len(anchor_lons)
+        assert len(mock_upstream.calls) == -(-points // config.BATCH_UPSTREAM_CHUNK)
+
+    def test_matches_engine_for_long_leads(self):
+        response = client.get("/api/predict/grid", params={
+            "bbox": "10,50,10.5,50.5", "resolution": 0.5, "date": day(30), "field": "high80",
+        })
+        value = np.frombuffer(response.content, dtype="<f4")[0]
+        target = datetime.now().date() + timedelta(days=30)
+        expected = engine.predict([50.25], [10.25], engine.day_of_year([target]), [50.25], [30], months=[target.month])
+        assert abs(value - expected["high80"][0]) < 1e-3
+
+    def test_tile_png_is_cached(self):
+        params = {"date": day(5), "size": 64}
+        first = client.get("/api/predict/grid/6/34/20", params=params)
+        second = client.get("/api/predict/grid/6/34/20", params=params)
+
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "image/png"
+        assert first.headers["cache-control"].startswith("public, max-age=")
+        assert first.content == second.content
+        assert grid.tile_cache.hits == 1
+
+    def test_tile_without_forecast_is_not_cached(self, mock_upstream):
+        mock_upstream.status = 503
+        response = client.get("/api/predict/grid/6/34/20", params={"date": day(5), "size": 64})
+
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-store"
+        assert len(grid.tile_cache) == 0
+
+    def test_tile_max_age_ends_at_midnight(self):
+        response = client.get("/api/predict/grid/6/34/20", params={"date": day(5), "size": 64})
+        max_age = int(response.headers["cache-control"].split("max-age=")[1].split(",")[0])
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        assert max_age <= (midnight - now).total_seconds() + 1
+
+    def test_invalid_requests(self):
+        assert client.get("/api/predict/grid", params={"bbox": "1,2,3", "resolution": 1, "date": day(1)}).status_code == 400
+        assert client.get("/api/predict/grid", params={"bbox": "20,50,10,60", "resolution": 1, "date": day(1)}).status_code == 400
+        assert client.get("/api/predict/grid", params={"bbox": "-180,-90,180,90", "resolution": 0.01, "date": day(1)}).status_code == 413
+        assert client.get("/api/predict/grid/2/9/0", params={"date": day(1)}).status_code == 400
+        assert client.get("/api/predict/grid/2/1/0", params={"date": day(-2)}).status_code == 400
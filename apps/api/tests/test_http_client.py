@@ -0,0 +1,45 @@
+"""
+Tests for the shared upstream HTTP client
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import http_client
+from app.main import get_forecast_anchor
+
+
+@pytest.mark.upstream(series=lambda lat, day: 10.0 + day)
+@pytest.mark.usefixtures("mock_upstream")
+class TestSharedClient:
+    """The pooled client is reused across forecast calls"""
+
+    def test_client_is_reused(self, mock_upstream):
+        async def run():
+            first = await get_forecast_anchor(60.0, 15.0, 3)
+            client = http_client.get_client()
+            second = await get_forecast_anchor(61.0, 15.0, 5)
+            assert http_client.get_client() is client
+            await http_client.shutdown()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first == 13.0
+        assert second == 15.0
+        assert len(mock_upstream.calls) == 2
+
+    def test_pool_stats(self):
+        async def run():
+            await get_forecast_anchor(60.0, 15.0, 1)
+            stats = http_client.pool_stats()
+            await http_client.shutdown()
+            return stats
+
+        stats = asyncio.run(run())
+        for key in ("in_use", "idle", "queued", "wait_avg_ms", "wait_max_ms"):
+            assert key in stats
+        assert stats["requests"] >= 1
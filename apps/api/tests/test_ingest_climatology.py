@@ -0,0 +1,110 @@
+"""
+Tests for the climatology ingestion job (no database needed)
+"""
+
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.jobs.ingest_climatology import normals_for_file, read_checkpoint, reduce_keys, to_copy_buffer, write_checkpoint
+
+
+def write_fixture(path):
+    lines = ["lat,lon,date,tavg,tmin,tmax"]
+    for year in (2020, 2021, 2022):
+        lines.append(f"59.33,18.07,{year}-01-10,{year - 2020}.0,-5.0,")
+        lines.append(f"59.33,18.07,{year}-07-10,20.0,15.0,25.0")
+    lines.append("55.68,12.57,2021-01-10,2.0,0.0,4.0")
+    path.write_text("\n".join(lines) + "\n")
+
+
+class TestNormals:
+    """Per-(lat, lon, doy) reduction of daily records"""
+
+    def test_normals_across_chunks(self, tmp_path):
+        source = tmp_path / "daily.csv"
+        write_fixture(source)
+
+        # Tiny chunks so one location spans several chunks
+        rows, records = normals_for_file(str(source), chunk_rows=2)
+        assert records == 7
+
+        by_key = {(r[0], r[1], r[2]): r for r in rows}
+        jan = by_key[(59.33, 18.07, 10)]
+        assert jan[3:6] == (1.0, -5.0, None)  # mean of 0, 1, 2; no tmax values
+        assert jan[6:8] == ("2020-01-10", "2022-07-10")
+        assert jan[8:] == (3, 3, 0)
+        # July 10 is doy 192 in leap and common years alike
+        assert by_key[(59.33, 18.07, 192)][3] == 20.0
+        assert by_key[(59.33, 18.07, 192)][8] == 3
+        assert (59.33, 18.07, 191) not in by_key
+        assert by_key[(55.68, 12.57, 10)][3] == 2.0
+
+    def test_chunk_size_does_not_change_normals(self, tmp_path):
+        # New locations keep arriving in every chunk
+        rng = np.random.default_rng(0)
+        lines = ["lat,lon,date,tavg"] + [
+            f"{rng.integers(0, 300) / 10},10.0,{np.datetime64('2019-01-01') + int(rng.integers(0, 1500))},{rng.normal():.2f}"
+            for _ in range(3000)
+        ]
+        source = tmp_path / "daily.csv"
+        source.write_text("\n".join(lines) + "\n")
+
+        # Rows come out in order of first appearance, which depends on the chunking
+        whole = sorted(normals_for_file(str(source))[0])
+        for chunk_rows in (1, 37, 500):
+            assert sorted(normals_for_file(str(source), chunk_rows=chunk_rows)[0]) == whole
+
+    def test_reduce_keys(self):
+        keys, sums, counts = reduce_keys(
+            np.array([5, 2, 5]), np.array([[1.0, 0.0], [2.0, 3.0], [4.0, 0.0]]), np.array([[1, 0], [1, 1], [1, 0]])
+        )
+        assert keys.tolist() == [2, 5]
+        assert sums.tolist() == [[2.0, 3.0], [5.0, 0.0]]
+        assert counts.tolist() == [[1, 1], [2, 0]]
+
+    def test_leap_day_keeps_later_days_aligned(self, tmp_path):
+        source = tmp_path / "daily.csv"
+        source.write_text("lat,lon,date,tavg\n1.0,2.0,2020-02-29,5.0\n1.0,2.0,2020-03-01,6.0\n1.0,2.0,2021-03-01,8.0\n")
+        rows, _ = normals_for_file(str(source))
+        assert {r[2]: r[3] for r in rows} == {60: 5.0, 61: 7.0}
+
+    def test_counts_merge_files_into_weighted_means(self, tmp_path):
+        # One file per year: weighting each file's normals by their counts (as
+        # MERGE_SQL does) gives the normals of all years read together
+        write_fixture(tmp_path / "all.csv")
+        lines = (tmp_path / "all.csv").read_text().splitlines()
+        (tmp_path / "2020.csv").write_text("\n".join([lines[0], *lines[1:3]]) + "\n")
+        (tmp_path / "rest.csv").write_text("\n".join([lines[0], *lines[3:]]) + "\n")
+
+        merged = {}
+        for name in ("2020.csv", "rest.csv"):
+            for row in normals_for_file(str(tmp_path / name))[0]:
+                total = merged.setdefault(row[:3], [0.0, 0])
+                if row[8]:
+                    total[0] += row[3] * row[8]
+                    total[1] += row[8]
+        combined = {row[:3]: (row[3], row[8]) for row in normals_for_file(str(tmp_path / "all.csv"))[0]}
+        assert {key: (s / n, n) for key, (s, n) in merged.items()} == combined
+
+    def test_snap(self, tmp_path):
+        source = tmp_path / "daily.csv"
+        write_fixture(source)
+        rows, _ = normals_for_file(str(source), snap=0.5)
+        assert {(r[0], r[1]) for r in rows} == {(59.5, 18.0), (55.5, 12.5)}
+
+
+class TestLoadHelpers:
+    """COPY payload and resume checkpoint"""
+
+    def test_copy_buffer_nulls(self):
+        buffer = to_copy_buffer([(1.0, 2.0, 3, None, 1.5, 2.5, "2020-01-01", "2020-12-31")])
+        assert buffer.read() == "1.0\t2.0\t3\t\\N\t1.5\t2.5\t2020-01-01\t2020-12-31\n"
+
+    def test_checkpoint_round_trip(self, tmp_path):
+        path = str(tmp_path / "checkpoint.json")
+        assert read_checkpoint(path) == set()
+        write_checkpoint(path, {"/a.csv", "/b.csv"})
+        assert read_checkpoint(path) == {"/a.csv", "/b.csv"}
@@ -0,0 +1,81 @@
+"""
+Tests for Prometheus metrics and Server-Timing on the prediction hot path
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import metrics
+from app.main import app
+
+client = TestClient(app)
+
+
+def day(offset: int) -> str:
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+class TestMetricPrimitives:
+    """Text exposition of counters and histograms"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("test_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+        try:
+            for value in (0.05, 0.5, 0.5, 5.0):
+                histogram.observe(value, stage="a")
+            lines = metrics.render().splitlines()
+        finally:
+            metrics.REGISTRY.remove(histogram)
+
+        assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{stage="a",le="1"} 3' in lines
+        assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+        assert 'test_seconds_count{stage="a"} 4' in lines
+        assert "# TYPE test_seconds histogram" in lines
+
+    def test_counter_labels_are_escaped(self):
+        counter = metrics.Counter("test_events", "test", ("what",))
+        try:
+            counter.inc(what='say "hi"')
+            counter.inc(2, what='say "hi"')
+            lines = metrics.render().splitlines()
+        finally:
+            metrics.REGISTRY.remove(counter)
+
+        assert 'test_events_total{what="say \\"hi\\""} 3' in lines
+
+
+@pytest.mark.upstream(series=lambda lat, day: float(day), status=lambda request: 404 if request.url.params["latitude"] == "10.0" else 200)
+@pytest.mark.usefixtures("mock_upstream")
+class TestPredictInstrumentation:
+    """/api/predict stage timing and /metrics"""
+
+    def test_server_timing_lists_every_stage(self):
+        response = client.get("/api/predict", params={"lat": 50.0, "lon": 10.0, "date": day(3)})
+        assert response.status_code == 200
+        stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+        assert stages == ["cache", "forecast", "climatology", "blend", "serialize", "total"]
+
+        cached = client.get("/api/predict", params={"lat": 50.0, "lon": 10.0, "date": day(3)})
+        assert cached.json() == response.json()
+        assert [p.split(";")[0] for p in cached.headers["server-timing"].split(", ")] == ["cache", "serialize", "total"]
+
+    def test_metrics_endpoint(self):
+        before = metrics.climatology_fallbacks.get(endpoint="predict")
+        client.get("/api/predict", params={"lat": 50.0, "lon": 10.0, "date": day(3)})
+        client.get("/api/predict", params={"lat": 10.0, "lon": 10.0, "date": day(3)})
+
+        response = client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'weather_predict_stage_seconds_count{stage="forecast"}' in body
+        assert 'weather_upstream_responses_total{status="200"}' in body
+        assert 'weather_upstream_responses_total{status="404"}' in body
+        assert 'weather_cache_requests_total{cache="prediction",tier="local",result="miss"}' in body
+        assert "weather_upstream_breaker_open 0" in body
+        assert metrics.climatology_fallbacks.get(endpoint="predict") == before + 1
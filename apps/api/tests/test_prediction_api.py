@@ -11,10 +11,26 @@ import os
 # Add the parent directory to the path so we can import the app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app import cache, http_client, predictions, replay
 from app.main import app
 
 client = TestClient(app)
 
+# Recorded Open-Meteo responses for the locations below (python -m app.replay record)
+RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "stub_upstream.replay")
+
+
+@pytest.fixture(autouse=True)
+def recorded_upstream():
+    """Serve the upstream from the recording: no network, same answers every run"""
+    cache.forecast_cache.local.clear()
+    predictions.prediction_cache.clear()
+    transport = replay.ReplayTransport(replay.Archive(RECORDING))
+    http_client.use_transport(transport)
+    yield transport
+    http_client.use_transport(None)
+    assert transport.misses == 0
+
 
 class TestPredictionAPI:
     """Test suite for the /api/predict endpoint"""
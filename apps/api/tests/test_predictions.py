@@ -0,0 +1,90 @@
+"""
+Tests for the prediction result cache
+"""
+
+import asyncio
+import pytest
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache, forecast, predictions
+from app.main import app, get_climatology
+
+client = TestClient(app)
+
+
+@pytest.mark.usefixtures("mock_upstream")
+class TestPredictionCache:
+    """Repeated requests skip the forecast fetch and the computation"""
+
+    def predict(self, lat=59.33, lon=18.07, days=4):
+        date_str = (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d")
+        response = client.get("/api/predict", params={"lat": lat, "lon": lon, "date": date_str})
+        assert response.status_code == 200
+        return response.json()
+
+    def test_repeat_is_served_from_cache(self, mock_upstream):
+        hits = predictions.prediction_cache.local.hits
+        first = self.predict()
+        cache.forecast_cache.local.clear()  # a recomputation would have to refetch
+        second = self.predict(lat=59.3301, lon=18.0702)  # same grid cell
+
+        assert second == first
+        assert len(mock_upstream.calls) == 1
+        assert predictions.prediction_cache.local.hits == hits + 1
+
+    def test_new_forecast_run_invalidates(self, mock_upstream, monkeypatch):
+        self.predict()
+        newer_run = cache.latest_model_run() + timedelta(hours=6)
+        monkeypatch.setattr(cache, "latest_model_run", lambda now=None: newer_run)
+        cache.forecast_cache.local.clear()
+        self.predict()
+
+        assert len(mock_upstream.calls) == 2
+
+    def test_points_in_a_cell_share_the_cell_centre_prediction(self):
+        corner = self.predict(lat=59.26, lon=18.14, days=30)
+        predictions.prediction_cache.clear()  # computed afresh, not served from the cache
+        centre = self.predict(lat=59.3, lon=18.1, days=30)
+
+        assert corner == centre
+        target = (datetime.now() + timedelta(days=30)).date()
+        assert corner["explain"]["climo"] == round(get_climatology(*cache.snap_to_grid(59.26, 18.14), target)[0], 1)
+
+    def test_late_forecast_run_is_not_memoized(self, mock_upstream, monkeypatch):
+        self.predict()
+        # The next run is due but the upstream still serves the same values
+        newer_run = cache.latest_model_run() + timedelta(hours=6)
+        monkeypatch.setattr(cache, "latest_model_run", lambda now=None: newer_run)
+        key = forecast.series_key(*cache.snap_to_grid(59.33, 18.07))
+        cache.forecast_cache.local.set(key, cache.forecast_cache.local.peek(key), -1, grace=60)
+
+        target = (datetime.now() + timedelta(days=4)).date()
+        response = client.get("/api/predict", params={"lat": 59.33, "lon": 18.07, "date": target.isoformat()})
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+        assert response.headers["cache-control"] == "no-store"
+        # Nothing stored under the new run's version
+        version = predictions.inputs_version(4)
+        assert asyncio.run(predictions.get(*cache.snap_to_grid(59.33, 18.07), target, version)) is None
+
+
+class TestPredictionRows:
+    """PredictionResponse <-> predictions row"""
+
+    def test_round_trip(self):
+        prediction = {
+            "temp": 10.0, "low80": 8.0, "high80": 12.0, "low95": 6.8, "high95": 13.2,
+            "explain": {"anchor": 10.0, "climo": 7.0, "w_anchor": 1.0, "ai_offset": 0.0, "days_ahead": 3, "climo_std": 3.0},
+        }
+        row = predictions.to_row(59.3, 18.1, date(2025, 6, 1), "v", prediction)
+        assert row["method"] == "blend"
+
+        Row = namedtuple("Row", "t_p50 t_p10 t_p90 components")
+        stored = Row(row["t_p50"], row["t_p10"], row["t_p90"], row["components"])
+        assert predictions.from_row(stored) == prediction
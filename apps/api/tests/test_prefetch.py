@@ -0,0 +1,81 @@
+"""
+Tests for request tracking and background prefetch of popular grid cells
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache, forecast, prefetch
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.upstream(series=lambda lat, day: float(day))
+@pytest.mark.usefixtures("mock_upstream")
+class TestPrefetch:
+    """Top-N cells are pre-warmed with one multi-location call"""
+
+    def setup_method(self):
+        prefetch.reset()
+
+    def teardown_method(self):
+        prefetch.reset()
+
+    def test_requests_are_counted_per_cell(self):
+        date = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+        for lat in (50.0, 50.01, 50.02, 40.0):
+            client.get("/api/predict", params={"lat": lat, "lon": 10.0, "date": date})
+
+        assert prefetch.top_cells(2) == [(50.0, 10.0), (40.0, 10.0)]
+        assert client.get("/api/stats/prefetch").json()["top"][0]["requests"] == 3
+
+    def test_run_once_warms_top_cells(self, mock_upstream):
+        for _ in range(3):
+            prefetch.record(50.0, 10.0)
+        prefetch.record(40.0, 10.0)
+        prefetch.record(30.0, 10.0)
+
+        fetched = asyncio.run(prefetch.run_once(top_n=2))
+
+        assert fetched == 2
+        assert len(mock_upstream.calls) == 1
+        assert mock_upstream.calls[0].url.params["latitude"] == "50.0,40.0"
+        assert forecast.is_fresh(50.0, 10.0) and not forecast.is_fresh(30.0, 10.0)
+        # Counts decay so the ranking follows recent traffic
+        assert prefetch.top_cells(5) == [(50.0, 10.0)]
+
+    def test_fresh_cells_are_skipped(self, mock_upstream):
+        prefetch.record(50.0, 10.0)
+        asyncio.run(prefetch.run_once())
+        prefetch.record(50.0, 10.0)
+        assert asyncio.run(prefetch.run_once()) == 0
+        assert len(mock_upstream.calls) == 1
+
+    def test_one_worker_prefetches_and_others_preload(self, mock_upstream, monkeypatch):
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(cache.forecast_cache, "redis", fakeredis.FakeAsyncRedis())
+        prefetch.record(50.0, 10.0)
+
+        async def run():
+            leader = await prefetch.run_once()
+            # A second worker in the same model run finds the lock taken
+            prefetch.record(50.0, 10.0)
+            follower = await prefetch.run_once()
+            # A freshly started worker copies the published hot cells from Redis
+            cache.forecast_cache.local.clear()
+            summary = await prefetch.preload()
+            return leader, follower, summary
+
+        leader, follower, summary = asyncio.run(run())
+        assert (leader, follower) == (1, 0)
+        assert len(mock_upstream.calls) == 1
+        assert summary["hot_cells"] == 1 and summary["forecasts_warmed"] == 1
+        assert forecast.is_fresh(50.0, 10.0)
+        assert prefetch.stats()["skipped_runs"] >= 1
@@ -0,0 +1,97 @@
+"""
+Tests for the streaming range prediction endpoint
+"""
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.main import app
+
+client = TestClient(app)
+
+
+async def body_messages(path: str, params: dict) -> list[bytes]:
+    """Call the ASGI app directly and keep each response body message (TestClient joins them)"""
+    sent = []
+    request = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if request:
+            return request.pop()
+        await asyncio.Event().wait()  # no disconnect; cancelled when the response is done
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            sent.append(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "headers": [],
+        "server": ("test", 80), "client": ("127.0.0.1", 50000),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+def day(offset: int) -> str:
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+@pytest.mark.usefixtures("mock_upstream")
+class TestRangePrediction:
+    """GET /api/predict/range"""
+
+    def get(self, **params):
+        return client.get("/api/predict/range", params={"lat": 50.0, "lon": 10.0, **params})
+
+    def test_ndjson_one_line_per_day_with_one_upstream_call(self, mock_upstream):
+        response = self.get(start=day(0), end=day(44))
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["date"] for line in lines] == [day(i) for i in range(45)]
+        assert lines[3]["result"]["explain"]["anchor"] == 8.0
+        assert lines[30]["result"]["explain"]["anchor"] == 15.0  # day-10 anchor
+        assert len(mock_upstream.calls) == 1
+
+    def test_streams_in_blocks(self, monkeypatch):
+        monkeypatch.setattr(config, "RANGE_BLOCK_SIZE", 31)
+        chunks = asyncio.run(body_messages("/api/predict/range", {"lat": 50.0, "lon": 10.0, "start": day(0), "end": day(99)}))
+        # 100 days in blocks of 31: four chunks, each holding whole lines
+        assert [chunk.count(b"\n") for chunk in chunks] == [31, 31, 31, 7]
+
+    def test_matches_single_endpoint(self):
+        lines = [json.loads(line) for line in self.get(start=day(5), end=day(20)).text.splitlines()]
+        for offset in (5, 12, 20):
+            single = client.get("/api/predict", params={"lat": 50.0, "lon": 10.0, "date": day(offset)}).json()
+            assert lines[offset - 5]["result"] == single
+
+    def test_server_sent_events(self):
+        response = client.get(
+            "/api/predict/range",
+            params={"lat": 50.0, "lon": 10.0, "start": day(1), "end": day(3)},
+            headers={"Accept": "text/event-stream"},
+        )
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [block.splitlines() for block in response.text.strip().split("\n\n")]
+        assert [lines[0] for lines in events] == ["event: prediction"] * 3 + ["event: done"]
+        assert json.loads(events[0][1][len("data: "):])["date"] == day(1)
+
+    def test_invalid_ranges(self, mock_upstream):
+        assert self.get(start=day(-1), end=day(3)).status_code == 400
+        assert self.get(start=day(5), end=day(3)).status_code == 400
+        assert self.get(start="soon", end=day(3)).status_code == 400
+        assert self.get(start=day(0), end=day(400)).status_code == 413
+        assert not mock_upstream.calls
@@ -0,0 +1,156 @@
+"""
+Tests for the per-client rate limit and the upstream call budget
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache, config, forecast, ratelimit, upstream
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestTokenBucket:
+    """In-process buckets (used without Redis)"""
+
+    def test_rejects_when_empty_and_refills(self):
+        bucket = ratelimit.TokenBucket("test", rate=1.0, capacity=2)
+        first, second, third = (asyncio.run(bucket.take("a")) for _ in range(3))
+        assert first.allowed and second.allowed
+        assert not third.allowed
+        assert 0.9 < third.retry_after <= 1.0
+        assert asyncio.run(bucket.take("b")).allowed
+
+        # One second later one token is back
+        tokens, updated = bucket._local["a"]
+        bucket._local["a"] = (tokens, updated - 1.0)
+        assert asyncio.run(bucket.take("a")).allowed
+        assert (bucket.allowed, bucket.rejected) == (4, 1)
+
+    def test_per_client_state_is_bounded(self):
+        bucket = ratelimit.TokenBucket("test", rate=0.001, capacity=5, max_local_keys=100)
+        for i in range(1000):
+            asyncio.run(bucket.take(f"ip:10.0.{i // 256}.{i % 256}"))
+        assert len(bucket._local) <= 100
+        assert bucket.last_remaining == pytest.approx(4, abs=0.01)
+
+    def test_floor_keeps_a_reserve(self):
+        bucket = ratelimit.TokenBucket("test", rate=0.001, capacity=10)
+        assert asyncio.run(bucket.take(cost=6, floor=2)).allowed
+        assert not asyncio.run(bucket.take(cost=3, floor=2)).allowed
+        assert asyncio.run(bucket.take(cost=3)).allowed
+
+    def test_background_work_stops_at_the_reserve(self, monkeypatch):
+        monkeypatch.setattr(ratelimit, "upstream_budget", ratelimit.TokenBucket("upstream", 0.001, 10))
+        monkeypatch.setattr(config, "UPSTREAM_BUDGET_RESERVE", 0.5)
+
+        async def run():
+            with ratelimit.background():
+                background = await ratelimit.take_upstream(6)
+            return background, await ratelimit.take_upstream(6)
+
+        background, foreground = asyncio.run(run())
+        assert not background.allowed
+        assert foreground.allowed
+
+    def test_redis_bucket_is_shared(self, monkeypatch):
+        pytest.importorskip("lupa")  # fakeredis runs Lua scripts through lupa
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(cache.forecast_cache, "redis", fakeredis.aioredis.FakeRedis())
+
+        async def run():
+            # Two processes' buckets with the same name draw from one Redis bucket
+            first = ratelimit.TokenBucket("shared", rate=0.001, capacity=3)
+            second = ratelimit.TokenBucket("shared", rate=0.001, capacity=3)
+            return [(await first.take("k", cost=2)).allowed, (await second.take("k", cost=2)).allowed]
+
+        assert asyncio.run(run()) == [True, False]
+
+
+class TestClientLimit:
+    """/api/predict answers 429 with Retry-After once a client is over its limit"""
+
+    def get(self, headers=None):
+        # Beyond the forecast horizon: climatology only, no upstream call
+        date_str = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+        return client.get("/api/predict", params={"lat": 48.85, "lon": 2.35, "date": date_str}, headers=headers)
+
+    def test_429_with_retry_after(self, monkeypatch):
+        monkeypatch.setattr(ratelimit, "client_limiter", ratelimit.TokenBucket("client", 0.5, 2))
+        assert [self.get().status_code for _ in range(2)] == [200, 200]
+
+        response = self.get()
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+        assert response.headers["x-ratelimit-limit"] == "2"
+
+        # API keys get their own bucket
+        assert self.get({"X-API-Key": "secret"}).status_code == 200
+
+    def test_disabled_limit(self, monkeypatch):
+        monkeypatch.setattr(ratelimit, "client_limiter", ratelimit.TokenBucket("client", 0, 0))
+        assert all(self.get().status_code == 200 for _ in range(5))
+
+
+@pytest.mark.upstream(status=500)
+@pytest.mark.usefixtures("mock_upstream")
+class TestUpstreamBudget:
+    """An exhausted budget degrades to climatology without calling the upstream"""
+
+    def test_exhausted_budget_falls_back(self, mock_upstream, monkeypatch):
+        monkeypatch.setattr(ratelimit, "upstream_budget", ratelimit.TokenBucket("upstream", 0.001, 0.5))
+        date_str = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+        failures = upstream.forecast_upstream.stats()["failures"]
+        response = client.get("/api/predict", params={"lat": 48.85, "lon": 2.35, "date": date_str})
+
+        assert response.status_code == 200
+        assert response.json()["explain"]["w_anchor"] == 0.0
+        assert response.headers["cache-control"] == "no-store"
+        assert mock_upstream.calls == []
+        assert ratelimit.upstream_budget.rejected == 1
+        # Running out of budget is not an upstream failure
+        assert upstream.forecast_upstream.stats()["failures"] == failures
+
+    def test_no_tokens_spent_while_the_breaker_is_open(self, mock_upstream, monkeypatch):
+        monkeypatch.setattr(ratelimit, "upstream_budget", ratelimit.TokenBucket("upstream", 0.001, 100))
+        # A breaker of our own so its counters do not leak into other tests
+        breaker = upstream.CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        monkeypatch.setattr(upstream.forecast_upstream, "breaker", breaker)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        async def run():
+            for _ in range(5):
+                with pytest.raises(upstream.UpstreamUnavailable):
+                    await forecast.fetch_series_many([(48.9, 2.4), (48.8, 2.3)])
+            return await ratelimit.upstream_budget.peek()
+
+        assert asyncio.run(run()) == pytest.approx(100, abs=0.01)
+        assert mock_upstream.calls == []
+
+    def test_hedged_attempts_are_charged(self, mock_upstream, monkeypatch):
+        monkeypatch.setattr(ratelimit, "upstream_budget", ratelimit.TokenBucket("upstream", 0.001, 100))
+        monkeypatch.setattr(upstream.forecast_upstream, "hedge_delay", lambda: 0.01)
+        # The first attempt is slow enough for the hedge to go out
+        mock_upstream.status = 200
+        mock_upstream.delay = lambda call: 0.2 if call == 1 else 0.0
+
+        async def run():
+            await forecast.fetch_series_many([(48.9, 2.4), (48.8, 2.3)])
+            return await ratelimit.upstream_budget.peek()
+
+        # Primary and hedge each cost one token per location
+        assert asyncio.run(run()) == pytest.approx(96, abs=0.01)
+        assert len(mock_upstream.calls) == 2
+
+    def test_stats_endpoint(self):
+        body = client.get("/api/stats/ratelimit").json()
+        assert body["upstream"]["remaining"] == config.UPSTREAM_BUDGET_BURST
+        assert body["client"]["enabled"] is True
@@ -0,0 +1,98 @@
+"""
+Tests for recording and replaying upstream responses
+"""
+
+import asyncio
+import httpx
+import pytest
+from datetime import date, timedelta
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config, replay, serve
+
+URL = "https://api.open-meteo.com/v1/forecast"
+
+
+def daily(lat, start):
+    return {"daily": {"time": [(start + timedelta(days=i)).isoformat() for i in range(3)], "temperature_2m_mean": [lat, lat, lat]}}
+
+
+def get(transport, lats, lons):
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get(URL, params={"latitude": lats, "longitude": lons, "timezone": "auto"})
+    return asyncio.run(run())
+
+
+def record(path, fake):
+    recorder = replay.RecordingTransport(path, fake.transport)
+    response = get(recorder, "1.0,2.0", "10.0,20.0")
+    recorder.save()
+    return response
+
+
+@pytest.mark.upstream(series=lambda lat, day: lat)
+class TestRecordReplay:
+    """Archive round trip, keyed by request parameters"""
+
+    def test_replays_recorded_and_regrouped_requests(self, tmp_path, mock_upstream):
+        path = str(tmp_path / "upstream.replay")
+        recorded = record(path, mock_upstream)
+
+        transport = replay.ReplayTransport(replay.Archive(path))
+        same = get(transport, "1.0,2.0", "10.0,20.0")
+        assert same.json() == recorded.json()
+        # Recorded as a batch, replayed one location at a time and reordered
+        assert get(transport, "2.0", "20.0").json() == recorded.json()[1]
+        assert [loc["daily"]["temperature_2m_mean"][0] for loc in get(transport, "2.0,1.0", "20.0,10.0").json()] == [2.0, 1.0]
+        assert len(mock_upstream.calls) == 1
+        assert transport.stats()["hits"] == 3
+
+    def test_miss_raises_transport_error(self, tmp_path, mock_upstream):
+        path = str(tmp_path / "upstream.replay")
+        record(path, mock_upstream)
+        transport = replay.ReplayTransport(replay.Archive(path))
+        with pytest.raises(httpx.TransportError):
+            get(transport, "3.0", "30.0")
+        assert transport.misses == 1
+
+    def test_dates_follow_the_calendar(self, tmp_path):
+        path = str(tmp_path / "upstream.replay")
+        old = date.today() - timedelta(days=3)
+        body = httpx.Response(200, json=daily(1.0, old)).content
+        key = replay.request_key("GET", httpx.URL(URL, params={"latitude": "1.0", "longitude": "10.0", "timezone": "auto"}))
+        replay.write_archive(path, {key: (200, "application/json", body)}, old)
+
+        transport = replay.ReplayTransport(replay.Archive(path))
+        assert get(transport, "1.0", "10.0").json()["daily"]["time"][0] == date.today().isoformat()
+        frozen = replay.ReplayTransport(replay.Archive(path), rebase_dates=False)
+        assert get(frozen, "1.0", "10.0").json()["daily"]["time"][0] == old.isoformat()
+
+    def test_error_injection(self, tmp_path, mock_upstream):
+        path = str(tmp_path / "upstream.replay")
+        record(path, mock_upstream)
+        transport = replay.ReplayTransport(replay.Archive(path), error_rate=1.0)
+        assert get(transport, "1.0", "10.0").status_code == 503
+        assert transport.errors == 1
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not.replay"
+        path.write_bytes(b"{}")
+        with pytest.raises(ValueError):
+            replay.Archive(str(path))
+
+
+class TestRecordingWorkers:
+    """Recording is refused when several workers would overwrite one archive"""
+
+    def test_serve_refuses_to_record_with_several_workers(self, monkeypatch, tmp_path):
+        started = []
+        monkeypatch.setattr(serve.uvicorn, "run", lambda *args, **kwargs: started.append(kwargs["workers"]))
+        monkeypatch.setattr(config, "UPSTREAM_RECORD_PATH", str(tmp_path / "upstream.replay"))
+        with pytest.raises(SystemExit):
+            serve.main(["--workers", "4"])
+        serve.main(["--workers", "1"])
+        assert started == [1]
@@ -0,0 +1,90 @@
+"""
+Tests for the residual lookup tables (AI offset and empirical bands)
+"""
+
+import numpy as np
+from datetime import date
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import engine, residuals
+from app.jobs.aggregate_residuals import AGGREGATE_SQL, aggregate_arrays, build_table
+from app.main import build_prediction, get_climatology
+
+
+def sample_table() -> residuals.ResidualTable:
+    """January, lead 3: residuals 1.5 +- noise; everything else empty"""
+    rng = np.random.default_rng(1)
+    resid = 1.5 + rng.normal(0, 2.0, 500)
+    data = aggregate_arrays(np.full(500, 1), np.full(500, 3), resid, max_lead=30)
+    return residuals.ResidualTable(data, version="test")
+
+
+class TestAggregation:
+    """Per-(month, lead) statistics"""
+
+    def test_statistics(self):
+        data = aggregate_arrays([1, 1, 1, 2], [0, 0, 0, 50], [1.0, 2.0, 3.0, 9.0], max_lead=30)
+        count, mean, q025, q10, q90, q975 = data[0, 0]
+        assert (count, mean) == (3, 2.0)
+        assert q10 < mean < q90
+        # Leads past the end are pooled into the last row
+        assert data[1, 30, residuals.COUNT] == 1
+
+    def test_database_rows_pool_long_leads(self):
+        assert "LEAST(lead_days, :max_lead)" in AGGREGATE_SQL.text
+        # The query returns one pooled row per (month, last lead); it is kept, not dropped
+        data = build_table([(2, 30, 4, 1.0, [0.0, 0.5, 1.5, 2.0])], max_lead=30)
+        assert data[1, 30, residuals.COUNT] == 4
+
+    def test_lookup(self):
+        table = sample_table()
+        offset, (lo95, lo80, hi80, hi95) = table.lookup(1, 3)
+        assert abs(offset - 1.5) < 0.3
+        assert lo95 <= lo80 <= -residuals.MIN_HALF_WIDTH
+        assert residuals.MIN_HALF_WIDTH <= hi80 <= hi95
+        assert table.lookup(2, 3) is None  # no samples
+
+    def test_scalar_matches_vectorized(self):
+        table = sample_table()
+        offset, bands = table.lookup_many([1, 2], [3, 3])
+        scalar_offset, scalar_bands = table.lookup(1, 3)
+        assert offset[0] == scalar_offset
+        assert tuple(bands[:, 0]) == scalar_bands
+        assert offset[1] == 0.0 and np.isnan(bands[:, 1]).all()
+
+
+class TestResidualPrediction:
+    """The request path applies the offset and empirical bands"""
+
+    def teardown_method(self):
+        residuals.set_table(None)
+
+    def test_build_prediction_uses_stats(self):
+        stats = (1.0, (-4.0, -2.0, 3.0, 6.0))
+        prediction = build_prediction(10.0, 5.0, 3.0, 3, stats)
+        assert prediction.temp == 11.0
+        assert (prediction.low95, prediction.low80, prediction.high80, prediction.high95) == (7.0, 9.0, 14.0, 17.0)
+        assert prediction.explain.ai_offset == 1.0
+
+    def test_engine_matches_scalar(self):
+        table = sample_table()
+        residuals.set_table(table)
+        target = date(2025, 1, 20)
+        result = engine.to_responses(engine.predict([50.0], [10.0], engine.day_of_year([target]), [4.0], [3], months=[1]))[0]
+
+        climo_temp, climo_std = get_climatology(50.0, 10.0, target)
+        scalar = build_prediction(4.0, climo_temp, climo_std, 3, residuals.lookup(1, 3)).to_dict()
+        assert result == scalar
+
+    def test_reload_on_change(self, tmp_path):
+        path = str(tmp_path / "residuals.npy")
+        residuals.save(path, sample_table().data)
+        residuals.load(path)
+        assert not residuals.reload_if_changed(path)
+
+        os.utime(path, (0, 0))
+        assert residuals.reload_if_changed(path)
+        assert residuals.lookup(1, 3) is not None
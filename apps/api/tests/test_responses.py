@@ -0,0 +1,77 @@
+"""
+Tests for the fast response path: orjson serialization, ETags and 304s
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import cache, responses
+from app.main import PredictionResponse, app, build_prediction
+
+client = TestClient(app)
+
+
+class TestSerialization:
+    """orjson output matches the documented Pydantic schema"""
+
+    def test_same_json_as_pydantic(self):
+        prediction = build_prediction(12.3, 10.4, 3.1, 20)
+        fast = json.loads(responses.dumps(prediction))
+        assert fast == json.loads(PredictionResponse(**prediction.to_dict()).model_dump_json())
+        assert fast["explain"]["anchor"] == 12.3
+
+    def test_etag_matching(self):
+        tag = '"abc"'
+        assert responses.etag_matches('"abc"', tag)
+        assert responses.etag_matches('"x", W/"abc"', tag)
+        assert responses.etag_matches("*", tag)
+        assert not responses.etag_matches('"abcd"', tag)
+        assert not responses.etag_matches(None, tag)
+
+    def test_max_age_stops_at_midnight(self):
+        late = datetime(2030, 1, 1, 23, 59, 0)
+        assert "max-age=60," in responses.cache_control(late)
+
+
+@pytest.mark.usefixtures("mock_upstream")
+class TestConditionalRequests:
+    """Cacheable predictions carry an ETag and revalidate with 304"""
+
+    def get(self, headers=None):
+        date_str = (datetime.now() + timedelta(days=4)).strftime("%Y-%m-%d")
+        return client.get("/api/predict", params={"lat": 48.85, "lon": 2.35, "date": date_str}, headers=headers)
+
+    def test_revalidation_returns_304(self):
+        first = self.get()
+        assert first.status_code == 200
+        assert first.headers["cache-control"].startswith("public, max-age=")
+        etag = first.headers["etag"]
+
+        second = self.get({"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+
+    def test_new_forecast_run_changes_etag(self, monkeypatch):
+        etag = self.get().headers["etag"]
+        newer_run = cache.latest_model_run() + timedelta(hours=6)
+        monkeypatch.setattr(cache, "latest_model_run", lambda now=None: newer_run)
+        cache.forecast_cache.local.clear()
+
+        response = self.get({"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_climatology_fallback_is_not_cacheable(self, mock_upstream):
+        mock_upstream.status = 500
+        response = self.get()
+        assert response.status_code == 200
+        assert response.json()["explain"]["w_anchor"] == 0.0
+        assert "etag" not in response.headers
+        assert response.headers["cache-control"] == "no-store"
@@ -0,0 +1,65 @@
+"""
+Tests for request coalescing
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Concurrent callers for one key share one call"""
+
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def run():
+            flight = SingleFlight()
+            results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(50)))
+            return flight, results
+
+        flight, results = asyncio.run(run())
+        assert results == [42] * 50
+        assert len(calls) == 1
+        assert flight.coalesced == 49
+        assert flight.in_flight() == 0
+
+    def test_errors_reach_every_caller(self):
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def run():
+            flight = SingleFlight()
+            return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_timeout_does_not_cancel_shared_call(self):
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def run():
+            flight = SingleFlight()
+            with pytest.raises(asyncio.TimeoutError):
+                await flight.do("k", slow, timeout=0.001)
+            # A patient caller joins the same in-flight call
+            result = await flight.do("k", slow, timeout=1.0)
+            return flight, result
+
+        flight, result = asyncio.run(run())
+        assert result == "done"
+        assert flight.calls == 1
+        assert flight.timeouts == 1
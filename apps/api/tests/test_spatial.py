@@ -0,0 +1,61 @@
+"""
+Tests for canonical spatial cells
+"""
+
+import math
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import forecast, predictions, spatial
+from app.cache import snap_to_grid
+from datetime import date
+
+
+class TestCellGrid:
+    """Quantization onto canonical cell centres"""
+
+    def setup_method(self):
+        self.cells = spatial.CellGrid(0.1)
+
+    def test_centres_are_canonical_floats(self):
+        assert self.cells.snap(59.3293, 18.0686) == (59.3, 18.1)
+        assert self.cells.snap(-0.04, -0.04) == (0.0, 0.0)
+        assert math.copysign(1.0, self.cells.snap(-0.04, -0.04)[0]) == 1.0
+
+    def test_antimeridian_and_poles(self):
+        assert self.cells.cell_id(10.0, 180.0) == self.cells.cell_id(10.0, -180.0)
+        assert self.cells.cell_id(10.0, 179.99) == self.cells.cell_id(10.0, -179.99)
+        assert self.cells.snap(95.0, 0.0) == (90.0, 0.0)
+        assert self.cells.snap(10.0, 540.0) == (10.0, -180.0)
+
+    def test_vectorized_matches_scalar(self):
+        rng = np.random.default_rng(1)
+        lats = rng.uniform(-90, 90, 2000)
+        lons = rng.uniform(-180, 180, 2000)
+        ids = self.cells.cell_ids(lats, lons)
+        assert ids.tolist() == [self.cells.cell_id(la, lo) for la, lo in zip(lats, lons)]
+        centre_lats, centre_lons = self.cells.centers(ids)
+        assert list(zip(centre_lats.tolist(), centre_lons.tolist())) == [self.cells.center(i) for i in ids.tolist()]
+
+    def test_snap_error_is_bounded(self):
+        rng = np.random.default_rng(2)
+        for lat, lon in zip(rng.uniform(-80, 80, 500), rng.uniform(-180, 180, 500)):
+            snapped_lat, snapped_lon = self.cells.snap(lat, lon)
+            assert abs(snapped_lat - lat) <= 0.05 + 1e-9
+            assert abs((snapped_lon - lon + 180) % 360 - 180) <= 0.05 + 1e-9
+
+
+class TestCellKeys:
+    """Cache keys are per cell, not per float coordinate"""
+
+    def test_nearby_coordinates_share_keys(self):
+        a = snap_to_grid(48.85661, 2.35222)
+        b = snap_to_grid(48.85670, 2.35230)  # ~10 m away
+        assert forecast.series_key(*a) == forecast.series_key(*b)
+        assert predictions.cache_key(*a, date(2030, 1, 1)) == predictions.cache_key(*b, date(2030, 1, 1))
+
+    def test_antimeridian_shares_keys(self):
+        assert forecast.series_key(*snap_to_grid(0.0, 180.0)) == forecast.series_key(*snap_to_grid(0.0, -180.0))
@@ -0,0 +1,110 @@
+"""
+Tests for startup warm-up, the readiness probe and import profiling
+"""
+
+import asyncio
+from fastapi.testclient import TestClient
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import startup
+from app.main import app
+
+
+class TestWarmup:
+    """Steps run concurrently, respect dependencies and report status"""
+
+    def test_steps_run_concurrently_after_dependencies(self):
+        order = []
+
+        def step(name, delay, result=None):
+            async def run():
+                order.append(f"{name}:start")
+                await asyncio.sleep(delay)
+                order.append(f"{name}:end")
+                return result
+            return run
+
+        async def run():
+            warmup = startup.Warmup()
+            warmup.add("a", step("a", 0.02))
+            warmup.add("b", step("b", 0.01, result=False))
+            warmup.add("c", step("c", 0), after=("a",))
+            finished = await warmup.run(budget=5)
+            return warmup, finished
+
+        warmup, finished = asyncio.run(run())
+        assert finished and warmup.ready()
+        assert order[:2] == ["a:start", "b:start"]
+        assert order.index("c:start") > order.index("a:end")
+        report = warmup.report()
+        assert report["subsystems"]["b"]["status"] == "skipped"
+        assert report["subsystems"]["a"]["seconds"] >= 0.02
+
+    def test_optional_failure_keeps_ready(self):
+        async def fail():
+            raise ConnectionError("refused")
+
+        async def ok():
+            return None
+
+        async def run(required):
+            warmup = startup.Warmup()
+            warmup.add("redis", fail, required=required)
+            warmup.add("grid", ok)
+            await warmup.run(budget=5)
+            return warmup
+
+        optional = asyncio.run(run(required=False))
+        assert optional.ready()
+        assert optional.report()["subsystems"]["redis"] == {
+            "status": "failed", "required": False, "seconds": 0.0, "error": "refused",
+        }
+        assert not asyncio.run(run(required=True)).ready()
+
+    def test_budget_leaves_slow_steps_running(self):
+        async def slow():
+            await asyncio.sleep(0.2)
+
+        async def run():
+            warmup = startup.Warmup()
+            warmup.add("slow", slow)
+            finished = await warmup.run(budget=0.01)
+            during = warmup.ready(), warmup.report()["subsystems"]["slow"]["status"]
+            await warmup.steps["slow"].task
+            return finished, during, warmup.ready()
+
+        finished, during, after = asyncio.run(run())
+        assert not finished
+        assert during == (False, "running")
+        assert after
+
+
+class TestReadiness:
+    """/ready reports every subsystem once the lifespan has run"""
+
+    def test_ready_after_startup(self):
+        with TestClient(app) as client:
+            response = client.get("/ready")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ready"] is True
+        assert {"http_client", "redis", "database", "climo_grid", "residuals"} <= set(body["subsystems"])
+        assert body["import_seconds"] is not None
+
+
+class TestImportProfile:
+    """python -X importtime output parsing"""
+
+    def test_parse_and_group_by_package(self):
+        stderr = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |     numpy.core",
+            "import time:       200 |        300 |   numpy",
+            "import time:        50 |        350 | app.main",
+        ])
+        rows = startup.parse_importtime(stderr)
+        assert rows[0] == ("numpy.core", 100, 100)
+        assert startup.top_level(rows) == {"numpy": 300, "app": 350}
@@ -0,0 +1,165 @@
+"""
+Tests for the upstream guard: breaker, hedging, adaptive timeout, concurrency
+"""
+
+import asyncio
+import httpx
+import pytest
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import upstream
+from app.main import get_forecast_anchor
+from app.upstream import CircuitBreaker, LatencyTracker, Upstream, UpstreamUnavailable
+
+
+def make_upstream(**overrides) -> Upstream:
+    options = {
+        "max_concurrency": 4,
+        "queue_timeout": 0.05,
+        "min_timeout": 0.05,
+        "max_timeout": 1.0,
+        "timeout_factor": 3.0,
+        "hedge_quantile": 0.95,
+        "breaker": CircuitBreaker(failure_threshold=3, reset_timeout=0.1),
+        "latency": LatencyTracker(window=50, min_samples=5),
+    }
+    options.update(overrides)
+    return Upstream(**options)
+
+
+def status_error(code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://upstream.test")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+class TestCircuitBreaker:
+    """Fail fast while the upstream is unhealthy"""
+
+    def test_opens_after_consecutive_failures_and_probes(self):
+        guard = make_upstream()
+        attempts = []
+
+        async def failing():
+            attempts.append(1)
+            raise status_error(503)
+
+        async def ok():
+            return "ok"
+
+        async def run():
+            for _ in range(3):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await guard.call(failing)
+            with pytest.raises(UpstreamUnavailable):
+                await guard.call(ok)
+            await asyncio.sleep(0.12)
+            return await guard.call(ok)
+
+        assert asyncio.run(run()) == "ok"
+        assert len(attempts) == 3
+        assert guard.breaker.trips == 1
+        assert guard.breaker.state == CircuitBreaker.CLOSED
+
+    def test_client_errors_do_not_trip(self):
+        guard = make_upstream()
+
+        async def bad_request():
+            raise status_error(400)
+
+        async def run():
+            for _ in range(5):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await guard.call(bad_request)
+
+        asyncio.run(run())
+        assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+class TestAdaptiveCalls:
+    """Latency-driven timeout and hedging"""
+
+    def test_timeout_follows_observed_latency(self):
+        guard = make_upstream()
+        assert guard.timeout() == 1.0  # no data yet
+        for _ in range(10):
+            guard.latency.record(0.1)
+        assert guard.timeout() == pytest.approx(0.3)
+        for _ in range(10):
+            guard.latency.record(0.001)
+        assert guard.timeout() == pytest.approx(0.3)  # p99 still 0.1
+        guard.latency.samples.clear()
+        for _ in range(10):
+            guard.latency.record(0.001)
+        assert guard.timeout() == 0.05  # clamped to the minimum
+
+    def test_slow_call_times_out_and_counts_as_failure(self):
+        guard = make_upstream(hedge_quantile=None)
+        for _ in range(10):
+            guard.latency.record(0.01)
+
+        async def slow():
+            await asyncio.sleep(1)
+
+        with pytest.raises(UpstreamUnavailable):
+            asyncio.run(guard.call(slow))
+        assert guard.timeouts == 1
+        assert guard.breaker.failures == 1
+
+    def test_hedge_wins_over_slow_first_attempt(self):
+        guard = make_upstream(max_timeout=2.0)
+        for _ in range(10):
+            guard.latency.record(0.02)
+        attempts = []
+
+        async def first_slow():
+            attempts.append(1)
+            await asyncio.sleep(1.0 if len(attempts) == 1 else 0.01)
+            return len(attempts)
+
+        started = time.perf_counter()
+        result = asyncio.run(guard.call(first_slow))
+        assert result == 2
+        assert time.perf_counter() - started < 0.5
+        assert guard.hedges == 1 and guard.hedge_wins == 1
+
+    def test_concurrency_is_bounded(self):
+        guard = make_upstream(max_concurrency=2, queue_timeout=0.05, hedge_quantile=None)
+        active = []
+        peak = []
+
+        async def work():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.2)
+            active.pop()
+
+        async def run():
+            return await asyncio.gather(*(guard.call(work) for _ in range(4)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert max(peak) == 2
+        assert sum(isinstance(r, UpstreamUnavailable) for r in results) == 2
+        assert guard.queue_timeouts == 2
+
+
+@pytest.mark.upstream(status=503)
+@pytest.mark.usefixtures("mock_upstream")
+class TestForecastFallback:
+    """An open breaker short-circuits the forecast fetch"""
+
+    def test_anchor_falls_back_without_calling_upstream(self, mock_upstream):
+        threshold = upstream.forecast_upstream.breaker.failure_threshold
+
+        async def run():
+            # Distinct cells so nothing is coalesced
+            for i in range(threshold + 3):
+                assert await get_forecast_anchor(10.0 + i, 20.0, 3) is None
+
+        asyncio.run(run())
+        assert len(mock_upstream.calls) == threshold
+        assert upstream.forecast_upstream.breaker.state == "open"
+        assert upstream.forecast_upstream.stats()["breaker_rejected"] == 3